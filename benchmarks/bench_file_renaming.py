@@ -0,0 +1,79 @@
+from argparse import ArgumentParser
+
+from pandas import concat
+
+from src.data_preparation import handle_file_renaming
+from src.git_log_parsing import GitLogParser, get_file_renames, set_commit_idxs
+
+from benchmarks.bench_pipeline import measure
+from benchmarks.synthetic_history import SyntheticHistory
+
+N_COMMITS = [100_000, 300_000]
+
+
+def get_last_file_paths(history):
+    # ground truth: last path of the file of each commit_file row, rows in git log order
+
+    path_to_file_idx, file_last_paths = {}, []
+    commit_file_idxs = []
+
+    for _, _, _, _, _, changes in history.iter_commit_plans():
+
+        file_idxs = []
+        for kind, path, new_path, _, _, _ in changes:
+
+            if kind == 'A':
+                path_to_file_idx[path] = len(file_last_paths)
+                file_last_paths.append(path)
+            elif kind == 'R':
+                path_to_file_idx[new_path] = path_to_file_idx.pop(path)
+                file_last_paths[path_to_file_idx[new_path]] = new_path
+                path = new_path
+
+            file_idxs.append(path_to_file_idx[path])
+            if kind == 'D':
+                del path_to_file_idx[path]
+
+        commit_file_idxs.append(file_idxs)
+
+    return [file_last_paths[file_idx] for file_idxs in reversed(commit_file_idxs) for file_idx in file_idxs]
+
+
+def bench_file_renaming(history, trace_memory=True):
+
+    batches = list(GitLogParser('None').parse_log_stream(history.iter_log_lines()))
+    _, df_commit_file = set_commit_idxs(
+        concat([df_commit for df_commit, _ in batches], ignore_index=True),
+        concat([df_commit_file for _, df_commit_file in batches], ignore_index=True)
+    )
+    df_file_rename = get_file_renames(df_commit_file)
+
+    df_renamed, duration, peak_memory_mb = measure(
+        lambda: handle_file_renaming(df_commit_file.copy(), df_file_rename),
+        trace_memory=trace_memory
+    )
+    is_valid = df_renamed.file_path.tolist() == get_last_file_paths(history)
+
+    print(
+        f"{history.n_commits:>10} {len(df_file_rename):>10} {len(df_commit_file):>10} {duration:>13.2f} "
+        f"{'-' if peak_memory_mb is None else f'{peak_memory_mb:.1f}':>15} {str(is_valid):>8}",
+        flush=True
+    )
+
+
+def main():
+
+    parser = ArgumentParser(description='time rename resolution on synthetic histories with many renames.')
+    parser.add_argument('--n_commits', type=int, nargs='*', default=N_COMMITS)
+    parser.add_argument('--rename_rate', type=float, default=0.4)
+    parser.add_argument('--no_memory', action='store_true', help='skip the (slower) peak memory measurement')
+    args = parser.parse_args()
+
+    print(f"{'n_commits':>10} {'n_renames':>10} {'n_rows':>10} {'duration (s)':>13} {'peak mem (MB)':>15} {'is_valid':>8}")
+
+    for n_commits in args.n_commits:
+        bench_file_renaming(SyntheticHistory(n_commits, rename_rate=args.rename_rate), not args.no_memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+from argparse import ArgumentParser
+from time import perf_counter
+
+from pandas import concat
+
+from src.git_log_parsing import GitLogParser
+
+BACKENDS = ['cli', 'object_store']
+
+
+def parse(path_to_repo, backend):
+
+    batches = list(GitLogParser(path_to_repo, backend=backend).iter_commit_batches())
+
+    return (
+        concat([df_commit for df_commit, _ in batches], ignore_index=True),
+        concat([df_commit_file for _, df_commit_file in batches], ignore_index=True)
+    )
+
+
+def main():
+
+    parser = ArgumentParser(description='compare the git log backends of GitLogParser on a repository.')
+    parser.add_argument('path_to_repo', type=str)
+    parser.add_argument('--backends', type=str, nargs='*', default=BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':>13} {'n_commits':>10} {'n_files':>10} {'n_renamed':>10} {'duration (s)':>13}")
+
+    for backend in args.backends:
+
+        start = perf_counter()
+        df_commit, df_commit_file = parse(args.path_to_repo, backend)
+        duration = perf_counter() - start
+
+        n_renamed = df_commit_file.file_path.str.contains(' => ', regex=False).sum()
+        print(f"{backend:>13} {len(df_commit):>10} {len(df_commit_file):>10} {n_renamed:>10} {duration:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from src.git_log_parsing import GitLogParser
+
+N_COMMITS = [10_000, 100_000, 1_000_000]
+
+
+def gen_synthetic_log_lines(n_commits, n_authors=50, n_files_per_commit=3, seed=0):
+
+    rng = Random(seed)
+
+    for i in range(n_commits):
+
+        yield f"+++{i:040x}\t2019-05-30 12:26:49 +0200\tauthor_{rng.randrange(n_authors)}\tcommit msg {i}"
+
+        for _ in range(rng.randint(1, 2 * n_files_per_commit - 1)):
+            yield f"{rng.randrange(100)}\t{rng.randrange(100)}\tsrc/module_{rng.randrange(30)}/file_{rng.randrange(500)}.py"
+
+        yield ""
+
+
+def bench_parse_log_stream(n_commits):
+
+    git_log_parser = GitLogParser('None')  # get log will not be used
+
+    start = perf_counter()
+
+    n_parsed_commits, n_parsed_files = 0, 0
+    for df_commit, df_commit_file in git_log_parser.parse_log_stream(gen_synthetic_log_lines(n_commits)):
+        n_parsed_commits += len(df_commit)
+        n_parsed_files += len(df_commit_file)
+
+    duration = perf_counter() - start
+
+    return n_parsed_commits, n_parsed_files, duration
+
+
+def main():
+
+    parser = ArgumentParser(description='measure GitLogParser throughput on synthetic git logs.')
+    parser.add_argument('--n_commits', type=int, nargs='*', default=N_COMMITS)
+    args = parser.parse_args()
+
+    print(f"{'n_commits':>10} {'n_files':>10} {'duration (s)':>13} {'commits/s':>10}")
+
+    for n_commits in args.n_commits:
+        n_parsed_commits, n_parsed_files, duration = bench_parse_log_stream(n_commits)
+        print(f"{n_parsed_commits:>10} {n_parsed_files:>10} {duration:>13.2f} {n_parsed_commits / duration:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import json
+import platform
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+from os import makedirs
+from os.path import join
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import pandas
+from pandas import concat, DataFrame
+
+from src.data_preparation import handle_file_renaming, tag_commit_file, denormalize, cast_to_ref_types
+from src.fig_generation import FigGenerator
+from src.git_log_parsing import GitLogParser, get_file_renames, set_commit_idxs
+from src.config_management import ConfigManager
+from src.utilities import load_config, save_cleaned, read_cleaned
+import src.utilities
+
+from benchmarks.synthetic_history import SyntheticHistory
+
+N_COMMITS = [10_000, 100_000, 1_000_000]
+RESULTS_PATH = './benchmarks/results'
+STAGE_NMS = [
+    'parse_log', 'prep_commit', 'handle_file_renaming', 'tag_commit_file', 'denormalize', 'load_cleaned', 'get_fig'
+]
+
+
+def parse_log(source):
+    # source: git log text file or repository directory
+
+    if source['format'] == 'log':
+        with open(source['path']) as f:
+            batches = list(GitLogParser('None').parse_log_stream(line.rstrip('\n') for line in f))
+    else:
+        batches = list(GitLogParser(source['path'], rename_detection='renames').iter_commit_batches())
+
+    return set_commit_idxs(
+        concat([df_commit for df_commit, _ in batches], ignore_index=True),
+        concat([df_commit_file for _, df_commit_file in batches], ignore_index=True)
+    )
+
+
+def prep_commit(df_commit):
+
+    return cast_to_ref_types(df_commit.copy())
+
+
+def handle_renaming(df_commit_file):
+
+    return handle_file_renaming(df_commit_file.copy(), get_file_renames(df_commit_file))
+
+
+def tag(df_commit_file):
+
+    config_manager = ConfigManager()
+    config_manager.src_path = 'src'
+    config_manager.module_depth = 1
+
+    return tag_commit_file(df_commit_file.copy(), config_manager)
+
+
+def finalize(df_commit_file, df_commit):
+
+    df_commit_file = denormalize(df_commit_file, df_commit, ['author_nm', 'creation_dt'])
+
+    return cast_to_ref_types(df_commit_file)
+
+
+def load_cleaned(df_commit_file, dir_path):
+    # round trip through the cleaned dataset, as read by the Dashboard
+
+    src.utilities.DATA_PATH = dir_path
+    save_cleaned(df_commit_file, 'bench', 'commit_file')
+
+    return read_cleaned('bench', 'commit_file')
+
+
+def gen_figs(df_commit_file):
+    # every stat of every dashboard view, on the same rows as the Dashboard
+
+    df = df_commit_file.query('ext != "other"')
+    specs = load_config('dashboard_specs')
+
+    return [
+        FigGenerator(title=stat['nm'], **stat['def']).get_fig(df)
+        for view_specs in specs.values()
+        for stat in view_specs['stats'].values()
+    ]
+
+
+def measure(func, *args, trace_memory=True):
+    # (result, duration, peak traced memory in MB), the memory is measured on a second run as tracing slows it down
+
+    start = perf_counter()
+    result = func(*args)
+    duration = perf_counter() - start
+
+    peak_memory_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        func(*args)
+        peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    return result, duration, peak_memory_mb
+
+
+def bench_pipeline(history, source_format, dir_path, trace_memory=True, skipped_stage_nms=()):
+
+    source = {'format': source_format, 'path': join(dir_path, f'history_{history.n_commits}')}
+
+    start = perf_counter()
+    if source_format == 'log':
+        history.write_log(source['path'])
+    else:
+        history.create_repo(source['path'])
+    generation_duration = perf_counter() - start
+
+    results = []
+
+    def run_stage(stage_nm, func, *args):
+        if stage_nm in skipped_stage_nms: # the next stage runs on the input of the skipped one
+            return args[0]
+        result, duration, peak_memory_mb = measure(func, *args, trace_memory=trace_memory)
+        n_rows = len(result[1]) if isinstance(result, tuple) else len(result)
+        result_memory_mb = None
+        if isinstance(result, DataFrame):
+            result_memory_mb = result.memory_usage(deep=True).sum() / 1e6
+        results.append({
+            'n_commits': history.n_commits,
+            'source': source_format,
+            'stage': stage_nm,
+            'duration_s': round(duration, 4),
+            'peak_memory_mb': None if peak_memory_mb is None else round(peak_memory_mb, 1),
+            'n_rows': n_rows,
+            'result_memory_mb': None if result_memory_mb is None else round(result_memory_mb, 1),
+        })
+        print(
+            f"{history.n_commits:>10} {stage_nm:>20} {duration:>13.2f} "
+            f"{'-' if peak_memory_mb is None else f'{peak_memory_mb:.1f}':>15} {n_rows:>10} "
+            f"{'-' if result_memory_mb is None else f'{result_memory_mb:.1f}':>12}",
+            flush=True
+        )
+        return result
+
+    print(f"{history.n_commits:>10} {'generate_' + source_format:>20} {generation_duration:>13.2f} {'-':>15} {'-':>10} {'-':>12}", flush=True)
+
+    df_commit, df_commit_file = run_stage('parse_log', parse_log, source)
+    df_commit = run_stage('prep_commit', prep_commit, df_commit)
+    df_commit_file = run_stage('handle_file_renaming', handle_renaming, df_commit_file)
+    df_commit_file = run_stage('tag_commit_file', tag, df_commit_file)
+    df_commit_file = run_stage('denormalize', finalize, df_commit_file, df_commit)
+    df_commit_file = run_stage('load_cleaned', load_cleaned, df_commit_file, dir_path)
+    if 'load_cleaned' in skipped_stage_nms:
+        df_commit_file = df_commit_file.set_index('creation_dt')
+    run_stage('get_fig', gen_figs, df_commit_file)
+
+    return results
+
+
+def get_git_version():
+
+    return run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+
+
+def print_comparison(results, baseline_path):
+
+    with open(baseline_path) as f:
+        baseline = {
+            (result['n_commits'], result['source'], result['stage']): result
+            for result in json.load(f)['results']
+        }
+
+    print(f"\nComparison with {baseline_path} (current / baseline):")
+    print(f"{'n_commits':>10} {'stage':>20} {'duration':>9} {'peak memory':>12}")
+
+    for result in results:
+        baseline_result = baseline.get((result['n_commits'], result['source'], result['stage']))
+        if baseline_result is None:
+            continue
+
+        duration_ratio = result['duration_s'] / max(baseline_result['duration_s'], 1e-9)
+        memory_ratio = '-'
+        if result['peak_memory_mb'] and baseline_result['peak_memory_mb']:
+            memory_ratio = f"{result['peak_memory_mb'] / baseline_result['peak_memory_mb']:.2f}"
+
+        print(f"{result['n_commits']:>10} {result['stage']:>20} {duration_ratio:>9.2f} {memory_ratio:>12}")
+
+
+def main():
+
+    parser = ArgumentParser(description='time & measure the peak memory of each pipeline stage on synthetic histories.')
+    parser.add_argument('--n_commits', type=int, nargs='*', default=N_COMMITS)
+    parser.add_argument('--source', type=str, choices=['log', 'repo'], default='log',
+        help='parse generated git log text (log) or run git log on a generated repository (repo)')
+    parser.add_argument('--n_authors', type=int, default=50)
+    parser.add_argument('--dir_depth', type=int, default=3)
+    parser.add_argument('--rename_rate', type=float, default=0.02)
+    parser.add_argument('--binary_rate', type=float, default=0.02)
+    parser.add_argument('--no_memory', action='store_true', help='skip the (slower) peak memory measurement')
+    parser.add_argument('--skip', type=str, nargs='*', default=[], choices=STAGE_NMS, help='stages not to run')
+    parser.add_argument('--output', type=str, default=None, help='json result file, in benchmarks/results by default')
+    parser.add_argument('--compare', type=str, default=None, help='json result file of a previous run to compare with')
+    args = parser.parse_args()
+
+    results = []
+
+    print(f"{'n_commits':>10} {'stage':>20} {'duration (s)':>13} {'peak mem (MB)':>15} {'n_rows':>10} {'frame (MB)':>12}")
+
+    with TemporaryDirectory() as dir_path:
+        for n_commits in args.n_commits:
+            history = SyntheticHistory(
+                n_commits, n_authors=args.n_authors, dir_depth=args.dir_depth,
+                rename_rate=args.rename_rate, binary_rate=args.binary_rate
+            )
+            results += bench_pipeline(
+                history, args.source, dir_path, trace_memory=not args.no_memory, skipped_stage_nms=args.skip
+            )
+
+    output_path = args.output
+    if output_path is None:
+        makedirs(RESULTS_PATH, exist_ok=True)
+        output_path = join(RESULTS_PATH, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    with open(output_path, 'w') as f:
+        json.dump({
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'pandas': pandas.__version__,
+                'git': get_git_version(),
+                'platform': platform.platform(),
+                'args': vars(args),
+            },
+            'results': results,
+        }, f, indent=4)
+
+    print(f"\nResults saved to {output_path}.")
+
+    if args.compare is not None:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+from argparse import ArgumentParser
+from os.path import getsize, join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from pandas import read_csv
+
+import src.utilities
+from src.git_log_parsing import GitLogParser, set_commit_idxs
+from src.utilities import RawDatasetWriter, read_raw, get_raw_part_paths
+
+from benchmarks.bench_git_log_parsing import gen_synthetic_log_lines
+
+N_COMMITS = 1_000_000
+
+
+def bench_csv(batches, dir_path):
+
+    start = perf_counter()
+
+    for log_level in ['commit', 'commit_file']:
+        file_path = join(dir_path, f'bench_raw_{log_level}.csv')
+        for i, batch in enumerate(batches):
+            df = batch[log_level == 'commit_file']
+            df.to_csv(file_path, index=False, mode='a' if i > 0 else 'w', header=i == 0)
+
+    write_duration = perf_counter() - start
+    start = perf_counter()
+
+    for log_level in ['commit', 'commit_file']:
+        read_csv(join(dir_path, f'bench_raw_{log_level}.csv'))
+
+    read_duration = perf_counter() - start
+    size = sum(getsize(join(dir_path, f'bench_raw_{log_level}.csv')) for log_level in ['commit', 'commit_file'])
+
+    return size, write_duration, read_duration
+
+
+def bench_parquet(batches):
+
+    start = perf_counter()
+
+    for log_level in ['commit', 'commit_file']:
+        with RawDatasetWriter('bench', log_level) as writer:
+            for batch in batches:
+                writer.write(batch[log_level == 'commit_file'])
+
+    write_duration = perf_counter() - start
+    start = perf_counter()
+
+    for log_level in ['commit', 'commit_file']:
+        read_raw('bench', log_level)
+
+    read_duration = perf_counter() - start
+    size = sum(
+        getsize(part_path)
+        for log_level in ['commit', 'commit_file']
+        for part_path in get_raw_part_paths('bench', log_level)
+    )
+
+    return size, write_duration, read_duration
+
+
+def main():
+
+    parser = ArgumentParser(description='compare the csv & parquet raw datasets on a synthetic history.')
+    parser.add_argument('--n_commits', type=int, default=N_COMMITS)
+    args = parser.parse_args()
+
+    batches, n_commits = [], 0
+    for df_commit, df_commit_file in GitLogParser('None').parse_log_stream(gen_synthetic_log_lines(args.n_commits)):
+        batches.append(set_commit_idxs(df_commit, df_commit_file, n_commits))
+        n_commits += len(df_commit)
+
+    with TemporaryDirectory() as dir_path:
+        src.utilities.DATA_PATH = dir_path
+
+        print(f"{'format':>8} {'size (MB)':>10} {'write (s)':>10} {'read (s)':>9} {'round-trip (s)':>15}")
+
+        for format_nm, (size, write_duration, read_duration) in [
+            ('csv', bench_csv(batches, dir_path)),
+            ('parquet', bench_parquet(batches))
+        ]:
+            print(
+                f"{format_nm:>8} {size / 1e6:>10.1f} {write_duration:>10.2f} {read_duration:>9.2f}"
+                f" {write_duration + read_duration:>15.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
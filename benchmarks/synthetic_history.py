@@ -0,0 +1,258 @@
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from hashlib import sha1
+from random import Random
+from subprocess import Popen, PIPE, run
+
+from src.git_log_parsing import GitLogParser, format_file_renaming
+
+START_TS = 1420070400 # 2015-01-01
+TZS = ['+0000', '+0100', '+0200', '-0500', '+0530']
+
+
+class SyntheticHistory:
+    # reproducible git history, rendered as git log text (fast) or as a real repository (through git fast-import)
+
+    TEXT_EXTS = ['py', 'js', 'ts', 'java', 'cpp', 'php', 'md', 'yaml']
+    BINARY_EXTS = ['png', 'jar']
+
+    ADD_RATE = 0.25 # share of file changes creating a new file
+    DELETE_RATE = 0.03
+
+    def __init__(
+        self,
+        n_commits,
+        n_authors=50,
+        dir_depth=3,
+        n_dirs_per_level=6,
+        n_files_per_commit=3,
+        rename_rate=0.02,
+        binary_rate=0.02,
+        span_days=3650,
+        seed=0
+        ):
+
+        self.n_commits = n_commits
+        self.n_authors = n_authors
+        self.dir_depth = dir_depth
+        self.n_dirs_per_level = n_dirs_per_level
+        self.n_files_per_commit = n_files_per_commit
+        self.rename_rate = rename_rate # share of file changes that are renames (with a small edit)
+        self.binary_rate = binary_rate # share of new files that are binaries
+        self.span_days = span_days # approximate time between the first & the last commit
+        self.seed = seed
+
+        self.dir_paths = self.__gen_dir_paths()
+
+    def __gen_dir_paths(self):
+
+        dir_paths = ['src']
+        for depth in range(self.dir_depth):
+            dir_paths = [f'{dir_path}/d{depth}_{i}' for dir_path in dir_paths for i in range(self.n_dirs_per_level)]
+
+        return dir_paths
+
+    def __gen_file_path(self, rng, i, is_binary):
+
+        ext = rng.choice(self.BINARY_EXTS if is_binary else self.TEXT_EXTS)
+
+        return f'{rng.choice(self.dir_paths)}/f{i}_{rng.randrange(1000)}.{ext}'
+
+    def get_commit_id(self, i):
+
+        return sha1(f'{self.seed}-{i}'.encode()).hexdigest()
+
+    def iter_commit_plans(self):
+        # (i, author_nm, timestamp, tz, msg, [(kind, path, new_path, is_binary, n_lines_inserted, n_lines_deleted)])
+        # with kind in A(dd), M(odify), R(ename), D(elete), oldest commit first
+
+        rng = Random(self.seed)
+        file_n_lines = {} # path -> nb of lines, None for binaries
+        file_paths, file_path_idx = [], {} # for O(1) random picks & removals
+
+        def add_file(path, n_lines):
+            file_n_lines[path] = n_lines
+            file_path_idx[path] = len(file_paths)
+            file_paths.append(path)
+
+        def remove_file(path):
+            idx = file_path_idx.pop(path)
+            last_path = file_paths.pop()
+            if last_path != path:
+                file_paths[idx] = last_path
+                file_path_idx[last_path] = idx
+            return file_n_lines.pop(path)
+
+        timestamp = START_TS
+        for i in range(self.n_commits):
+
+            timestamp += rng.randint(1, max(2, 2 * self.span_days * 24 * 3600 // self.n_commits))
+            author_idx = rng.randrange(self.n_authors)
+            changes, touched_paths = [], set()
+
+            for _ in range(rng.randint(1, 2 * self.n_files_per_commit - 1)):
+
+                draw = rng.random()
+
+                if not file_paths or draw < self.ADD_RATE:
+                    is_binary = rng.random() < self.binary_rate
+                    path = self.__gen_file_path(rng, i, is_binary)
+                    if path in file_n_lines or path in touched_paths:
+                        continue
+                    n_lines = None if is_binary else rng.randint(5, 200)
+                    add_file(path, n_lines)
+                    changes.append(('A', path, None, is_binary, n_lines or 0, 0))
+                    touched_paths.add(path)
+                    continue
+
+                path = file_paths[rng.randrange(len(file_paths))]
+                if path in touched_paths:
+                    continue
+                touched_paths.add(path)
+                n_lines = file_n_lines[path]
+                is_binary = n_lines is None
+
+                if draw < self.ADD_RATE + self.DELETE_RATE:
+                    remove_file(path)
+                    changes.append(('D', path, None, is_binary, 0, n_lines or 0))
+
+                elif draw < self.ADD_RATE + self.DELETE_RATE + self.rename_rate and not is_binary and n_lines >= 10:
+                    new_path = self.__gen_file_path(rng, i, False)
+                    if new_path in file_n_lines or new_path in touched_paths:
+                        continue
+                    n_deleted, n_inserted = rng.randint(0, n_lines // 10), rng.randint(0, n_lines // 10)
+                    remove_file(path)
+                    add_file(new_path, n_lines - n_deleted + n_inserted)
+                    changes.append(('R', path, new_path, False, n_inserted, n_deleted))
+                    touched_paths.add(new_path)
+
+                else:
+                    n_deleted = 0 if is_binary else rng.randint(0, min(n_lines, 20))
+                    n_inserted = 0 if is_binary else rng.randint(1, 40)
+                    if not is_binary:
+                        file_n_lines[path] = n_lines - n_deleted + n_inserted
+                    changes.append(('M', path, None, is_binary, n_inserted, n_deleted))
+
+            yield i, f'author_{author_idx}', timestamp, TZS[author_idx % len(TZS)], f'commit msg {i}', changes
+
+    def iter_log_lines(self):
+        # same lines as git log -M --numstat --pretty=format:GitLogParser.COMMIT_FORMAT, newest commit first
+
+        for i, author_nm, timestamp, tz, msg, changes in reversed(list(self.iter_commit_plans())):
+
+            tz_offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * (-1 if tz[0] == '-' else 1)
+            creation_dt = datetime.fromtimestamp(timestamp, timezone(tz_offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+            yield f'{GitLogParser.COMMIT_SEP}{self.get_commit_id(i)}\t{creation_dt} {tz}\t{author_nm}\t{msg}'
+
+            for kind, path, new_path, is_binary, n_inserted, n_deleted in changes:
+                file_path = format_file_renaming(path, new_path) if kind == 'R' else path
+                if is_binary:
+                    yield f'-\t-\t{file_path}'
+                else:
+                    yield f'{n_inserted}\t{n_deleted}\t{file_path}'
+
+            yield ''
+
+    def write_log(self, file_path):
+
+        with open(file_path, 'w') as f:
+            for line in self.iter_log_lines():
+                f.write(line + '\n')
+
+    def iter_fast_import_chunks(self):
+        # fast-import stream, file contents are made of unique lines so git's diff finds the planned counts
+
+        rng = Random(self.seed + 1)
+        file_lines = {}
+        line_counter = 0
+
+        def new_lines(n):
+            nonlocal line_counter
+            line_counter += n
+            return list(range(line_counter - n, line_counter))
+
+        def edit(lines, n_inserted, n_deleted):
+            for _ in range(n_deleted):
+                lines.pop(rng.randrange(len(lines)))
+            for line in new_lines(n_inserted):
+                lines.insert(rng.randint(0, len(lines)), line)
+            return lines
+
+        def data(content):
+            return b'data %d\n%s\n' % (len(content), content)
+
+        def file_content(path):
+            lines = file_lines[path]
+            if lines is None:
+                return b'\x89PNG\r\n\x1a\n\x00' + rng.randbytes(64)
+            return ''.join(f'line_{line} = {line}\n' for line in lines).encode()
+
+        for i, author_nm, timestamp, tz, msg, changes in self.iter_commit_plans():
+
+            ident = f'{author_nm} <{author_nm}@example.com> {timestamp} {tz}'.encode()
+            chunk = [b'commit refs/heads/main\n', b'mark :%d\n' % (i + 1)]
+            chunk += [b'author %s\n' % ident, b'committer %s\n' % ident, data(msg.encode())]
+            if i > 0:
+                chunk.append(b'from :%d\n' % i)
+
+            for kind, path, new_path, is_binary, n_inserted, n_deleted in changes:
+
+                if kind == 'D':
+                    del file_lines[path]
+                    chunk.append(b'D %s\n' % path.encode())
+                    continue
+
+                if kind == 'A':
+                    file_lines[path] = None if is_binary else new_lines(n_inserted)
+                elif kind == 'R':
+                    file_lines[new_path] = edit(file_lines.pop(path), n_inserted, n_deleted)
+                    chunk.append(b'R %s %s\n' % (path.encode(), new_path.encode()))
+                    path = new_path
+                elif not is_binary:
+                    edit(file_lines[path], n_inserted, n_deleted)
+
+                chunk += [b'M 100644 inline %s\n' % path.encode(), data(file_content(path))]
+
+            yield b''.join(chunk)
+
+    def create_repo(self, path_to_repo):
+
+        run(['git', 'init', '-q', path_to_repo], check=True)
+        run(['git', '-C', path_to_repo, 'symbolic-ref', 'HEAD', 'refs/heads/main'], check=True)
+
+        process = Popen(['git', '-C', path_to_repo, 'fast-import', '--quiet'], stdin=PIPE)
+        for chunk in self.iter_fast_import_chunks():
+            process.stdin.write(chunk)
+        process.stdin.close()
+
+        if process.wait() != 0:
+            raise OSError(f'git fast-import failed for {path_to_repo}.')
+
+
+def main():
+
+    parser = ArgumentParser(description='generate a synthetic git history as git log text or as a local repository.')
+    parser.add_argument('output_path', type=str, help='log file (--format log) or repository directory (--format repo)')
+    parser.add_argument('--format', type=str, choices=['log', 'repo'], default='log')
+    parser.add_argument('--n_commits', type=int, default=10_000)
+    parser.add_argument('--n_authors', type=int, default=50)
+    parser.add_argument('--dir_depth', type=int, default=3)
+    parser.add_argument('--rename_rate', type=float, default=0.02)
+    parser.add_argument('--binary_rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    history = SyntheticHistory(
+        args.n_commits, n_authors=args.n_authors, dir_depth=args.dir_depth,
+        rename_rate=args.rename_rate, binary_rate=args.binary_rate, seed=args.seed
+    )
+
+    if args.format == 'log':
+        history.write_log(args.output_path)
+    else:
+        history.create_repo(args.output_path)
+
+
+if __name__ == '__main__':
+    main()
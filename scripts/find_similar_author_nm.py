@@ -2,44 +2,19 @@ from os.path import join
 
 from json import dump
 
-import pandas as pd
-
-from thefuzz import fuzz
+from src.author_nm_deduplication import deduplicate_author_nms
+from src.data_preparation import get_author_nm_counts
 
 CODEBASE_NM = '<codebase_nm>'
+SIMILARITY = 80
+CHUNK_SIZE = 500_000
+JOBS = 1
 
-def compute_author_nm_mapping(sr, threshold=80):
-    mapping = {}  
-    already_processed = set()
-    
-    for _, author_nm in sr.iteritems():
-        
-        if author_nm in already_processed:
-            continue
-        
-        already_processed.add(author_nm)
-        mapping[author_nm] = []
-
-        for _, other_author_nm in sr.iteritems():
-            
-            if other_author_nm == author_nm or other_author_nm in already_processed:
-                continue
-            
-            similarity = fuzz.ratio(author_nm, other_author_nm)
-            if similarity > threshold:
-                mapping[author_nm].append(other_author_nm)
-                already_processed.add(other_author_nm)
-
-        if len(mapping[author_nm]) == 0:
-            del mapping[author_nm]
-    
-    return mapping
-
-
-f_path = join('.', 'data', f'{CODEBASE_NM}_raw_commit.csv')
-sr_author_nm = pd.read_csv(f_path)['author_nm'].drop_duplicates()
-author_nm_mapping = compute_author_nm_mapping(sr_author_nm, threshold=80)
+# proposed mapping of the similar author names, to review before saving it as the author name mapping file
+author_nm_mapping = deduplicate_author_nms(
+    CODEBASE_NM, get_author_nm_counts(CODEBASE_NM, CHUNK_SIZE), SIMILARITY, JOBS
+)
 
 f_path = join('.', 'data', f"{CODEBASE_NM}_author_nm_mapping.json")
 with open(f_path, 'w') as f:
-    dump(author_nm_mapping, f, indent=4)
\ No newline at end of file
+    dump(author_nm_mapping, f, indent=4)
@@ -9,6 +9,7 @@ setup(
             'parse_git=src.git_log_parsing:main',
             'prep_data=src.data_preparation:main',
             'visualize=src.launch_dashboard:main',
+            'run_batch=src.batch_processing:main',
             ],
     }
 )         
\ No newline at end of file
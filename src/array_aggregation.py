@@ -0,0 +1,88 @@
+from numpy import ndarray, bincount, cumsum, errstate, float64, int64, integer, issubdtype, nansum, ones, prod, unique, where, zeros
+from pandas import Index, Series, factorize
+
+
+AGGFUNCS = ['sum', 'count', 'nunique']
+
+
+def get_codes(srs:Series):
+    # integer code of each row (-1 for nulls) & labels of the codes, categoricals are already encoded
+
+    if srs.dtype == 'category':
+        return srs.cat.codes.values, Index(srs.cat.categories)
+
+    codes, labels = factorize(srs)
+    return codes, Index(labels)
+
+
+def get_used_codes(codes:ndarray, labels:Index):
+    # codes & labels restricted to the labels of the rows, the categories of filtered out rows are dropped
+
+    is_used = bincount(codes[codes >= 0], minlength=len(labels)) > 0
+    used_codes = cumsum(is_used) - 1
+
+    return where(codes >= 0, used_codes[codes], -1), labels[is_used]
+
+
+def get_group_codes(entity_codes:list, entity_labels:list):
+    # code of the combination of the entity labels of each row (-1 when one of them is null), its labels & the
+    # number of combinations
+
+    if len(entity_codes) == 1:
+        return entity_codes[0], entity_labels, len(entity_labels[0])
+
+    if prod([len(labels) for labels in entity_labels]) > len(entity_codes[0]): # dense array bigger than the rows
+        entity_codes, entity_labels = zip(*(
+            get_used_codes(codes, labels) for codes, labels in zip(entity_codes, entity_labels)
+        ))
+
+    group_codes = zeros(len(entity_codes[0]), dtype=int64)
+    is_grouped = ones(len(entity_codes[0]), dtype=bool)
+
+    for codes, labels in zip(entity_codes, entity_labels):
+        group_codes = group_codes * len(labels) + codes
+        is_grouped &= codes >= 0
+
+    return where(is_grouped, group_codes, -1), list(entity_labels), int(prod([len(labels) for labels in entity_labels]))
+
+
+def aggregate(group_codes:ndarray, n_groups:int, srs:Series, aggfunc:str):
+    # dense array of the aggregate of srs by group code & mask of the groups holding at least one row
+
+    is_grouped = group_codes >= 0
+    if is_grouped.all(): # no null label, the rows are used as is
+        is_grouped = slice(None)
+
+    grouped_codes = group_codes[is_grouped]
+    is_observed = bincount(grouped_codes, minlength=n_groups) > 0
+
+    if aggfunc == 'sum':
+        aggregated = bincount(
+            grouped_codes, weights=srs.to_numpy(dtype=float64, na_value=0)[is_grouped], minlength=n_groups
+        )
+        if issubdtype(srs.dtype, integer) or srs.dtype == bool:
+            aggregated = aggregated.astype(int64)
+
+    elif aggfunc == 'count':
+        aggregated = bincount(grouped_codes[srs.notna().values[is_grouped]], minlength=n_groups)
+
+    elif aggfunc == 'nunique':
+        value_codes, value_labels = get_codes(srs)
+        value_codes = value_codes[is_grouped]
+        has_value = value_codes >= 0
+        n_values = max(len(value_labels), 1)
+        # each distinct (group, value) pair is counted once for its group
+        pair_codes = unique(grouped_codes[has_value] * n_values + value_codes[has_value])
+        aggregated = bincount(pair_codes // n_values, minlength=n_groups)
+
+    else:
+        raise ValueError(f'Aggregation {aggfunc} is not supported')
+
+    return aggregated, is_observed
+
+
+def normalize(values:ndarray, axis:int) -> ndarray:
+    # shares of the sum along axis, nulls are skipped and an empty sum gives nulls
+
+    with errstate(divide='ignore', invalid='ignore'):
+        return values / nansum(values, axis=axis, keepdims=True)
@@ -0,0 +1,170 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from itertools import repeat
+from math import ceil
+
+from numpy import arange, array, bincount, concatenate, minimum, unique
+from pandas import Series, factorize
+
+from src.utilities import read_state, save_state
+
+logging.basicConfig(
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler()]
+)
+
+logger = logging.getLogger()
+
+STATE_NM = 'author_nm_dedup'
+
+NGRAM_SIZE = 3
+MAX_NGRAM_N_AUTHORS = 200 # n-grams shared by more names (common first names, email domains) don't narrow the candidates
+MIN_SHARED_NGRAM_PROP = 0.5 # of the n-grams of the shortest name of a pair, for it to be scored
+SCORE_BATCH_SIZE = 10_000
+
+
+def normalize_author_nm(author_nm:str) -> str:
+
+    return ' '.join(author_nm.casefold().split())
+
+
+def get_ngrams(author_nm:str) -> set:
+
+    padded_author_nm = f' {author_nm} '
+
+    return {padded_author_nm[i:i + NGRAM_SIZE] for i in range(max(1, len(padded_author_nm) - NGRAM_SIZE + 1))}
+
+
+def get_candidate_pairs(author_nms:list, is_new:array) -> array:
+    # pairs (i, j), i < j, of names sharing enough n-grams, at least one of them new
+    # the pairs are generated from an n-gram -> names index, so names with nothing in common are never compared
+
+    ngrams_by_author = [get_ngrams(author_nm) for author_nm in author_nms]
+    n_ngrams = array([len(ngrams) for ngrams in ngrams_by_author])
+
+    author_idxs = arange(len(author_nms)).repeat(n_ngrams)
+    ngram_codes, _ = factorize(Series([ngram for ngrams in ngrams_by_author for ngram in ngrams], dtype=object))
+
+    # posting lists: names of each n-gram, ascending as the sort is stable
+    filter_kept_ngram = bincount(ngram_codes)[ngram_codes] <= MAX_NGRAM_N_AUTHORS
+    ngram_codes, author_idxs = ngram_codes[filter_kept_ngram], author_idxs[filter_kept_ngram]
+    order = ngram_codes.argsort(kind='stable')
+    ngram_codes, author_idxs = ngram_codes[order], author_idxs[order]
+
+    # the pairs of a posting list are its names & the ones 1, 2, ... positions further in the list
+    pair_keys = []
+    for offset in range(1, MAX_NGRAM_N_AUTHORS):
+        filter_same_ngram = ngram_codes[:-offset] == ngram_codes[offset:]
+        if not filter_same_ngram.any():
+            break
+        firsts, seconds = author_idxs[:-offset][filter_same_ngram], author_idxs[offset:][filter_same_ngram]
+        filter_new = is_new[firsts] | is_new[seconds]
+        pair_keys.append(firsts[filter_new] * len(author_nms) + seconds[filter_new])
+
+    pair_keys, n_shared_ngrams = unique(concatenate(pair_keys or [array([], dtype='int64')]), return_counts=True)
+    firsts, seconds = pair_keys // len(author_nms), pair_keys % len(author_nms)
+
+    filter_candidate = n_shared_ngrams >= MIN_SHARED_NGRAM_PROP * minimum(n_ngrams[firsts], n_ngrams[seconds])
+
+    return array([firsts[filter_candidate], seconds[filter_candidate]]).T
+
+
+def score_pairs(pairs:list, similarity:int) -> list:
+    # similarity in [0, 100] of each (author_nm, other_author_nm), 0 when the cheap upper bounds of the ratio are
+    # already below the min similarity, pairs are grouped by author_nm so its matcher is built once
+
+    matcher, scores = SequenceMatcher(None), []
+
+    for author_nm, other_author_nm in pairs:
+
+        if author_nm != matcher.b:
+            matcher.set_seq2(author_nm)
+        matcher.set_seq1(other_author_nm)
+
+        if 100 * matcher.real_quick_ratio() < similarity or 100 * matcher.quick_ratio() < similarity:
+            scores.append(0)
+        else:
+            scores.append(100 * matcher.ratio())
+
+    return scores
+
+
+def score_pairs_in_parallel(pairs:list, similarity:int, jobs:int) -> list:
+
+    if jobs <= 1 or len(pairs) <= SCORE_BATCH_SIZE:
+        return score_pairs(pairs, similarity)
+
+    batches = [pairs[i * SCORE_BATCH_SIZE:(i + 1) * SCORE_BATCH_SIZE] for i in range(ceil(len(pairs) / SCORE_BATCH_SIZE))]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return [score for scores in executor.map(score_pairs, batches, repeat(similarity)) for score in scores]
+
+
+def group_author_nms(author_nm_counts:Series, matched_pairs:list) -> dict:
+    # names linked by a match are merged into the name with the most commits: {target: [sources]}
+
+    parents = {author_nm: author_nm for author_nm in author_nm_counts.index}
+
+    def find(author_nm):
+        while parents[author_nm] != author_nm:
+            parents[author_nm] = parents[parents[author_nm]]
+            author_nm = parents[author_nm]
+        return author_nm
+
+    for author_nm, other_author_nm in matched_pairs:
+        parents[find(author_nm)] = find(other_author_nm)
+
+    df_group = (
+        author_nm_counts.rename('n_commits').rename_axis('author_nm').reset_index()
+        .assign(group = lambda dfx: [find(author_nm) for author_nm in dfx.author_nm])
+        .loc[lambda dfx: dfx.group.duplicated(keep=False)]
+        .sort_values('n_commits', ascending=False, kind='stable')
+    )
+    df_group['target'] = df_group.groupby('group').author_nm.transform('first')
+
+    return {
+        target: sorted(df_target.author_nm.loc[df_target.author_nm != target])
+        for target, df_target in df_group.groupby('target', sort=False)
+    }
+
+
+def deduplicate_author_nms(codebase_nm:str, author_nm_counts:Series, similarity:int, jobs:int=1) -> dict:
+    # mapping of the similar author names of a codebase, the names already scored & their matches are cached
+    # so that a later run only scores the pairs of the new names
+    logger.info(f"Deduplicating {len(author_nm_counts)} author names of {codebase_nm}.")
+
+    state = read_state(codebase_nm, STATE_NM)
+    if state is None or state['similarity'] != similarity:
+        state = {'similarity': similarity, 'author_nms': [], 'matched_pairs': []}
+
+    scored_author_nms = set(state['author_nms'])
+    author_nms = author_nm_counts.index.tolist()
+    normalized_author_nms = [normalize_author_nm(author_nm) for author_nm in author_nms]
+    is_new = array([author_nm not in scored_author_nms for author_nm in author_nms], dtype=bool)
+
+    matched_pairs = [tuple(pair) for pair in state['matched_pairs']]
+
+    if is_new.any():
+        candidate_pairs = get_candidate_pairs(normalized_author_nms, is_new)
+        logger.info(f"Scoring {len(candidate_pairs)} candidate pairs of {is_new.sum()} new author names.")
+
+        scores = score_pairs_in_parallel(
+            [(normalized_author_nms[i], normalized_author_nms[j]) for i, j in candidate_pairs], similarity, jobs
+        )
+        matched_pairs += [
+            (author_nms[i], author_nms[j]) for (i, j), score in zip(candidate_pairs, scores) if score >= similarity
+        ]
+
+        state['author_nms'] = sorted(scored_author_nms.union(author_nms))
+        state['matched_pairs'] = [list(pair) for pair in matched_pairs]
+        save_state(state, codebase_nm, STATE_NM)
+
+    # names no longer in the history (reparse) are left out
+    matched_pairs = [
+        (author_nm, other_author_nm) for author_nm, other_author_nm in matched_pairs
+        if author_nm in author_nm_counts.index and other_author_nm in author_nm_counts.index
+    ]
+
+    return group_author_nms(author_nm_counts, matched_pairs)
@@ -0,0 +1,117 @@
+import logging
+import sys
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from yaml import load, FullLoader
+
+from src.cmd_chaining import run_cmd
+from src.config_management import instanciate_config_manager, ConfigManager
+
+logging.basicConfig(
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler()]
+)
+
+logger = logging.getLogger()
+
+CMD_NM = 'run_batch'
+BATCH_CMD_NMS = ['parse_git', 'prep_data']
+SHARED_PARAM_NMS = ['incremental', 'jobs', 'backend', 'rename_detection', 'chunk_size', 'author_nm_similarity'] # batch level options applied to every codebase
+
+
+def read_manifest(manifest_path:str) -> list:
+    logger.info(f"Reading batch manifest {manifest_path}.")
+
+    with open(manifest_path, 'r') as f:
+        codebase_specs = load(f, Loader=FullLoader)
+
+    if not isinstance(codebase_specs, list):
+        raise ValueError(f'Manifest {manifest_path} must be a list of codebase specs.')
+
+    return codebase_specs
+
+
+def get_codebase_config_manager(codebase_spec:dict, batch_config_manager:ConfigManager) -> ConfigManager:
+
+    config_manager = ConfigManager()
+    config_manager.set_config_with_cli_args(Namespace(**{
+        param_nm: batch_config_manager[param_nm] for param_nm in SHARED_PARAM_NMS
+    }))
+    config_manager.set_config_with_cli_args(Namespace(**codebase_spec))
+
+    return config_manager
+
+
+def run_codebase_cmds(config_manager:ConfigManager) -> dict:
+    logger.info(f"Processing codebase {config_manager['codebase_nm']}.")
+
+    report = {'codebase_nm': config_manager['codebase_nm'], 'status': 'success'}
+
+    for cmd_nm in BATCH_CMD_NMS:
+
+        start = perf_counter()
+        try:
+            run_cmd(cmd_nm, config_manager)
+        except Exception as e: # a failing codebase must not stop the others
+            logger.exception(f"{cmd_nm} failed for codebase {config_manager['codebase_nm']}.")
+            report['status'] = f'{cmd_nm} failed: {e}'
+            break
+        finally:
+            report[cmd_nm] = perf_counter() - start
+
+    return report
+
+
+def log_timing_summary(reports:list) -> None:
+
+    summary = [f"{'codebase_nm':<30} " + ' '.join(f'{cmd_nm + " (s)":>14}' for cmd_nm in BATCH_CMD_NMS) + '  status']
+
+    for report in reports:
+        durations = ' '.join(
+            f"{report[cmd_nm]:>14.2f}" if cmd_nm in report else f"{'-':>14}"
+            for cmd_nm in BATCH_CMD_NMS
+        )
+        summary.append(f"{report['codebase_nm']:<30} {durations}  {report['status']}")
+
+    logger.info('Batch timing summary:\n' + '\n'.join(summary))
+
+
+def run_batch(config_manager:ConfigManager) -> list:
+
+    codebase_config_managers = [
+        get_codebase_config_manager(codebase_spec, config_manager)
+        for codebase_spec in read_manifest(config_manager['manifest_path'])
+    ]
+
+    logger.info(
+        f"Processing {len(codebase_config_managers)} codebases "
+        f"with at most {config_manager['max_concurrency']} at the same time."
+    )
+
+    with ThreadPoolExecutor(max_workers=config_manager['max_concurrency']) as executor:
+        reports = list(executor.map(run_codebase_cmds, codebase_config_managers))
+
+    log_timing_summary(reports)
+
+    return reports
+
+
+def main() -> None:
+    logger.info("Starting the batch process.")
+
+    config_manager = instanciate_config_manager(CMD_NM)
+    reports = run_batch(config_manager)
+
+    n_failures = sum(report['status'] != 'success' for report in reports)
+    if n_failures > 0:
+        logger.error(f"{n_failures} codebase(s) failed, see the timing summary for details.")
+        sys.exit(1)
+
+    logger.info(f"{len(reports)} codebases successfully processed.")
+
+
+if __name__ == '__main__':
+    main()
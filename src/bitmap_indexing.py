@@ -0,0 +1,118 @@
+from numpy import (
+    arange,
+    argsort,
+    bincount,
+    bitwise_and,
+    bitwise_or,
+    concatenate,
+    cumsum,
+    flatnonzero,
+    intersect1d,
+    ndarray,
+    packbits,
+    searchsorted,
+    sort,
+    uint8,
+    uint32,
+    unpackbits,
+    zeros,
+)
+from pandas import DataFrame
+
+from src.array_aggregation import get_codes
+
+
+DENSE_ROW_SHARE = 1 / 32 # a label holding more rows is stored as a bitmap, smaller than its row positions
+
+
+class BitmapIndex:
+    # rows of each label of the indexed columns, sorted row positions (posting lists) for the labels of a few rows
+    # and packed bitmaps for the others, a selection costs in proportion to the rows of its labels
+
+    def __init__(self, df:DataFrame, col_nms:list):
+
+        self.n_rows = len(df)
+        self.n_bytes = (self.n_rows + 7) // 8
+        self.col_nm_to_label_to_code = {}
+        self.col_nm_to_positions = {}
+        self.col_nm_to_offsets = {}
+        self.col_nm_to_bitmaps = {}
+
+        for col_nm in col_nms:
+            codes, labels = get_codes(df[col_nm])
+
+            # positions of the rows of code c are positions[offsets[c + 1]:offsets[c + 2]], nulls first
+            counts = bincount(codes + 1, minlength=len(labels) + 1)
+            self.col_nm_to_positions[col_nm] = argsort(codes, kind='stable').astype(uint32)
+            self.col_nm_to_offsets[col_nm] = concatenate([[0], cumsum(counts)])
+            self.col_nm_to_label_to_code[col_nm] = {label: code for code, label in enumerate(labels)}
+
+            self.col_nm_to_bitmaps[col_nm] = {
+                code: packbits(codes == code)
+                for code in flatnonzero(counts[1:] > DENSE_ROW_SHARE * self.n_rows)
+            }
+
+    def __get_label_positions(self, col_nm, code):
+
+        offsets = self.col_nm_to_offsets[col_nm]
+        return self.col_nm_to_positions[col_nm][offsets[code + 1]:offsets[code + 2]]
+
+    def __get_col_selection(self, col_nm, labels):
+        # rows holding one of the labels (OR), as sorted positions or as a packed bitmap when they are many
+
+        label_to_code = self.col_nm_to_label_to_code[col_nm]
+        codes = [label_to_code[label] for label in set(labels) if label in label_to_code]
+        bitmaps = self.col_nm_to_bitmaps[col_nm]
+
+        if not any(code in bitmaps for code in codes):
+            return sort(concatenate([self.__get_label_positions(col_nm, code) for code in codes] + [zeros(0, uint32)]))
+
+        bitmap = zeros(self.n_bytes, dtype=uint8)
+        sparse_positions = []
+        for code in codes:
+            if code in bitmaps:
+                bitwise_or(bitmap, bitmaps[code], out=bitmap)
+            else:
+                sparse_positions.append(self.__get_label_positions(col_nm, code))
+
+        if sparse_positions: # the positions of an axis are distinct, the bits of a byte are summed as an OR
+            sparse_positions = concatenate(sparse_positions)
+            bit_values = (128 >> (sparse_positions & 7)).astype(uint8)
+            bitwise_or(bitmap, bincount(sparse_positions >> 3, weights=bit_values, minlength=self.n_bytes).astype(uint8), out=bitmap)
+
+        return bitmap
+
+    def __is_bitmap(self, selection):
+
+        return selection.dtype == uint8
+
+    def get_positions(self, col_nm_to_labels:dict, start:int=0, stop=None) -> ndarray:
+        # sorted positions of the rows within [start, stop) holding one of the labels of every column (AND), None
+        # labels don't filter the column
+
+        stop = self.n_rows if stop is None else stop
+
+        selections = [
+            self.__get_col_selection(col_nm, labels)
+            for col_nm, labels in col_nm_to_labels.items()
+            if labels is not None
+        ]
+
+        positions = None
+        bitmaps = [selection for selection in selections if self.__is_bitmap(selection)]
+        for selection in sorted((selection for selection in selections if not self.__is_bitmap(selection)), key=len):
+            positions = selection if positions is None else intersect1d(positions, selection, assume_unique=True)
+
+        if positions is None and not bitmaps:
+            return arange(start, stop, dtype=uint32)
+
+        if positions is None: # only large selections, ANDed over the bytes of [start, stop)
+            bitmap = bitmaps[0][start // 8:(stop + 7) // 8]
+            for other_bitmap in bitmaps[1:]:
+                bitmap = bitwise_and(bitmap, other_bitmap[start // 8:(stop + 7) // 8])
+            positions = flatnonzero(unpackbits(bitmap)) + (start // 8) * 8
+        else:
+            for bitmap in bitmaps:
+                positions = positions[((bitmap[positions >> 3] >> (7 - (positions & 7))) & 1).astype(bool)]
+
+        return positions[searchsorted(positions, start):searchsorted(positions, stop)].astype(uint32)
@@ -1,8 +1,23 @@
+import logging
 from os import listdir
+from os.path import dirname, exists, join
+from hashlib import sha1
+from time import perf_counter
+import json
 
 from src.config_management import ConfigManager
+from src.utilities import read_state, save_state
+
+logging.basicConfig(
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    handlers=[logging.StreamHandler()]
+)
+
+logger = logging.getLogger()
 
 DATA_PATH = './data'
+STATE_NM = 'stage'
 
 CMD_NM_TO_PRECURSOR_CMD_NM = {
     'visualize':'prep_data',
@@ -11,8 +26,18 @@ CMD_NM_TO_PRECURSOR_CMD_NM = {
 }
 
 CMD_NM_TO_OUTPUT_FORMAT = {
-    'parse_git':'%s_raw_commit.csv',
-    'prep_data':'%s_clean_commit.parquet'
+    'parse_git':'%s_raw_commit',
+    'prep_data':'%s_clean_commit'
+}
+
+# inputs of each stage, a stage reruns when one of them changed since its last run
+CMD_NM_TO_PARAM_NMS = { # params changing the output, not the ones only changing how it is computed (jobs, chunk_size)
+    'parse_git':['path_to_repo', 'backend', 'rename_detection'],
+    'prep_data':['src_path', 'module_depth', 'component_nms', 'component_depth', 'author_nm_similarity']
+}
+CMD_NM_TO_MODULE_NMS = { # code version, the sources of the modules the stage runs
+    'parse_git':['git_log_parsing', 'git_object_store', 'utilities'],
+    'prep_data':['data_preparation', 'commit_file_tagging', 'author_nm_deduplication', 'utilities']
 }
 
 
@@ -24,15 +49,77 @@ def map_cmd_to_func(cmd_nm:str): #to avoid circular import
     elif cmd_nm == 'prep_data':
         from src.data_preparation import prepare_data
         return prepare_data
-        
+
+
+def get_code_version(cmd_nm:str) -> str:
+
+    code_version = sha1()
+    for module_nm in CMD_NM_TO_MODULE_NMS[cmd_nm]:
+        with open(join(dirname(__file__), f'{module_nm}.py'), 'rb') as f:
+            code_version.update(f.read())
+
+    return code_version.hexdigest()
+
+
+def get_cmd_inputs(cmd_nm:str, config_manager:ConfigManager):
+    # inputs read outside of the data folder, None when they can't be read
+
+    if cmd_nm == 'parse_git':
+        from src.git_log_parsing import read_ref_tips
+
+        if config_manager['path_to_repo'] is None:
+            return None
+        return {'ref_tips': read_ref_tips(config_manager['path_to_repo'], config_manager['backend'])}
+
+    from src.data_preparation import get_author_nm_mapping_path
+
+    file_path = get_author_nm_mapping_path(config_manager['codebase_nm'])
+    if not exists(file_path):
+        return {'author_nm_mapping': None}
+
+    with open(file_path, 'rb') as f:
+        return {'author_nm_mapping': sha1(f.read()).hexdigest()}
+
+
+def get_fingerprint(cmd_nm:str, config_manager:ConfigManager, stage_state:dict):
+    # hash of everything the output of the stage depends on, the output of the precursor stage is identified
+    # by the fingerprint of its last run
+
+    cmd_inputs = get_cmd_inputs(cmd_nm, config_manager)
+    if cmd_inputs is None:
+        return None
+
+    precursor_cmd_nm = CMD_NM_TO_PRECURSOR_CMD_NM[cmd_nm]
+    inputs = {
+        **cmd_inputs,
+        'params': {param_nm: config_manager[param_nm] for param_nm in CMD_NM_TO_PARAM_NMS[cmd_nm]},
+        'code_version': get_code_version(cmd_nm),
+        'precursor': stage_state.get(precursor_cmd_nm, {}).get('fingerprint'),
+    }
+
+    return sha1(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
 def run_cmd(cmd_nm:str, config_manager:ConfigManager) -> None:
 
     cmd_func = map_cmd_to_func(cmd_nm)
 
     if not config_manager.check_completion_for(cmd_nm):
         raise ValueError(f'Insuficent arguments for running {cmd_nm}.')
-    else:
-        cmd_func(config_manager)
+
+    codebase_nm = config_manager['codebase_nm']
+
+    # inputs are fingerprinted before the run, a change during the run is picked up by the next one
+    fingerprint = get_fingerprint(cmd_nm, config_manager, read_state(codebase_nm, STATE_NM) or {})
+
+    start = perf_counter()
+    cmd_func(config_manager)
+    duration = perf_counter() - start
+
+    stage_state = read_state(codebase_nm, STATE_NM) or {}
+    stage_state[cmd_nm] = {'fingerprint': fingerprint, 'duration': duration}
+    save_state(stage_state, codebase_nm, STATE_NM)
+
 
 def check_if_command_has_run(cmd_nm, codebase_nm):
 
@@ -40,14 +127,49 @@ def check_if_command_has_run(cmd_nm, codebase_nm):
 
     return cmd_output_nm in listdir(DATA_PATH)
 
-def run_predecessor(cmd_nm, config_manager, first_cmd=True) -> None:
-    precursor_cmd_nm = CMD_NM_TO_PRECURSOR_CMD_NM.get(cmd_nm)
 
-    if precursor_cmd_nm is None:  
+def run_cmd_if_stale(cmd_nm:str, config_manager:ConfigManager) -> None:
+    # the stage reruns when its output is missing or when its fingerprint changed since its last run
+
+    codebase_nm = config_manager['codebase_nm']
+
+    if config_manager['rerun']:
+        logger.info(f"Running {cmd_nm} for {codebase_nm}: rerun forced.")
+        return run_cmd(cmd_nm, config_manager)
+
+    if not check_if_command_has_run(cmd_nm, codebase_nm):
+        logger.info(f"Running {cmd_nm} for {codebase_nm}: no previous output.")
+        return run_cmd(cmd_nm, config_manager)
+
+    if not config_manager.check_completion_for(cmd_nm):
+        logger.info(f"Skipping {cmd_nm} for {codebase_nm}: its arguments aren't given, the previous output is kept.")
+        return
+
+    stage_state = read_state(codebase_nm, STATE_NM) or {}
+    last_run = stage_state.get(cmd_nm)
+    fingerprint = get_fingerprint(cmd_nm, config_manager, stage_state)
+
+    if fingerprint is None:
+        logger.info(f"Skipping {cmd_nm} for {codebase_nm}: its inputs can't be read, the previous output is kept.")
+    elif last_run is None:
+        logger.info(f"Running {cmd_nm} for {codebase_nm}: no fingerprint recorded for the previous output.")
+        run_cmd(cmd_nm, config_manager)
+    elif last_run['fingerprint'] != fingerprint:
+        logger.info(f"Running {cmd_nm} for {codebase_nm}: its inputs changed since its last run.")
         run_cmd(cmd_nm, config_manager)
     else:
-        if config_manager['rerun'] or not check_if_command_has_run(precursor_cmd_nm, config_manager['codebase_nm']):
-            run_predecessor(precursor_cmd_nm, config_manager, first_cmd=False)  
+        logger.info(
+            f"Skipping {cmd_nm} for {codebase_nm}: inputs unchanged since its last run, "
+            f"{last_run['duration']:.1f}s saved."
+        )
+
+
+def run_predecessor(cmd_nm, config_manager, first_cmd=True) -> None:
+    # precursors are brought up to date first, each one is fingerprinted with the output of the previous one
+    precursor_cmd_nm = CMD_NM_TO_PRECURSOR_CMD_NM.get(cmd_nm)
+
+    if precursor_cmd_nm is not None:
+        run_predecessor(precursor_cmd_nm, config_manager, first_cmd=False)
 
-        if first_cmd == False:
-            run_cmd(cmd_nm, config_manager)
\ No newline at end of file
+    if first_cmd == False:
+        run_cmd_if_stale(cmd_nm, config_manager)
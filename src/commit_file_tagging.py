@@ -1,5 +1,8 @@
 from re import sub
 
+from numpy import where
+from pandas import DataFrame, Index, factorize
+
 class CommitFilesTagger:
 
     LANGS = ['py', 'php', 'cpp', 'cs', 'java', 'js', 'ts', 'csproj']
@@ -61,8 +64,7 @@ class CommitFilesTagger:
         df.loc[df['is_src'], 'component_nm'] = (
             df
             .loc[df['is_src']]
-            .file_path.str.split('/', expand=True)
-            .iloc[:,component_struct['depth']]
+            .file_path.str.split('/').str.get(component_struct['depth'])
             .str.extract(component_nms_regex)
             .values
         )
@@ -91,7 +93,7 @@ class CommitFilesTagger:
         df.loc[df.is_src, 'module_nm'] = (
             df.loc[df.is_src]
             # get module nm using file path
-            .file_path.str.split('/', expand=True).iloc[:,self.src_struct['module_depth']]
+            .file_path.str.split('/').str.get(self.src_struct['module_depth'])
             # remove extensions (case where module is at file level)
             .str.replace('(\\.%s)$' % '|\\.'.join(self.LANGS), '', regex=True)
             .values
@@ -100,4 +102,27 @@ class CommitFilesTagger:
         if self.src_struct['component_and_module_aligned']:
             df = self.remove_component_nm_from_module_nm(df)
 
-        return df   
\ No newline at end of file
+        return df
+
+
+    def tag(self, df):
+        # a path shows up in many commits, each distinct path is tagged once & tags are broadcast by path code
+
+        path_codes, file_paths = factorize(df.file_path)
+        if (path_codes < 0).any(): # null paths are tagged as a path of their own
+            path_codes = where(path_codes < 0, len(file_paths), path_codes)
+            file_paths = file_paths.append(Index([None]))
+        df_path = DataFrame({'file_path':file_paths})
+
+        df_path = self.tag_file_ext(df_path)
+        df_path = self.tag_src_file(df_path)
+
+        if self.src_struct['component']['nms'] is not None:
+            df_path = self.tag_component(df_path)
+
+        df_path = self.tag_module(df_path)
+
+        for col_nm in df_path.columns.drop('file_path'):
+            df[col_nm] = df_path[col_nm].values.take(path_codes)
+
+        return df
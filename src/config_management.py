@@ -14,7 +14,8 @@ class CLIArgumentParser:
     _CMD_NM_TO_DESC = {
         'parse_git':'parse the git log of a codebase into a tabular format.',
         'prep_data':'clean, format & enrich parsed log.',
-        'visualize':'parse the git log of a codebase into a tabular format'
+        'visualize':'parse the git log of a codebase into a tabular format',
+        'run_batch':'parse & prepare the git log of several codebases listed in a manifest.'
     }
 
     _ARGS_SPEC = {
@@ -88,6 +89,98 @@ class CLIArgumentParser:
                 'option':['visualize']
             },
         },
+        'manifest_path':{
+            'type':str,
+            'nargs':None,
+            'help':'path to the yaml manifest listing the codebases (codebase_nm, path_to_repo, src_path, module_depth, ...)',
+            'flags':[],
+            'arg_type_to_cmds':{
+                'required':['run_batch'],
+                'option':[]
+            },
+        },
+        'max_concurrency':{
+            'type':int,
+            'nargs':None,
+            'help':'max number of codebases processed at the same time',
+            'flags':['--max_concurrency', '-mc'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['run_batch']
+           },
+        },
+        'incremental':{
+            'type':bool,
+            'nargs':None,
+            'help':'only parse the commits added since the last parse of the codebase',
+            'flags':['--incremental', '-i'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['parse_git', 'visualize', 'run_batch']
+           },
+        },
+        'jobs':{
+            'type':int,
+            'nargs':None,
+            'help':'number of processes scoring similar author names in parallel',
+            'flags':['--jobs', '-j'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['prep_data', 'visualize', 'run_batch']
+           },
+        },
+        'rename_detection':{
+            'type':str,
+            'nargs':None,
+            'choices':['none', 'renames', 'copies'],
+            'help':'renames & copies detected in the git log: none (fastest), renames (-M) or copies (-M -C, slowest)',
+            'flags':['--rename_detection', '-rd'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['parse_git', 'visualize', 'run_batch']
+           },
+        },
+        'backend':{
+            'type':str,
+            'nargs':None,
+            'choices':['cli', 'object_store'],
+            'help':'how the git history is read: git log subprocess (cli) or directly from .git/objects (object_store)',
+            'flags':['--backend', '-b'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['parse_git', 'visualize', 'run_batch']
+           },
+        },
+        'chunk_size':{
+            'type':int,
+            'nargs':None,
+            'help':'max nb of commit file rows prepared at once by prep_data, bounds its peak memory',
+            'flags':['--chunk_size', '-cs'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['prep_data', 'visualize', 'run_batch']
+           },
+        },
+        'author_nm_similarity':{
+            'type':int,
+            'nargs':None,
+            'help':'min similarity (0-100) of the author names merged by prep_data, no automatic merging when unset',
+            'flags':['--author_nm_similarity', '-as'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['prep_data', 'visualize', 'run_batch']
+           },
+        },
+        'n_months':{
+            'type':int,
+            'nargs':None,
+            'help':'only load the commits of the last n months holding commits',
+            'flags':['--n_months', '-nm'],
+            'arg_type_to_cmds':{
+                'required':[],
+                'option':['visualize']
+           },
+        },
         'rerun':{
             'type':bool,
             'nargs':None,
@@ -133,7 +226,8 @@ class ConfigManager(dict):
     _CMD_NM_TO_REQUIRED_PARAM_NMS = {
         'parse_git':['codebase_nm', 'path_to_repo'],
         'prep_data':['codebase_nm', 'src_path', 'module_depth'],
-        'visualize':['codebase_nm', 'has_components']
+        'visualize':['codebase_nm', 'has_components'],
+        'run_batch':['manifest_path']
     }
 
     codebase_nm = None
@@ -143,17 +237,24 @@ class ConfigManager(dict):
     component_nms = None
     component_depth = None
     has_components = None
+    manifest_path = None
 
+    max_concurrency = 4
+    incremental = False
+    jobs = 1
+    backend = 'cli'
+    rename_detection = 'copies'
     rerun = False
+    n_months = None
+    chunk_size = 500_000
+    author_nm_similarity = None
 
     def set_config_with_cli_args(self, args:Namespace) -> None:
 
         args = vars(args)
         for arg_nm, arg_val in args.items():
-            try:
+            if arg_val is not None: # unset options keep their default value
                 setattr(self, arg_nm, arg_val)
-            except TypeError: #if arg_val is NoneType
-                pass
 
     def check_completion_for(self, cmd_nm:str):
 
@@ -1,13 +1,40 @@
+from os import makedirs
 from os.path import join
+from shutil import rmtree
 import json
 import logging
 
-from pandas import to_datetime
+from numpy import arange, concatenate, full, isin, searchsorted, unique, where
+from pandas import to_datetime, concat, factorize, DataFrame, Index, Series
+from pandas.api.extensions import take
 
+from src.author_nm_deduplication import deduplicate_author_nms
 from src.commit_file_tagging import CommitFilesTagger
 from src.config_management import instanciate_config_manager
-from src.cmd_chaining import run_predecessor
-from src.utilities import read_raw, save_cleaned
+from src.cmd_chaining import run_predecessor, run_cmd
+from src.git_log_parsing import get_file_renames
+from src.utilities import (
+    read_raw,
+    iter_raw,
+    has_raw,
+    is_raw_schema_current,
+    get_raw_fingerprints,
+    save_cleaned,
+    CleanedDatasetWriter,
+    has_cleaned,
+    get_cleaned_dir_path,
+    get_cleaned_months,
+    get_cleaned_part_paths,
+    get_cleaned_fingerprints,
+    get_aggregated,
+    get_time_bucket_idxs,
+    has_cleaned_col_nms,
+    FREQ_TO_TIME_BUCKET_COL_NM,
+    read_cleaned_parts,
+    write_cleaned_part,
+    read_state,
+    save_state
+)
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -18,12 +45,24 @@ logging.basicConfig(
 logger = logging.getLogger()
 
 CMD_NM = 'prep_data'
+STATE_NM = 'clean'
+
+TAGGING_CONFIG_NMS = ['src_path', 'module_depth', 'component_nms', 'component_depth']
+TAG_COL_NMS = ['ext', 'is_src', 'component_nm', 'module_nm']
+DENORMALIZED_COL_NMS = ['author_nm', 'creation_dt']
+ROLLUP_DIM_NMS = ['author_nm', 'module_nm', 'component_nm', 'ext', 'is_src'] # the analysis axes of the dashboard
+ROLLUP_MESURE_NMS = ['n_lines_inserted', 'n_lines_deleted']
+
+
+def get_author_nm_mapping_path(codebase_nm):
 
+    return join('data', f'{codebase_nm}_author_nm_mapping.json')
 
-def apply_author_nm_merging(df_commit, codebase_nm):
-    logger.info(f"Attempting to apply author name merging for {codebase_nm}.")
+
+def load_author_nm_mapping(codebase_nm):
+    logger.info(f"Attempting to load the author name mapping of {codebase_nm}.")
     
-    file_path = join('data', f'{codebase_nm}_author_nm_mapping.json')
+    file_path = get_author_nm_mapping_path(codebase_nm)
 
     try:
         with open(file_path) as f:
@@ -32,18 +71,102 @@ def apply_author_nm_merging(df_commit, codebase_nm):
     
     except FileNotFoundError:
         logger.warning(f"File {file_path} not found. Skipping author name merging.")
-        return df_commit
+        return None
     
     except json.JSONDecodeError:
         logger.error(f"The file '{file_path}' is not a valid JSON.")
         raise ValueError("The file 'config/author_nm_merging.json' is not a valid JSON.")
 
-    author_nm_mapping = {source: target for target, sources in author_nm_mapping.items() for source in sources}
-    df_commit['author_nm'] = df_commit['author_nm'].replace(author_nm_mapping)
+    return author_nm_mapping
+
+
+def get_author_nm_targets(author_nm_mapping):
+    # {target: [sources]} -> {source: target}
+
+    if author_nm_mapping is None:
+        return {}
+
+    return {source: target for target, sources in author_nm_mapping.items() for source in sources}
+
+
+def get_author_nm_counts(codebase_nm, chunk_size):
+    # nb of commits of each raw author name
+
+    author_nm_counts = [
+        df_commit.author_nm.value_counts() for df_commit in iter_raw(codebase_nm, 'commit', chunk_size, ['author_nm'])
+    ]
+    if not author_nm_counts:
+        return Series(dtype='int64')
+
+    return concat(author_nm_counts).groupby(level=0).sum()
+
+
+def merge_author_nm_mappings(author_nm_mapping, dedup_author_nm_mapping):
+    # the merges of the mapping file take precedence over the automatic ones
+
+    manual_targets = get_author_nm_targets(author_nm_mapping)
+    targets = {
+        source: manual_targets.get(target, target)
+        for source, target in get_author_nm_targets(dedup_author_nm_mapping).items()
+    }
+    targets.update(manual_targets)
+    targets = {source: targets.get(target, target) for source, target in targets.items()} # target merged itself
+
+    merged_author_nm_mapping = {}
+    for source, target in sorted(targets.items()):
+        if source != target:
+            merged_author_nm_mapping.setdefault(target, []).append(source)
+
+    return merged_author_nm_mapping
+
+
+def get_author_nm_mapping(config_manager):
+
+    codebase_nm = config_manager['codebase_nm']
+    author_nm_mapping = load_author_nm_mapping(codebase_nm)
+
+    if config_manager['author_nm_similarity'] is None:
+        return author_nm_mapping
+
+    dedup_author_nm_mapping = deduplicate_author_nms(
+        codebase_nm,
+        get_author_nm_counts(codebase_nm, config_manager['chunk_size']),
+        config_manager['author_nm_similarity'],
+        config_manager['jobs']
+    )
+    logger.info(f"{sum(map(len, dedup_author_nm_mapping.values()))} author names merged automatically.")
+
+    return merge_author_nm_mappings(author_nm_mapping, dedup_author_nm_mapping)
+
+
+def apply_author_nm_merging(df_commit, author_nm_mapping):
+
+    if author_nm_mapping is None:
+        return df_commit
+
+    df_commit['author_nm'] = df_commit['author_nm'].replace(get_author_nm_targets(author_nm_mapping))
 
     return df_commit
 
 
+def extends_author_nm_mapping(codebase_nm, prepared_author_nm_mapping, author_nm_mapping):
+    # the prepared commits stay valid when the prepared merges are kept & the new merges only take names
+    # not in the prepared commits, ex: the new authors matched by the deduplication
+
+    if prepared_author_nm_mapping == author_nm_mapping:
+        return True
+
+    prepared_targets = get_author_nm_targets(prepared_author_nm_mapping)
+    targets = get_author_nm_targets(author_nm_mapping)
+
+    if any(targets.get(source) != target for source, target in prepared_targets.items()):
+        return False
+
+    new_sources = [source for source in targets if source not in prepared_targets]
+    prepared_author_nms = read_cleaned_parts(get_cleaned_part_paths(codebase_nm, 'commit'), col_nms=['author_nm']).author_nm
+
+    return not prepared_author_nms.isin(new_sources).any()
+
 
 def tag_commit_file(df_commit_file, config_manager):
     logger.info("Tagging commit files based on configuration.")
@@ -55,15 +178,7 @@ def tag_commit_file(df_commit_file, config_manager):
         config_manager['component_depth'],
     )
     
-    df_commit_file = commits_files_tagger.tag_file_ext(df_commit_file)
-    df_commit_file = commits_files_tagger.tag_src_file(df_commit_file)
-    
-    if config_manager['component_nms'] is not None:
-        df_commit_file = commits_files_tagger.tag_component(df_commit_file)
-
-    df_commit_file = commits_files_tagger.tag_module(df_commit_file)
-
-    return df_commit_file
+    return commits_files_tagger.tag(df_commit_file)
 
 
 def handle_root_files(df_file_path_mapping):
@@ -83,38 +198,13 @@ def set_new_file_path_on_update(df_commit_file, df_file_path_mapping):
     return df_commit_file
 
 
-def handle_multi_renaming(df_file_path_mapping):
-
-    return (
-        df_file_path_mapping
-        .drop_duplicates()
-        .merge(
-            df_file_path_mapping,
-            left_on='new',
-            right_on='old',
-            how='left'
-        )
-        .drop(columns='old_y')
-        .rename(columns={'old_x':'old', 'new_x':'old_new', 'new_y':'new'})
-        .assign(new = lambda dfy: dfy.new.fillna(dfy.old_new))
-        [['old', 'new']]
-    )
-
-
-def get_mapping_as_dict(df_file_path_mapping):
-
-    return {v[0]:v[1] for _, v in df_file_path_mapping.iterrows()}
-
-
-def handle_file_renaming(df_commit_file):
+def extract_file_path_mapping(df_commit_file):
+    # for raw data parsed without rename table, renames are read back from the {old => new} file paths
 
     REGEX_FILE_PATH_UPDATE = r'([A-z\./0-9\-_]*){{0,1}([A-z\./0-9\-_]*) => ([A-z\./0-9\-_]*)}{0,1}([A-z\./0-9\-_]*)'
 
     filter_file_path_update = df_commit_file.file_path.str.contains(' => ')
 
-    if filter_file_path_update.sum() == 0:
-        return df_commit_file
-
     df_file_path_mapping = (
         df_commit_file
         .loc[filter_file_path_update]
@@ -127,7 +217,7 @@ def handle_file_renaming(df_commit_file):
 
     df_file_path_mapping = handle_root_files(df_file_path_mapping)
 
-    df_file_path_mapping = (
+    return (
         df_file_path_mapping
         .assign(
             old = lambda dfx: (dfx.prefix + dfx.old + dfx.suffix).str.replace('//', '/'),
@@ -136,47 +226,254 @@ def handle_file_renaming(df_commit_file):
         [['old', 'new']]
     )
 
-    df_commit_file = set_new_file_path_on_update(df_commit_file, df_file_path_mapping)
 
-    df_file_path_mapping = handle_multi_renaming(df_file_path_mapping)
+def get_file_path_mapping(df_commit_file, df_file_rename):
+    # rename table cached by parse_git, indexed as the commit_file rows it describes
 
-    file_path_mapping = get_mapping_as_dict(df_file_path_mapping)
-    df_commit_file['file_path'] = df_commit_file.file_path.replace(file_path_mapping)
+    return (
+        df_commit_file[['commit_idx', 'file_path']]
+        .reset_index()
+        .merge(df_file_rename.drop_duplicates(['commit_idx', 'file_path']), on=['commit_idx', 'file_path'])
+        .set_index('index')
+        .rename(columns={'old_path':'old', 'new_path':'new'})
+        [['old', 'new']]
+    )
 
-    return df_commit_file
 
+def get_commit_rank(df_commit_file):
+    # chronological rank of the commit of each row, rows are in git log order (newest commit first)
 
-def denormalize(df_commit_file, df_commit, col_nms):
+    commit_codes, commit_idxs = factorize(df_commit_file.commit_idx)
 
-    return (
-        df_commit_file
-        .merge(
-            df_commit[['id'] + col_nms],
-            left_on = 'commit_id',
-            right_on = 'id',
-            how = 'left',
-            validate='m:1'
+    return len(commit_idxs) - 1 - commit_codes
+
+
+def get_path_segments(path_codes_old, path_codes_new, ranks, n_path_times):
+    # the history of a renamed path is cut into segments each holding a single file, a path is cut when a
+    # file is renamed to it (at 2 * rank) or away from it (at 2 * rank + 1, its rows of that commit
+    # still belong to the renamed file), the segment starting at -1 holds the file the path had at first
+    # segments are identified by path_code * n_path_times + time + 1, sorted
+
+    keys_new = path_codes_new * n_path_times + 2 * ranks + 1
+    keys_old = path_codes_old * n_path_times + 2 * ranks + 2
+    keys_old = keys_old[~isin(keys_old - 1, keys_new)] # a file renamed to the path in the same commit already cuts it
+    keys_first = unique(concatenate([path_codes_old, path_codes_new])) * n_path_times
+
+    return unique(concatenate([keys_first, keys_new, keys_old]))
+
+
+def get_segments(segment_keys, path_codes, times, n_path_times, allow_exact_matches=True):
+    # segment holding each (path, time), every path has a segment starting before any time
+
+    return searchsorted(
+        segment_keys,
+        path_codes * n_path_times + times + 1,
+        side='right' if allow_exact_matches else 'left'
+    ) - 1
+
+
+class RenamedFilePathResolver:
+    # renames link the segment holding a file before it gets renamed to the one starting with its new path,
+    # following the links gives the last path of each file, including when a path is renamed back or reused
+    # only the renames are held, rows are resolved afterwards (possibly by batches) from their path & commit rank
+
+    def __init__(self, df_rename, n_ranks):
+        # df_rename: old & new path of each rename, rank of its commit
+
+        df_rename = (
+            df_rename
+            .dropna()
+            .loc[lambda dfx: dfx.old != dfx.new]
+            .drop_duplicates(['old', 'rank']) # a copy & a rename of the same file, the first one is followed
+        )
+
+        path_codes, paths = factorize(concat([df_rename.old, df_rename.new]))
+        path_codes_old, path_codes_new = path_codes[:len(df_rename)], path_codes[len(df_rename):]
+        ranks = df_rename['rank'].values.astype('int64')
+
+        self.n_renames = len(df_rename)
+        self.n_path_times = 2 * n_ranks + 1
+        self.paths = Index(paths)
+        self.segment_keys = get_path_segments(path_codes_old, path_codes_new, ranks, self.n_path_times)
+
+        source_segments = get_segments(self.segment_keys, path_codes_old, 2 * ranks, self.n_path_times, allow_exact_matches=False)
+        target_segments = get_segments(self.segment_keys, path_codes_new, 2 * ranks, self.n_path_times)
+
+        # pointer jumping, links go forward in time so there is no cycle
+        next_segments = arange(len(self.segment_keys))
+        next_segments[source_segments] = target_segments
+        while True:
+            next_next_segments = next_segments[next_segments]
+            if (next_next_segments == next_segments).all():
+                break
+            next_segments = next_next_segments
+
+        self.last_paths = paths.take(self.segment_keys[next_segments] // self.n_path_times)
+
+    def resolve(self, file_paths, ranks):
+        # last path of the file of each row
+
+        file_paths = file_paths.copy()
+
+        row_path_codes = self.paths.get_indexer(file_paths)
+        filter_renamed_path = row_path_codes != -1
+        row_segments = get_segments(
+            self.segment_keys,
+            row_path_codes[filter_renamed_path],
+            2 * ranks[filter_renamed_path].astype('int64'),
+            self.n_path_times
         )
-        .drop(columns='id')
+        file_paths[filter_renamed_path] = self.last_paths[row_segments]
+
+        return file_paths
+
+
+def resolve_renamed_file_paths(df_commit_file, df_file_path_mapping):
+
+    row_ranks = get_commit_rank(df_commit_file)
+
+    resolver = RenamedFilePathResolver(
+        df_file_path_mapping.assign(rank = lambda dfx: row_ranks[df_commit_file.index.get_indexer(dfx.index)]),
+        row_ranks.max() + 1
     )
 
+    if resolver.n_renames == 0:
+        return df_commit_file
+
+    df_commit_file['file_path'] = resolver.resolve(df_commit_file.file_path.values, row_ranks)
+
+    return df_commit_file
+
+
+def handle_file_renaming(df_commit_file, df_file_rename=None):
+    # rows of df_commit_file are in git log order (newest commit first)
+
+    if df_file_rename is None:
+        df_file_path_mapping = extract_file_path_mapping(df_commit_file)
+    else:
+        df_file_path_mapping = get_file_path_mapping(df_commit_file, df_file_rename)
+
+    if len(df_file_path_mapping) == 0:
+        return df_commit_file
+
+    df_commit_file = set_new_file_path_on_update(df_commit_file, df_file_path_mapping)
+
+    return resolve_renamed_file_paths(df_commit_file, df_file_path_mapping)
+
+
+def handle_file_renaming_since_snapshot(df_commit_file, df_file_rename=None):
+    # df_commit_file holds the rows parsed since the last prepared snapshot, the paths renamed in it that
+    # were there before get a row at a pseudo commit older than the others, the path it ends up with is the
+    # last path of the file the snapshot knew under that path
+
+    if df_file_rename is None:
+        old_file_paths = extract_file_path_mapping(df_commit_file).old
+    else:
+        old_file_paths = df_file_rename.old_path
+    old_file_paths = old_file_paths.dropna().unique()
+
+    df_file_path = handle_file_renaming(
+        concat(
+            [df_commit_file[['commit_idx', 'file_path']], DataFrame({'commit_idx': -1, 'file_path': old_file_paths})],
+            ignore_index=True
+        ),
+        df_file_rename
+    )
+
+    df_commit_file['file_path'] = df_file_path.file_path.values[:len(df_commit_file)]
+    last_file_paths = df_file_path.file_path.values[len(df_commit_file):]
+
+    file_path_mapping = {
+        old_file_path: last_file_path
+        for old_file_path, last_file_path in zip(old_file_paths, last_file_paths)
+        if old_file_path != last_file_path
+    }
+
+    return df_commit_file, file_path_mapping
+
+
+def has_reused_renamed_path(codebase_nm, file_path_mapping, new_commit_idxs, chunk_size):
+    # a prepared path that was the target of a rename may hold the rows of the file it replaced, a full rebuild
+    # only moves the rows of the last file of the path when it is renamed
+
+    df_file_rename = read_all_file_renames(codebase_nm, chunk_size)
+    df_file_rename = df_file_rename.loc[~df_file_rename.commit_idx.isin(new_commit_idxs)]
+
+    return df_file_rename.new_path.isin(list(file_path_mapping)).any()
+
+
+def remap_prepared_file_paths(codebase_nm, file_path_mapping, config_manager):
+    # prepared parts holding renamed paths are rewritten with the last paths & retagged, each renamed path only
+    # holds the rows of a single file (see has_reused_renamed_path)
+
+    for part_path in get_cleaned_part_paths(codebase_nm, 'commit_file'):
+
+        df_commit_file = read_cleaned_parts([part_path])
+        if not df_commit_file.file_path.isin(list(file_path_mapping)).any():
+            continue
+
+        col_nms = df_commit_file.columns
+        df_commit_file = (
+            df_commit_file
+            .drop(columns=[col_nm for col_nm in TAG_COL_NMS if col_nm in col_nms])
+            .assign(file_path = lambda dfx: dfx.file_path.astype(object).replace(file_path_mapping))
+        )
+        df_commit_file = tag_commit_file(df_commit_file, config_manager)[col_nms]
+
+        write_cleaned_part(cast_to_ref_types(df_commit_file), part_path)
+
+
+def get_commit_positions(commit_idxs, df_commit):
+    # position in df_commit of the commit of each row, -1 for an unknown commit, commit ids are dense
+    # integers so the lookup is an array indexed by id
+
+    commit_idxs = commit_idxs.astype('int64')
+
+    idx_to_position = full(int(df_commit.idx.max()) + 1 if len(df_commit) else 1, -1)
+    idx_to_position[df_commit.idx.values] = arange(len(df_commit))
+
+    filter_known = (commit_idxs >= 0) & (commit_idxs < len(idx_to_position))
+
+    return where(filter_known, idx_to_position[where(filter_known, commit_idxs, 0)], -1)
+
+
+def denormalize(df_commit_file, df_commit, col_nms, commit_positions=None):
+    # rows of unknown commits get nulls, the columns df_commit_file already holds are not joined again
+
+    col_nms = [col_nm for col_nm in col_nms if col_nm not in df_commit_file.columns]
+    if not col_nms:
+        return df_commit_file
+
+    if commit_positions is None:
+        commit_positions = get_commit_positions(df_commit_file.commit_idx.values, df_commit)
+
+    return df_commit_file.assign(**{
+        col_nm: take(df_commit[col_nm].values, commit_positions, allow_fill=True) for col_nm in col_nms
+    })
+
 
 def cast_to_ref_types(df):
 
     VAR_NM_TO_REF_TYPE = {
-        'id':'string',
+        'id':'category',
+        'idx':'uint32',
         'creation_dt':'datetime69[ns]',
         'msg':'string',
-        'author_nm':'string',
-        'file_path':'string',
+        'author_nm':'category',
+        'file_path':'category',
         'n_lines_inserted':'uint32',
         'n_lines_deleted':'uint32',
-        'commit_id':'string',
-        'ext':'string',
+        'commit_idx':'uint32',
+        'ext':'category',
         'is_src':'bool',
         'is_test':'bool',
-        'module_nm':'string',
-        'component_nm':'string'
+        'module_nm':'category',
+        'component_nm':'category',
+        'day_idx':'int32',
+        'week_idx':'int32',
+        'month_idx':'int32',
+        'quarter_idx':'int32',
+        'year_idx':'int32'
     }
 
     for col_nm in df.columns:
@@ -192,21 +489,220 @@ def cast_to_ref_types(df):
 
 
 
-def prepare_data(config_manager) -> None:
-    logger.info(f"Preparing data for codebase {config_manager['codebase_nm']}.")
+def prepare_commit(df_commit, author_nm_mapping):
 
-    df_commit = read_raw(config_manager['codebase_nm'], 'commit')
     df_commit = cast_to_ref_types(df_commit)
-    df_commit = apply_author_nm_merging(df_commit, config_manager['codebase_nm'])
-    
-    df_commit_file = read_raw(config_manager['codebase_nm'], 'commit_file')
-    df_commit_file = handle_file_renaming(df_commit_file)
+
+    return apply_author_nm_merging(df_commit, author_nm_mapping)
+
+
+def add_time_bucket_idxs(df):
+    # the dashboard aggregates by these ids instead of resampling the timestamps
+
+    return df.assign(**get_time_bucket_idxs(df.creation_dt))
+
+
+def prepare_commit_file(df_commit_file, df_commit, config_manager):
+
     df_commit_file = tag_commit_file(df_commit_file, config_manager)
-    df_commit_file = denormalize(df_commit_file, df_commit, ['author_nm', 'creation_dt'])
-    df_commit_file = cast_to_ref_types(df_commit_file)
+    df_commit_file = denormalize(df_commit_file, df_commit, DENORMALIZED_COL_NMS)
+
+    return add_time_bucket_idxs(cast_to_ref_types(df_commit_file))
+
+
+def get_new_raw_part_nms(codebase_nm, clean_state, raw_fingerprints, tagging_config, author_nm_mapping):
+    # raw parts parsed since the last prepared snapshot, None when the snapshot has to be rebuilt
+
+    if clean_state is None or not (has_cleaned(codebase_nm, 'commit') and has_cleaned(codebase_nm, 'commit_file')):
+        return None
+
+    if clean_state['tagging_config'] != tagging_config:
+        return None
+
+    if not has_cleaned_col_nms(codebase_nm, 'commit_file', list(set(FREQ_TO_TIME_BUCKET_COL_NM.values()))):
+        return None # prepared by a version without the time bucket ids
+
+    if not extends_author_nm_mapping(codebase_nm, clean_state['author_nm_mapping'], author_nm_mapping):
+        return None
+
+    if set(clean_state['raw_fingerprints']) != set(raw_fingerprints):
+        return None
+
+    new_part_nms = {}
+    for log_level, part_fingerprints in raw_fingerprints.items():
+
+        prepared_part_fingerprints = clean_state['raw_fingerprints'][log_level]
+        if any(part_fingerprints.get(part_nm) != fingerprint for part_nm, fingerprint in prepared_part_fingerprints.items()):
+            return None # reparsed
 
-    save_cleaned(df_commit, config_manager['codebase_nm'], 'commit')
-    save_cleaned(df_commit_file, config_manager['codebase_nm'], 'commit_file')
+        new_part_nms[log_level] = [part_nm for part_nm in part_fingerprints if part_nm not in prepared_part_fingerprints]
+
+    return new_part_nms
+
+
+def prepare_all_commits(codebase_nm, author_nm_mapping, chunk_size):
+    # commits are prepared by chunks, only their integer id & the columns denormalized in commit_file are
+    # kept, in git log order
+
+    df_commit_lookups = []
+
+    with CleanedDatasetWriter(codebase_nm, 'commit') as writer:
+        for df_commit in iter_raw(codebase_nm, 'commit', chunk_size):
+            df_commit = prepare_commit(df_commit, author_nm_mapping)
+            writer.write(df_commit)
+            df_commit_lookups.append(df_commit[['idx'] + DENORMALIZED_COL_NMS])
+
+    return concat(df_commit_lookups, ignore_index=True).astype({'author_nm': 'category'})
+
+
+def read_all_file_renames(codebase_nm, chunk_size):
+    # renames are a small share of the commit_file rows, they are all held in memory
+
+    if has_raw(codebase_nm, 'file_rename'):
+        return read_raw(codebase_nm, 'file_rename')
+
+    # not there for data parsed by older versions, renames are read back from the {old => new} file paths
+    return concat(
+        [get_file_renames(df) for df in iter_raw(codebase_nm, 'commit_file', chunk_size, ['commit_idx', 'file_path'])],
+        ignore_index=True
+    )
+
+
+def prepare_all_data(config_manager, author_nm_mapping) -> None:
+    # commit_file is streamed by chunks of at most chunk_size rows, bounding the peak memory, only the commits
+    # lookup & the renames are held for the whole history
+    logger.info(f"Preparing all the parsed commits, by chunks of {config_manager['chunk_size']} rows.")
+
+    codebase_nm = config_manager['codebase_nm']
+    chunk_size = config_manager['chunk_size']
+
+    df_commit = prepare_all_commits(codebase_nm, author_nm_mapping, chunk_size)
+
+    df_file_rename = read_all_file_renames(codebase_nm, chunk_size).drop_duplicates(['commit_idx', 'file_path'])
+    commit_ranks = len(df_commit) - 1 - get_commit_positions(df_file_rename.commit_idx.values, df_commit)
+    resolver = RenamedFilePathResolver(
+        df_file_rename.rename(columns={'old_path':'old', 'new_path':'new'}).assign(rank = commit_ranks)[['old', 'new', 'rank']],
+        len(df_commit)
+    )
+
+    with CleanedDatasetWriter(codebase_nm, 'commit_file') as writer:
+        for df_commit_file in iter_raw(codebase_nm, 'commit_file', chunk_size):
+
+            commit_positions = get_commit_positions(df_commit_file.commit_idx.values, df_commit)
+
+            df_commit_file = set_new_file_path_on_update(df_commit_file, get_file_path_mapping(df_commit_file, df_file_rename))
+            df_commit_file['file_path'] = resolver.resolve(df_commit_file.file_path.values, len(df_commit) - 1 - commit_positions)
+
+            df_commit_file = tag_commit_file(df_commit_file, config_manager)
+            df_commit_file = denormalize(df_commit_file, df_commit, DENORMALIZED_COL_NMS, commit_positions)
+            writer.write(add_time_bucket_idxs(cast_to_ref_types(df_commit_file)))
+
+
+def prepare_new_data(config_manager, author_nm_mapping, new_part_nms) -> None:
+    logger.info(f"Preparing the commits of the raw parts {', '.join(new_part_nms['commit'])}.")
+
+    codebase_nm = config_manager['codebase_nm']
+
+    df_commit = prepare_commit(read_raw(codebase_nm, 'commit', new_part_nms['commit']), author_nm_mapping)
+
+    df_commit_file = read_raw(codebase_nm, 'commit_file', new_part_nms['commit_file'])
+    df_file_rename = None
+    if has_raw(codebase_nm, 'file_rename'):
+        df_file_rename = read_raw(codebase_nm, 'file_rename', new_part_nms['file_rename'])
+    df_commit_file, file_path_mapping = handle_file_renaming_since_snapshot(df_commit_file, df_file_rename)
+
+    chunk_size = config_manager['chunk_size']
+    if file_path_mapping and has_reused_renamed_path(codebase_nm, file_path_mapping, df_commit.idx, chunk_size):
+        logger.info("A renamed file path was the target of a previous rename, preparing all the parsed commits.")
+        return prepare_all_data(config_manager, author_nm_mapping)
+
+    if file_path_mapping:
+        logger.info(f"Moving the prepared rows of {len(file_path_mapping)} renamed file path(s).")
+        remap_prepared_file_paths(codebase_nm, file_path_mapping, config_manager)
+
+    df_commit_file = prepare_commit_file(df_commit_file, df_commit, config_manager)
+
+    save_cleaned(df_commit, codebase_nm, 'commit', append=True)
+    save_cleaned(df_commit_file, codebase_nm, 'commit_file', append=True)
+
+
+def get_rollup(df_commit_file):
+    # commit_file rows summed by day & dimensions, n_rows counts the rows of each cell
+
+    dim_nms = [col_nm for col_nm in ROLLUP_DIM_NMS if col_nm in df_commit_file.columns]
+
+    return add_time_bucket_idxs(get_aggregated(
+        df_commit_file.assign(creation_dt = lambda dfx: dfx.creation_dt.dt.floor('D')),
+        ['creation_dt'] + dim_nms,
+        **{mesure_nm: (mesure_nm, 'sum') for mesure_nm in ROLLUP_MESURE_NMS},
+        n_rows=(ROLLUP_MESURE_NMS[0], 'size')
+    ))
+
+
+def update_rollup(codebase_nm, rollup_fingerprints):
+    # months of the rollup are rebuilt from the commit_file parts written since it was last built, returns the
+    # fingerprints of the commit_file parts the rollup is now built from
+
+    commit_file_fingerprints = get_cleaned_fingerprints(codebase_nm, 'commit_file')
+    rollup_dir_path = get_cleaned_dir_path(codebase_nm, 'rollup')
+
+    for month in get_cleaned_months(codebase_nm, 'rollup'):
+        if month not in commit_file_fingerprints:
+            rmtree(join(rollup_dir_path, f'month={month}'))
+
+    stale_months = [
+        month for month, fingerprint in commit_file_fingerprints.items()
+        if rollup_fingerprints.get(month) != fingerprint or not get_cleaned_part_paths(codebase_nm, 'rollup', [month])
+    ]
+    logger.info(f"Building the rollup of {len(stale_months)} month(s).")
+
+    for month in stale_months:
+        makedirs(join(rollup_dir_path, f'month={month}'), exist_ok=True)
+        write_cleaned_part(
+            get_rollup(read_cleaned_parts(get_cleaned_part_paths(codebase_nm, 'commit_file', [month]))),
+            join(rollup_dir_path, f'month={month}', 'part-00000.parquet')
+        )
+
+    return commit_file_fingerprints
+
+
+def prepare_data(config_manager) -> None:
+    logger.info(f"Preparing data for codebase {config_manager['codebase_nm']}.")
+
+    codebase_nm = config_manager['codebase_nm']
+
+    if not all(is_raw_schema_current(codebase_nm, log_level) for log_level in ['commit', 'commit_file']):
+        logger.error(f"The git log of {codebase_nm} was parsed by an older version, without integer commit ids.")
+        raise ValueError(f"Rerun parse_git for {codebase_nm} before preparing its data.")
+
+    # the prepared snapshot is only extended while the tagging stays the same & the author name merging is extended
+    tagging_config = {config_nm: config_manager[config_nm] for config_nm in TAGGING_CONFIG_NMS}
+    author_nm_mapping = get_author_nm_mapping(config_manager)
+    raw_fingerprints = get_raw_fingerprints(codebase_nm)
+
+    clean_state = read_state(codebase_nm, STATE_NM)
+    new_part_nms = get_new_raw_part_nms(codebase_nm, clean_state, raw_fingerprints, tagging_config, author_nm_mapping)
+
+    if new_part_nms is None:
+        prepare_all_data(config_manager, author_nm_mapping)
+    elif not any(new_part_nms.values()):
+        logger.info("No commit parsed since the last preparation.")
+    else:
+        prepare_new_data(config_manager, author_nm_mapping, new_part_nms)
+
+    # the dashboard reads the rollup instead of the rows for the sums & counts of rows
+    rollup_fingerprints = update_rollup(codebase_nm, (clean_state or {}).get('rollup_fingerprints', {}))
+
+    save_state(
+        {
+            'raw_fingerprints': raw_fingerprints,
+            'tagging_config': tagging_config,
+            'author_nm_mapping': author_nm_mapping,
+            'rollup_fingerprints': rollup_fingerprints,
+        },
+        codebase_nm,
+        STATE_NM
+    )
     logger.info("Data preparation complete.")
 
 
@@ -216,7 +712,7 @@ def main() -> None:
     config_manager = instanciate_config_manager(CMD_NM)
     run_predecessor(CMD_NM, config_manager)
 
-    prepare_data(config_manager)
+    run_cmd(CMD_NM, config_manager)
     logger.info(f"Log data for {config_manager['codebase_nm']} has been successfully prepared.")
 
 
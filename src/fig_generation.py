@@ -1,11 +1,26 @@
 from plotly.express import imshow, line, bar, pie
 
 from copy import deepcopy
+from collections import OrderedDict
+from hashlib import sha1
+import json
+
+from numpy import arange, cumsum, nan, where
+from pandas import CategoricalIndex, DataFrame, DatetimeIndex, MultiIndex, Grouper
+
+from src.utilities import get_aggregated, get_time_bucket_labels, FREQ_TO_TIME_BUCKET_COL_NM
+from src.array_aggregation import AGGFUNCS, get_codes, get_used_codes, get_group_codes, aggregate, normalize
 
 
 class UnknownOperation(Exception):
     pass
 
+
+def has_time_bucket_idxs(df, freq):
+    # the time bucket ids are counted in UTC, timestamps of other timezones are resampled
+
+    return FREQ_TO_TIME_BUCKET_COL_NM.get(freq) in df.columns and str(getattr(df.index, 'tz', None)) == 'UTC'
+
 class Transformer:
 
     CONCEPT_TO_OPERATION_SUITE = {
@@ -35,6 +50,8 @@ class Transformer:
     ROUND_ARG = 2
     NONE = None
 
+    ROLLUP_MESURES = ['n_lines_inserted', 'n_lines_deleted'] # summed in the rollup, n_rows counts its rows
+
     def __init__(
         self,
         concept,
@@ -80,6 +97,9 @@ class Transformer:
         except KeyError: #operation is transpose == attribute not a method -> no corresponding key in OPERATION_NM_TO_ARG_NM
             return getattr(df, operation_nm) 
 
+        if operation_nm == 'groupby': # categorical entities, only the observed labels are kept
+            return df.groupby(arg_value, observed=True)
+
         try:
             if arg_value is not None:
                 return getattr(df, operation_nm)(arg_value)
@@ -96,8 +116,9 @@ class Transformer:
 
         N = 30
 
-        start_time = df.index.min()
-        end_time = df.index.max()
+        # span in whole days, the rollup holds days -> rows & rollup of the same period give the same frequency
+        start_time = df.index.min().floor('D')
+        end_time = df.index.max().floor('D')
         total_duration = end_time - start_time
 
         interval_duration = total_duration / N
@@ -116,17 +137,247 @@ class Transformer:
         
         return freq
     
-    def get_transformed(self, df):
+    def __get_with_plain_index(self, df):
+        # observed categorical groups come in order of appearance, the aggregate is small enough to get back
+        # plain sorted labels for the next operations
+
+        if isinstance(df.index, MultiIndex):
+            df.index = df.index.set_levels([
+                level.astype(object) if isinstance(level, CategoricalIndex) else level
+                for level in df.index.levels
+            ])
+        elif isinstance(df.index, CategoricalIndex):
+            df.index = df.index.astype(object)
+
+        return df.sort_index()
+
+    def can_use_rollup(self, rollup_col_nms):
+        # sums & counts of the rolled up measures by its dimensions, distinct counts (ex: commits) need the rows
+
+        return (
+            self.aggfunc in ['sum', 'count']
+            and self.mesure in self.ROLLUP_MESURES
+            and all(entity in rollup_col_nms for entity in self.get_entities())
+        )
+
+    def get_entities(self):
+        # columns the concept groups by, a single entity or a list of them
+
+        entities = self.entity if isinstance(self.entity, list) else [self.entity]
+        return [entity for entity in entities if entity is not None]
+
+    def __is_array_aggregated(self):
+        # concepts without resample are aggregated on the integer codes of their entities
+
+        n_entities = {'specialization': 2, 'size': 1, 'repartition': 1}.get(self.concept)
+
+        return self.aggfunc in AGGFUNCS and len(self.get_entities()) == n_entities
+
+    def __get_array_aggregated(self, df):
+        # same result as the operations of the concept, aggregated in a dense array of the entities labels
+
+        entities = self.get_entities()
+        entity_codes, entity_labels = zip(*(get_codes(df[entity]) for entity in entities))
+
+        group_codes, entity_labels, n_groups = get_group_codes(entity_codes, entity_labels)
+        aggregated, is_observed = aggregate(group_codes, n_groups, df[self.mesure], self.aggfunc)
+
+        if len(entities) == 1:
+            labels = entity_labels[0][is_observed]
+            return (
+                DataFrame({self.mesure: aggregated[is_observed]}, index=labels.astype(object).rename(entities[0]))
+                .sort_index()
+                .reset_index()
+            )
+
+        # labels x labels heatmap, unobserved pairs are nulls
+        shape = [len(labels) for labels in entity_labels]
+        is_observed = is_observed.reshape(shape)
+        values = where(is_observed, aggregated.reshape(shape), nan)
+
+        return self.__get_heatmap(values, is_observed, [labels.rename(entity) for labels, entity in zip(entity_labels, entities)])
+
+    def __get_heatmap(self, values, is_kept, labels):
+        # unstack, normalize, T, round & replace of a dense (index level 0 x index level 1) array, the labels of the
+        # first level are sorted, the ones of the second level are sorted already when they are time buckets
+
+        kept = [is_kept.any(axis=1), is_kept.any(axis=0)]
+        labels = [labels[axis][kept[axis]] for axis in [0, 1]]
+        values = values[kept[0]][:, kept[1]]
+
+        orders = [labels[axis].astype(object).argsort() for axis in [0, 1]]
+        values = values[orders[0]][:, orders[1]]
+        labels = [
+            labels[axis].astype(object)[orders[axis]] if not isinstance(labels[axis], DatetimeIndex) else labels[axis]
+            for axis in [0, 1]
+        ]
+
+        if self.unstack_level == 0: # the first level goes to the columns
+            values, labels = values.T, labels[::-1]
+
+        values = normalize(values, self.normalize_axis).T.round(self.ROUND_ARG)
+        values[values == 0] = nan
+
+        return DataFrame(values, index=labels[1], columns=labels[0])
+
+    def __is_bucket_aggregated(self, df):
+        # resampled concepts are aggregated on the time bucket ids stored by prep_data
+
+        n_entities = {'evolution': 0, 'stability': 1}.get(self.concept)
+        return (
+            has_time_bucket_idxs(df, self.freq)
+            and len(df) > 0
+            and self.aggfunc in AGGFUNCS
+            and len(self.get_entities()) == n_entities
+        )
+
+    def __get_bucket_aggregated(self, df):
+        # same bins & labels as resample, every bucket from the first to the last one (of each entity) is kept
+
+        bucket_idxs = df[FREQ_TO_TIME_BUCKET_COL_NM[self.freq]].values
+        first_bucket_idx = bucket_idxs.min()
+        bucket_codes = bucket_idxs - first_bucket_idx
+        n_buckets = int(bucket_codes.max()) + 1
+        bucket_labels = get_time_bucket_labels(arange(n_buckets) + first_bucket_idx, self.freq).rename(df.index.name)
+
+        if self.concept == 'evolution':
+            aggregated, _ = aggregate(bucket_codes, n_buckets, df[self.mesure], self.aggfunc)
+            return DataFrame({df.index.name: bucket_labels, self.mesure: aggregated})
+
+        entity_codes, entity_labels = get_used_codes(*get_codes(df[self.entity]))
+        group_codes = where(entity_codes >= 0, entity_codes * n_buckets + bucket_codes, -1)
+        aggregated, is_observed = aggregate(group_codes, len(entity_labels) * n_buckets, df[self.mesure], self.aggfunc)
+
+        shape = [len(entity_labels), n_buckets]
+        is_observed = is_observed.reshape(shape)
+        is_in_range = (cumsum(is_observed, axis=1) > 0) & (cumsum(is_observed[:, ::-1], axis=1)[:, ::-1] > 0)
+        values = where(is_in_range, aggregated.reshape(shape), nan)
+
+        return self.__get_heatmap(values, is_in_range, [entity_labels.rename(self.entity), bucket_labels])
+
+    def set_freq(self, df):
+        # the auto frequency is computed on the day span of the figure, the same on the rows & on the rollup
 
         if (self.concept in ['evolution', 'stability']) and (self.freq == 'auto'):
             self.freq = self.__compute_freq(df)
 
+    def get_transformed(self, df, is_rollup=False):
+
+        if is_rollup and self.aggfunc == 'count': # rows are counted by summing the row counts of the cells
+            rows_count_transformer = Transformer(
+                self.concept, self.mesure, self.entity, self.normalize_axis, 'sum', self.freq, self.unstack_level
+            )
+            return rows_count_transformer.get_transformed(
+                df.drop(columns=self.mesure).rename(columns={'n_rows': self.mesure})
+            )
+
+        if self.__is_array_aggregated():
+            return self.__get_array_aggregated(df)
+
+        self.set_freq(df)
+
+        if self.__is_bucket_aggregated(df):
+            return self.__get_bucket_aggregated(df)
+
         for operation_nm in self.operations:
             df = self.__get_operation_result(df, operation_nm)
 
+            if operation_nm == self.aggfunc and 'groupby' in self.operations:
+                df = self.__get_with_plain_index(df)
+
         return df
 
 
+class QueryPlan:
+    # transformers of a view summing (or counting the rows of) the same mesure over the same periods share one
+    # scan of the rows: grouped once by all of their entities, each one is then computed from that aggregate
+
+    SHARED_AGGFUNCS = ['sum', 'count']
+
+    def __init__(self, transformers):
+
+        self.transformers = transformers
+
+    def __get_shared_key(self, transformer):
+
+        if transformer.aggfunc not in self.SHARED_AGGFUNCS:
+            return None
+
+        freq = transformer.freq if 'resample' in transformer.operations else None
+        return (transformer.mesure, freq)
+
+    def __get_entity_nms(self, transformers):
+
+        entity_nms = []
+        for transformer in transformers:
+            entity_nms += [entity for entity in transformer.get_entities() if entity not in entity_nms]
+
+        return entity_nms
+
+    def __get_shared_aggregate(self, df, transformers, mesure, freq, is_rollup):
+        # rows with a null entity are kept, each transformer drops the ones of its own entities
+
+        bucket_col_nm = FREQ_TO_TIME_BUCKET_COL_NM.get(freq)
+        if not freq:
+            time_keys = []
+        elif has_time_bucket_idxs(df, freq): # time bucket ids stored by prep_data
+            time_keys = [bucket_col_nm]
+        else:
+            time_keys = [Grouper(level=df.index.name, freq=freq)]
+
+        df_aggregate = get_aggregated(
+            df,
+            self.__get_entity_nms(transformers) + time_keys,
+            **{mesure: (mesure, 'sum')},
+            n_rows=('n_rows', 'sum') if is_rollup else (mesure, 'count')
+        )
+
+        if time_keys == [bucket_col_nm]:
+            return df_aggregate.set_index(get_time_bucket_labels(df_aggregate[bucket_col_nm].values, freq).rename(df.index.name))
+
+        return df_aggregate.set_index(df.index.name) if freq else df_aggregate
+
+    def get_plan(self, df):
+        # list of steps: (shared key or None, indexes of the transformers computed by the step)
+
+        for transformer in self.transformers:
+            transformer.set_freq(df)
+
+        key_to_idxs = {}
+        steps = []
+        for idx, transformer in enumerate(self.transformers):
+            key = self.__get_shared_key(transformer)
+            if key is None:
+                steps.append((None, [idx]))
+            elif key in key_to_idxs:
+                key_to_idxs[key].append(idx)
+            else:
+                key_to_idxs[key] = [idx]
+                steps.append((key, key_to_idxs[key]))
+
+        return [(key if len(idxs) > 1 else None, idxs) for key, idxs in steps]
+
+    def get_transformed(self, df, is_rollup=False):
+        # transformed dfs in the order of the transformers, one scan of df per step of the plan
+
+        plan = self.get_plan(df)
+        self.n_scans = len(plan)
+
+        dfs = [None] * len(self.transformers)
+        for key, idxs in plan:
+            if key is None:
+                dfs[idxs[0]] = self.transformers[idxs[0]].get_transformed(df, is_rollup)
+                continue
+
+            mesure, freq = key
+            transformers = [self.transformers[idx] for idx in idxs]
+            df_aggregate = self.__get_shared_aggregate(df, transformers, mesure, freq, is_rollup)
+            for idx, transformer in zip(idxs, transformers):
+                dfs[idx] = transformer.get_transformed(df_aggregate, is_rollup=True)
+
+        return dfs
+
+
 class FigGenerator(Transformer):
 
     CONCEPT_TO_FIG = {
@@ -239,9 +490,12 @@ class FigGenerator(Transformer):
 
             fig.update_layout({'xaxis_title':self.xaxis_title, 'yaxis_title':self.yaxis_title})
 
-    def get_fig(self, df):
+    def get_fig(self, df, is_rollup=False):
+
+        return self.get_fig_from_transformed(self.get_transformed(df, is_rollup))
+
+    def get_fig_from_transformed(self, df):
         
-        df = self.get_transformed(df)        
         fig_arg = self.__get_fig_arg()
 
         if self.concept in ['specialization', 'stability']:        
@@ -255,4 +509,48 @@ class FigGenerator(Transformer):
 
         self.__update_axis_titles(fig, fig_arg)
 
-        return fig
\ No newline at end of file
+        return fig
+
+
+class FigCache:
+    # least recently used figures are evicted once the figures cached weigh more than max_n_bytes (json size)
+
+    def __init__(self, max_n_bytes):
+
+        self.max_n_bytes = max_n_bytes
+        self.key_to_fig = OrderedDict() # key -> (fig, n_bytes), least recently used first
+        self.n_bytes = 0
+        self.n_hits = 0
+        self.n_misses = 0
+
+    @staticmethod
+    def get_key(*key_parts):
+        # canonical hash of json serializable parts, dict keys order doesn't matter
+
+        return sha1(json.dumps(key_parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+
+        if key not in self.key_to_fig:
+            self.n_misses += 1
+            return None
+
+        self.n_hits += 1
+        self.key_to_fig.move_to_end(key)
+        return self.key_to_fig[key][0]
+
+    def put(self, key, fig):
+
+        n_bytes = len(fig.to_json())
+        if n_bytes > self.max_n_bytes:
+            return
+
+        if key in self.key_to_fig:
+            self.n_bytes -= self.key_to_fig.pop(key)[1]
+
+        self.key_to_fig[key] = (fig, n_bytes)
+        self.n_bytes += n_bytes
+
+        while self.n_bytes > self.max_n_bytes:
+            _, (_, evicted_n_bytes) = self.key_to_fig.popitem(last=False)
+            self.n_bytes -= evicted_n_bytes
@@ -1,9 +1,16 @@
 import logging
-from subprocess import run
-from pandas import DataFrame, concat
+from subprocess import run, Popen, PIPE
+from tempfile import TemporaryFile
+from array import array
+from contextlib import ExitStack
+
+from numpy import arange, frombuffer
+from pandas import DataFrame, Index, concat
 
 from src.config_management import instanciate_config_manager, ConfigManager
-from src.utilities import save_raw
+from src.cmd_chaining import run_cmd
+from src.utilities import RawDatasetWriter, save_raw, read_raw, has_raw, is_raw_schema_current, read_state, save_state
+from src.git_object_store import ObjectStoreLogReader
 
 # Set up logging configuration
 logging.basicConfig(
@@ -17,16 +24,171 @@ logger = logging.getLogger()
 
 DATA_PATH = './data'
 CMD_NM = 'parse_git'
+RAW_LOG_LEVELS = ['commit', 'commit_file', 'file_rename']
+
+
+def run_command_in_cli(command, stdin_input=None):
+    logger.debug(f"Running command in CLI: {command}")
+
+    process = run(
+        command.split(" "),
+        capture_output=True,
+        input=None if stdin_input is None else stdin_input.encode('utf-8')
+    )
+    output = process.stdout.decode('utf-8')
+
+    if process.returncode != 0:
+        logger.error(f"Error executing command: {process.stderr.decode('utf-8')}")
+        raise OSError(process.stderr.decode('utf-8'))
+
+    return output
+
+
+def stream_command_output(command, stdin_input=None, chunk_size=None):
+    # yields decoded lines, or undecoded chunks of chunk_size bytes if chunk_size is set
+    logger.debug(f"Streaming command output from CLI: {command}")
+
+    with TemporaryFile() as stderr, Popen(command.split(" "), stdin=PIPE, stdout=PIPE, stderr=stderr) as process:
+
+        if stdin_input is not None:
+            process.stdin.write(stdin_input.encode('utf-8'))
+        process.stdin.close()
+
+        if chunk_size is None:
+            for line in process.stdout:
+                yield line.decode('utf-8').rstrip('\n')
+        else:
+            yield from iter(lambda: process.stdout.read(chunk_size), b'')
+
+        if process.wait() != 0:
+            stderr.seek(0)
+            error_msg = stderr.read().decode('utf-8')
+            logger.error(f"Error executing command: {error_msg}")
+            raise OSError(error_msg)
+
+
+def format_file_renaming(old_path, new_path):
+    # same {old => new} notation as git log --numstat, cf pprint_rename in git's diff.c
+
+    pfx_length = 0
+    for i, (old_char, new_char) in enumerate(zip(old_path, new_path)):
+        if old_char != new_char:
+            break
+        if old_char == '/':
+            pfx_length = i + 1
+
+    sfx_length = 0
+    old_i, new_i = len(old_path) - 1, len(new_path) - 1
+    pfx_adjust_for_slash = 1 if pfx_length else 0
+    while (
+        old_i >= pfx_length - pfx_adjust_for_slash
+        and new_i >= pfx_length - pfx_adjust_for_slash
+        and old_path[old_i] == new_path[new_i]
+    ):
+        if old_path[old_i] == '/':
+            sfx_length = len(old_path) - old_i
+        old_i, new_i = old_i - 1, new_i - 1
+
+    old_mid = old_path[pfx_length:max(pfx_length, len(old_path) - sfx_length)]
+    new_mid = new_path[pfx_length:max(pfx_length, len(new_path) - sfx_length)]
+
+    if pfx_length + sfx_length == 0:
+        return f'{old_mid} => {new_mid}'
+
+    return f'{old_path[:pfx_length]}{{{old_mid} => {new_mid}}}{old_path[len(old_path) - sfx_length:]}'
+
+
+def split_file_renaming(file_path):
+    # (old_path, new_path) from the {old => new} notation, inverse of format_file_renaming
+
+    if '{' not in file_path:
+        return tuple(file_path.split(' => ', 1))
+
+    pfx, _, rest = file_path.partition('{')
+    mid, _, sfx = rest.rpartition('}')
+    old_mid, new_mid = mid.split(' => ', 1)
+
+    def join_path(mid):
+        # an empty mid leaves a double slash (a/{ => b}/c -> a//c) or a leading one ({ => b}/c -> /c)
+        return pfx + mid + sfx if mid else pfx + sfx[1:]
+
+    return join_path(old_mid), join_path(new_mid)
+
+
+def get_file_renames(df_commit_file):
+
+    df_file_rename = df_commit_file.loc[
+        df_commit_file.file_path.str.contains(' => ', regex=False),
+        ['commit_idx', 'file_path']
+    ].reset_index(drop=True)
+
+    old_and_new_paths = [split_file_renaming(file_path) for file_path in df_file_rename.file_path]
+
+    return df_file_rename.assign(
+        old_path=[old_path for old_path, _ in old_and_new_paths],
+        new_path=[new_path for _, new_path in old_and_new_paths],
+    ).astype({'old_path':'str', 'new_path':'str'})
+
+
+def set_commit_idxs(df_commit, df_commit_file, first_commit_idx=0):
+    # commits get a dense integer id in parse order, their files refer to it & the hash is only kept in the
+    # commit table, the later joins are array indexing instead of hashing 40 chars strings
+
+    commit_idxs = arange(first_commit_idx, first_commit_idx + len(df_commit), dtype='int64')
+
+    df_commit = df_commit.assign(idx = commit_idxs)[['id', 'idx', 'creation_dt', 'author_nm', 'msg']]
+    df_commit_file = (
+        df_commit_file
+        .assign(commit_idx = commit_idxs[Index(df_commit.id).get_indexer(df_commit_file.commit_id)])
+        [['commit_idx', 'file_path', 'n_lines_inserted', 'n_lines_deleted']]
+    )
+
+    return df_commit, df_commit_file
+
+
+def get_next_commit_idx(codebase_nm) -> int:
+
+    commit_idxs = read_raw(codebase_nm, 'commit', col_nms=['idx']).idx
+
+    return int(commit_idxs.max()) + 1 if len(commit_idxs) else 0
 
 
 class GitLogParser():
     COMMIT_FORMAT = '+++%H\t%ad\t%an\t%s'
     COMMIT_SEP = '+++'
-
-    def __init__(self, path_to_repo):
+    NUL_COMMIT_FORMAT = '%H%x00%ad%x00%an%x00%s%x00'
+    BATCH_SIZE = 20000 # max nb of commits held in memory by the streaming mode
+    CHUNK_SIZE = 1 << 20 # bytes read at once from git's stdout in nul mode
+    LOG_FORMATS = ['nul', 'text']
+    BACKENDS = ['cli', 'object_store']
+    RENAME_DETECTION_TO_FLAGS = {
+        'none':'--no-renames',
+        'renames':'-M',
+        'copies':'-M -C', # copy detection is by far the most expensive
+    }
+
+    def __init__(
+            self, path_to_repo, batch_size=BATCH_SIZE, revisions=None,
+            log_format='nul', backend='cli', rename_detection='copies'
+        ):
         logger.info(f"Initializing GitLogParser for repo at {path_to_repo}.")
         
+        if log_format not in self.LOG_FORMATS:
+            raise ValueError(f'Unknown log format {log_format}, expected one of {self.LOG_FORMATS}.')
+        if backend not in self.BACKENDS:
+            raise ValueError(f'Unknown backend {backend}, expected one of {self.BACKENDS}.')
+        if rename_detection not in self.RENAME_DETECTION_TO_FLAGS:
+            raise ValueError(
+                f'Unknown rename detection {rename_detection}, '
+                f'expected one of {list(self.RENAME_DETECTION_TO_FLAGS)}.'
+            )
+
         self.path_to_repo = path_to_repo
+        self.batch_size = batch_size
+        self.revisions = revisions # revisions to walk (ex: [tip, '^excluded_tip']), all refs if None
+        self.log_format = log_format # nul: -z output parsed as bytes, text: newline & tab separated output
+        self.backend = backend # cli: git log subprocess, object_store: commits & trees read from .git/objects
+        self.rename_detection = rename_detection # none, renames or copies
 
         self.df_commit = (
             DataFrame([], columns=['id', 'creation_dt', 'author_nm', 'msg'])
@@ -41,79 +203,222 @@ class GitLogParser():
             .astype({'commit_id':'str', 'file_path':'str', 'n_lines_inserted':'int', 'n_lines_deleted':'int'})
         )
 
-    def __run_command_in_cli(self, command):
-        logger.debug(f"Running command in CLI: {command}")
-        
-        process = run(command.split(" "), capture_output=True)
-        log = process.stdout.decode('utf-8')
+    def __get_log_command(self, log_format='text'):
 
-        if process.returncode != 0:
-            logger.error(f"Error executing command: {process.stderr.decode('utf-8')}")
-            raise OSError(process.stderr.decode('utf-8'))
+        revisions = '--all' if self.revisions is None else '--stdin'
+
+        rename_flags = self.RENAME_DETECTION_TO_FLAGS[self.rename_detection]
+
+        if log_format == 'nul':
+            return f"git -C {self.path_to_repo} log {revisions} -z {rename_flags} --numstat --date=iso --pretty=format:{self.NUL_COMMIT_FORMAT}"
+
+        return f"git -C {self.path_to_repo} log {revisions} {rename_flags} --numstat --date=iso --pretty=format:{self.COMMIT_FORMAT}"
+
+    def __get_log_command_input(self):
+
+        return None if self.revisions is None else '\n'.join(self.revisions) + '\n'
 
-        return log
-    
     def get_raw_log(self):
         logger.info(f"Fetching raw git log from {self.path_to_repo}.")
         
-        command = f"git -C {self.path_to_repo} log --all -M -C --numstat --date=iso --pretty=format:{self.COMMIT_FORMAT}"
-        
-        return self.__run_command_in_cli(command)
+        return run_command_in_cli(self.__get_log_command(), self.__get_log_command_input())
+
+    def stream_raw_log(self):
+        logger.info(f"Streaming raw git log from {self.path_to_repo}.")
+
+        return stream_command_output(self.__get_log_command(), self.__get_log_command_input())
+
+    def stream_raw_nul_log(self):
+        logger.info(f"Streaming raw nul delimited git log from {self.path_to_repo}.")
+
+        return stream_command_output(
+            self.__get_log_command('nul'),
+            self.__get_log_command_input(),
+            chunk_size=self.CHUNK_SIZE
+        )
 
     def __cast_to_int(self, n_lines):
-        return 0 if n_lines == '-' else int(n_lines)
+        # int() parses str & bytes alike, binary files have '-' counts
+        return 0 if n_lines in ('-', b'-') else int(n_lines)
 
-    def __parse_files_info(self, commit_id, files_info):
-        files_info = files_info[:-2]  # remove commit end msg character
+    def __init_buffers(self):
+        # column buffers, turned into DataFrames once per batch
 
-        for i, info in enumerate(files_info):
-            info = info.split('\t')
-            nb_inserted_lines, nb_deleted_lines, file_path = info
+        self.commit_buffers = {col_nm: [] for col_nm in self.df_commit.columns}
+        self.commit_file_buffers = {
+            'commit_id': [],
+            'file_path': [],
+            'n_lines_inserted': array('q'),
+            'n_lines_deleted': array('q'),
+        }
 
-            nb_inserted_lines = self.__cast_to_int(nb_inserted_lines)
-            nb_deleted_lines = self.__cast_to_int(nb_deleted_lines)
+    def __buffer_commit(self, commit_id, creation_dt, author_nm, msg):
 
-            files_info[i] = [commit_id, file_path, nb_inserted_lines, nb_deleted_lines]
+        self.commit_buffers['id'].append(commit_id)
+        self.commit_buffers['creation_dt'].append(creation_dt)
+        self.commit_buffers['author_nm'].append(author_nm)
+        self.commit_buffers['msg'].append(msg.replace('\t', ' '))  # handle tab in msg
 
-        return files_info
+    def __buffer_file(self, file_path, nb_inserted_lines, nb_deleted_lines):
 
-    def __handle_tab_in_msg(self, header):
-        header[3] = ' '.join(header[3:])
-        header = header[:4]
+        self.commit_file_buffers['commit_id'].append(self.commit_buffers['id'][-1])
+        self.commit_file_buffers['file_path'].append(file_path)
+        self.commit_file_buffers['n_lines_inserted'].append(self.__cast_to_int(nb_inserted_lines))
+        self.commit_file_buffers['n_lines_deleted'].append(self.__cast_to_int(nb_deleted_lines))
 
-        return header
-    
-    def __format_files_info_as_df(self, files_info):
-        logger.debug(f"Formatting {len(files_info)} file records into DataFrame.")
-        
-        self.df_commit_file = concat([
-            self.df_commit_file,
-            DataFrame(files_info, columns=self.df_commit_file.columns)
-        ], axis=0, ignore_index=True)
+    def __buffer_header(self, line):
+
+        self.__buffer_commit(*line[len(self.COMMIT_SEP):].split('\t', 3))
+
+    def __buffer_file_info(self, line):
+
+        nb_inserted_lines, nb_deleted_lines, file_path = line.split('\t')
+        self.__buffer_file(file_path, nb_inserted_lines, nb_deleted_lines)
+
+    def __format_buffers_as_dfs(self):
+        logger.debug(
+            f"Formatting batch of {len(self.commit_buffers['id'])} commits "
+            f"& {len(self.commit_file_buffers['commit_id'])} file records into DataFrames."
+        )
+
+        df_commit = DataFrame(self.commit_buffers, columns=self.df_commit.columns)
+        df_commit_file = DataFrame({
+            col_nm: frombuffer(buffer, dtype='int64') if isinstance(buffer, array) else buffer
+            for col_nm, buffer in self.commit_file_buffers.items()
+        }, columns=self.df_commit_file.columns)
+
+        self.__init_buffers()
+
+        return df_commit.astype(self.df_commit.dtypes), df_commit_file.astype(self.df_commit_file.dtypes)
+
+    def parse_log_stream(self, lines):
+        # yields (df_commit, df_commit_file) batches of at most self.batch_size commits
+
+        self.__init_buffers()
+        commit_ids = self.commit_buffers['id']
+
+        for line in lines:
+
+            if line.startswith(self.COMMIT_SEP):
+
+                if len(commit_ids) == self.batch_size:
+                    yield self.__format_buffers_as_dfs()
+                    commit_ids = self.commit_buffers['id']
+
+                self.__buffer_header(line)
+
+            elif line:  # empty lines separate commits
+                self.__buffer_file_info(line)
+
+        if commit_ids:
+            yield self.__format_buffers_as_dfs()
+
+    def __iter_nul_tokens(self, chunks):
+
+        tail = b''
+        for chunk in chunks:
+            tokens = (tail + chunk).split(b'\0')
+            tail = tokens.pop()  # token split across chunks
+            yield from tokens
+
+        if tail:
+            yield tail
+
+    def __decode(self, token):
+        # lossy fallback so that an invalid byte in an old commit does not stop the parsing
+        return token.decode('utf-8', errors='replace')
+
+    def parse_nul_log_stream(self, chunks):
+        # same as parse_log_stream for the output of git log -z with NUL_COMMIT_FORMAT, given as byte chunks
+        # commit: id NUL date NUL author NUL subject NUL [LF numstat NUL ...] NUL
+        # numstat: inserted TAB deleted TAB path | inserted TAB deleted TAB NUL old_path NUL new_path
+
+        self.__init_buffers()
+        commit_ids = self.commit_buffers['id']
+        tokens = self.__iter_nul_tokens(chunks)
+
+        for commit_id in tokens:
+
+            if len(commit_ids) == self.batch_size:
+                yield self.__format_buffers_as_dfs()
+                commit_ids = self.commit_buffers['id']
+
+            creation_dt, author_nm, msg = next(tokens), next(tokens), next(tokens)
+            self.__buffer_commit(
+                commit_id.decode('ascii'),
+                creation_dt.decode('ascii'),
+                self.__decode(author_nm),
+                self.__decode(msg)
+            )
+
+            token = next(tokens, b'')
+            if token[:1] != b'\n': # commit without files
+                continue
+
+            token = token[1:]
+            while token:
+                nb_inserted_lines, nb_deleted_lines, file_path = token.split(b'\t', 2)
+
+                if file_path:
+                    file_path = self.__decode(file_path)
+                else: # renamed or copied file
+                    old_path, new_path = next(tokens), next(tokens)
+                    file_path = format_file_renaming(self.__decode(old_path), self.__decode(new_path))
+
+                self.__buffer_file(file_path, nb_inserted_lines, nb_deleted_lines)
+                token = next(tokens, b'')
+
+        if commit_ids:
+            yield self.__format_buffers_as_dfs()
+
+    def parse_commit_records(self, records):
+        # same as parse_log_stream for (commit_id, creation_dt, author_nm, msg, [(file_path, n_inserted, n_deleted)])
+
+        self.__init_buffers()
+        commit_ids = self.commit_buffers['id']
+
+        for commit_id, creation_dt, author_nm, msg, files in records:
+
+            if len(commit_ids) == self.batch_size:
+                yield self.__format_buffers_as_dfs()
+                commit_ids = self.commit_buffers['id']
+
+            self.__buffer_commit(commit_id, creation_dt, author_nm, msg)
+            for file_path, nb_inserted_lines, nb_deleted_lines in files:
+                self.__buffer_file(file_path, nb_inserted_lines, nb_deleted_lines)
+
+        if commit_ids:
+            yield self.__format_buffers_as_dfs()
+
+    def iter_object_store_commit_batches(self):
+        logger.info(f"Reading commits from the object store of {self.path_to_repo}.")
+
+        log_reader = ObjectStoreLogReader(
+            self.path_to_repo, self.revisions,
+            detect_renames=self.rename_detection != 'none' # only exact renames, copies are not detected
+        )
+        try:
+            yield from self.parse_commit_records(log_reader.iter_commits())
+        finally:
+            log_reader.close()
 
     def parse_log(self, log:str) -> None:
-        logger.info(f"Parsing {len(log.split(self.COMMIT_SEP)[1:])} commits from raw log.")
-        
-        log = log.split(self.COMMIT_SEP)[1:]  # remove empty first element -> cf self.pretty_format
-        log[-1] += '\n'  # update last commit to keep the same structure as other commits 
 
-        files_info = []
+        batches = list(self.parse_log_stream(log.split('\n')))
+        logger.info(f"Parsed {sum(len(df_commit) for df_commit, _ in batches)} commits from raw log.")
 
-        for commit in log:
-            commit = commit.split('\n')
-            header = commit[0].split('\t')
-            commit_file_info = commit[1:]
+        self.df_commit = concat([self.df_commit] + [df_commit for df_commit, _ in batches], ignore_index=True)
+        self.df_commit_file = concat([self.df_commit_file] + [df_commit_file for _, df_commit_file in batches], ignore_index=True)
 
-            header_nb_attributes = 4
-            if len(header) > header_nb_attributes:
-                header = self.__handle_tab_in_msg(header)
-            
-            self.df_commit.loc[len(self.df_commit), :] = header
+    def iter_commit_batches(self):
 
-            commit_file_info = self.__parse_files_info(header[0], commit_file_info)
-            files_info += commit_file_info
-        
-        self.__format_files_info_as_df(files_info)
+        if self.backend == 'object_store':
+            return self.iter_object_store_commit_batches()
+
+        if self.log_format == 'nul':
+            return self.parse_nul_log_stream(self.stream_raw_nul_log())
+
+        return self.parse_log_stream(self.stream_raw_log())
 
     def get_commit_as_dfs(self): 
         logger.info(f"Returning parsed commit DataFrames.")
@@ -121,26 +426,157 @@ class GitLogParser():
         return self.df_commit, self.df_commit_file
 
 
+def get_ref_tips(path_to_repo) -> dict:
+
+    ref_tips = run_command_in_cli(f"git -C {path_to_repo} for-each-ref --format=%(objectname)%09%(refname)")
+    ref_tips = dict(reversed(line.split('\t')) for line in ref_tips.splitlines())
+
+    try:
+        ref_tips['HEAD'] = run_command_in_cli(f"git -C {path_to_repo} rev-parse --verify --quiet HEAD").strip()
+    except OSError: # unborn HEAD
+        pass
+
+    return ref_tips
+
+
+def read_ref_tips(path_to_repo, backend='cli') -> dict:
+
+    if backend == 'object_store':
+        log_reader = ObjectStoreLogReader(path_to_repo)
+        ref_tips = log_reader.store.get_ref_tips()
+        log_reader.close()
+        return ref_tips
+
+    return get_ref_tips(path_to_repo)
+
+
+def get_missing_objects(path_to_repo, shas) -> list:
+
+    objects_status = run_command_in_cli(
+        f"git -C {path_to_repo} cat-file --batch-check",
+        '\n'.join(shas) + '\n'
+    )
+
+    return [line.split(' ')[0] for line in objects_status.splitlines() if line.endswith(' missing')]
+
+
+def get_unreachable_commit_ids(path_to_repo, from_shas, not_from_shas) -> list:
+
+    commit_ids = run_command_in_cli(
+        f"git -C {path_to_repo} rev-list --stdin",
+        '\n'.join(list(from_shas) + [f'^{sha}' for sha in not_from_shas]) + '\n'
+    )
+
+    return commit_ids.splitlines()
+
+
+def remove_raw_commits(codebase_nm, commit_ids) -> None:
+    logger.info(f"Removing {len(commit_ids)} commits no longer reachable from any ref for {codebase_nm}.")
+
+    df_commit = read_raw(codebase_nm, 'commit')
+    filter_removed = df_commit.id.isin(commit_ids)
+    save_raw(df_commit.loc[~filter_removed], codebase_nm, 'commit')
+
+    # ids of the removed commits are not reused, the next ones start after the max id
+    for log_level in ['commit_file', 'file_rename']:
+        df = read_raw(codebase_nm, log_level)
+        save_raw(df.loc[~df.commit_idx.isin(df_commit.idx.loc[filter_removed])], codebase_nm, log_level)
+
+
+def get_incremental_revisions(path_to_repo, codebase_nm, parsed_ref_tips, ref_tips):
+    # revisions reachable from the new tips but not from the already parsed ones, None if a full parse is needed
+
+    parsed_tips = set(parsed_ref_tips.values())
+    tips = set(ref_tips.values())
+
+    if get_missing_objects(path_to_repo, parsed_tips):
+        logger.warning("Previously parsed ref tips are no longer in the repository, falling back to a full parse.")
+        return None
+
+    moved_tips = parsed_tips - tips  # deleted, force-pushed or fast-forwarded refs
+    if moved_tips:
+        unreachable_commit_ids = get_unreachable_commit_ids(path_to_repo, moved_tips, tips)
+        if unreachable_commit_ids:
+            remove_raw_commits(codebase_nm, unreachable_commit_ids)
+
+    new_tips = tips - parsed_tips
+    if not new_tips:
+        return []
+
+    return sorted(new_tips) + [f'^{sha}' for sha in sorted(parsed_tips)]
+
+
 def parse_git_log(config_manager: ConfigManager) -> None:
     logger.info(f"Parsing git log for repository at {config_manager['path_to_repo']}.")
 
-    git_log_parser = GitLogParser(config_manager['path_to_repo'])
-    log = git_log_parser.get_raw_log()
-    git_log_parser.parse_log(log)
-    df_commit, df_commit_file = git_log_parser.get_commit_as_dfs()
-
+    path_to_repo = config_manager['path_to_repo']
     codebase_name = config_manager['codebase_nm']
-    logger.info(f"Saving parsed commit and commit files data for {codebase_name}.")
-    
-    save_raw(df_commit, codebase_name, 'commit')
-    save_raw(df_commit_file, codebase_name, 'commit_file')
+
+    backend = config_manager['backend']
+    rename_detection = config_manager['rename_detection']
+
+    ref_tips = read_ref_tips(path_to_repo, backend)
+    revisions = None
+
+    if config_manager['incremental']:
+        raw_state = read_state(codebase_name, 'raw')
+
+        if raw_state is None or not all(has_raw(codebase_name, log_level) for log_level in RAW_LOG_LEVELS):
+            logger.info(f"No previously parsed git log found for {codebase_name}, running a full parse.")
+        elif raw_state.get('rename_detection') != rename_detection:
+            logger.info(f"Rename detection changed for {codebase_name}, running a full parse.")
+        elif not all(is_raw_schema_current(codebase_name, log_level) for log_level in RAW_LOG_LEVELS):
+            logger.info(f"Git log of {codebase_name} parsed by an older version, running a full parse.")
+        else:
+            revisions = get_incremental_revisions(path_to_repo, codebase_name, raw_state['ref_tips'], ref_tips)
+
+    is_incremental = revisions is not None
+
+    if revisions == []:
+        logger.info(f"No new commits to parse for {codebase_name}.")
+    else:
+        git_log_parser = GitLogParser(
+            path_to_repo, revisions=revisions, backend=backend, rename_detection=rename_detection
+        )
+
+        n_commits = 0
+        next_commit_idx = get_next_commit_idx(codebase_name) if is_incremental else 0
+        with ExitStack() as writers: # a single with of several parenthesized managers needs python 3.10
+            commit_writer = writers.enter_context(RawDatasetWriter(codebase_name, 'commit', append=is_incremental))
+            commit_file_writer = writers.enter_context(
+                RawDatasetWriter(codebase_name, 'commit_file', append=is_incremental)
+            )
+            file_rename_writer = writers.enter_context(
+                RawDatasetWriter(codebase_name, 'file_rename', append=is_incremental)
+            )
+
+            for df_commit, df_commit_file in git_log_parser.iter_commit_batches():
+
+                logger.info(f"Saving batch of {len(df_commit)} parsed commits for {codebase_name}.")
+
+                df_commit, df_commit_file = set_commit_idxs(df_commit, df_commit_file, next_commit_idx)
+                commit_writer.write(df_commit)
+                commit_file_writer.write(df_commit_file)
+                file_rename_writer.write(get_file_renames(df_commit_file))
+                n_commits += len(df_commit)
+                next_commit_idx += len(df_commit)
+
+            if n_commits == 0 and not is_incremental:  # empty history, still write the (empty) datasets
+                df_commit, df_commit_file = set_commit_idxs(*git_log_parser.get_commit_as_dfs())
+                commit_writer.write(df_commit)
+                commit_file_writer.write(df_commit_file)
+                file_rename_writer.write(get_file_renames(df_commit_file))
+
+        logger.info(f"Saved {n_commits} parsed commits for {codebase_name}.")
+
+    save_state({'ref_tips': ref_tips, 'rename_detection': rename_detection}, codebase_name, 'raw')
 
 
 def main() -> None:
     logger.info("Starting git log parsing process.")
 
     config_manager = instanciate_config_manager(CMD_NM)
-    parse_git_log(config_manager)
+    run_cmd(CMD_NM, config_manager)
     
     logger.info(f"Git log for {config_manager['codebase_nm']} successfully parsed.")
 
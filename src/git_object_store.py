@@ -0,0 +1,751 @@
+import logging
+import re
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from heapq import heappush, heappop
+from mmap import mmap, ACCESS_READ
+from os import listdir, walk
+from os.path import join, exists, isdir, isfile, relpath
+from struct import unpack_from
+
+logger = logging.getLogger()
+
+OBJ_COMMIT, OBJ_TREE, OBJ_BLOB, OBJ_TAG = 1, 2, 3, 4
+OBJ_OFS_DELTA, OBJ_REF_DELTA = 6, 7
+OBJ_TYPE_NM_TO_TYPE = {b'commit':OBJ_COMMIT, b'tree':OBJ_TREE, b'blob':OBJ_BLOB, b'tag':OBJ_TAG}
+
+TREE_MODE = b'40000'
+SUBMODULE_MODE = b'160000'
+EMPTY_BLOB_SHA = bytes.fromhex('e69de29bb2d1d6434b8b29ae775ad8c2e48c5391')
+TREE_ENTRY_PATTERN = re.compile(rb'[^\0]+\0.{20}', re.DOTALL) # mode SP name NUL binary sha
+
+BINARY_SNIFF_SIZE = 8000 # git considers a blob binary if it has a NUL byte in its first 8000 bytes
+MAX_DIFF_COST = 1 << 22 # above this Myers cost, remaining lines are counted as changed
+
+
+class LRUCache(OrderedDict):
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+
+        if key not in self:
+            return default
+
+        self.move_to_end(key)
+        return self[key]
+
+    def put(self, key, value):
+
+        self[key] = value
+        self.move_to_end(key)
+
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+def read_varint(data, pos):
+    # little endian base 128 size, as used in delta headers
+
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def apply_delta(base, delta):
+
+    _, pos = read_varint(delta, 0) # base size
+    result_size, pos = read_varint(delta, pos)
+    result = bytearray()
+
+    while pos < len(delta):
+        op = delta[pos]
+        pos += 1
+
+        if op & 0x80: # copy from base
+            copy_offset, copy_size = 0, 0
+            for i in range(4):
+                if op & (1 << i):
+                    copy_offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    copy_size |= delta[pos] << (8 * i)
+                    pos += 1
+            result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+
+        elif op: # insert literal data
+            result += delta[pos:pos + op]
+            pos += op
+
+        else:
+            raise ValueError('Invalid delta instruction.')
+
+    if len(result) != result_size:
+        raise ValueError('Delta result size mismatch.')
+
+    return bytes(result)
+
+
+def inflate(buffer, pos, size):
+
+    decompressor = zlib.decompressobj()
+    chunks = []
+    step = max(4096, size + 1024)
+
+    while not decompressor.eof:
+        data = buffer[pos:pos + step]
+        if not data:
+            raise ValueError('Truncated zlib stream.')
+        chunks.append(decompressor.decompress(data))
+        pos += step
+
+    return b''.join(chunks)
+
+
+class PackFile:
+    # memory mapped pack & its v2 index
+
+    def __init__(self, idx_path, pack_path):
+
+        with open(idx_path, 'rb') as f:
+            self.idx = mmap(f.fileno(), 0, access=ACCESS_READ)
+        with open(pack_path, 'rb') as f:
+            self.pack = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+        if self.idx[:4] != b'\xfftOc' or unpack_from('>I', self.idx, 4)[0] != 2:
+            raise ValueError(f'Unsupported pack index {idx_path}, only version 2 is supported.')
+
+        self.fanout = unpack_from('>256I', self.idx, 8)
+        self.n_objects = self.fanout[255]
+
+        self.sha_table_pos = 8 + 256 * 4
+        self.offset_table_pos = self.sha_table_pos + 24 * self.n_objects # shas (20) + crcs (4)
+        self.large_offset_table_pos = self.offset_table_pos + 4 * self.n_objects
+
+    def find_offset(self, sha):
+
+        lo = self.fanout[sha[0] - 1] if sha[0] else 0
+        hi = self.fanout[sha[0]]
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            sha_pos = self.sha_table_pos + 20 * mid
+            mid_sha = self.idx[sha_pos:sha_pos + 20]
+
+            if mid_sha < sha:
+                lo = mid + 1
+            elif mid_sha > sha:
+                hi = mid
+            else:
+                offset = unpack_from('>I', self.idx, self.offset_table_pos + 4 * mid)[0]
+                if offset & 0x80000000:
+                    large_offset_pos = self.large_offset_table_pos + 8 * (offset & 0x7fffffff)
+                    offset = unpack_from('>Q', self.idx, large_offset_pos)[0]
+                return offset
+
+        return None
+
+    def read_header(self, offset):
+
+        byte = self.pack[offset]
+        pos = offset + 1
+        obj_type, size, shift = (byte >> 4) & 7, byte & 0x0f, 4
+
+        while byte & 0x80:
+            byte = self.pack[pos]
+            pos += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+
+        return obj_type, size, pos
+
+    def read_ofs_delta_base_offset(self, offset, pos):
+
+        byte = self.pack[pos]
+        pos += 1
+        base_distance = byte & 0x7f
+
+        while byte & 0x80:
+            byte = self.pack[pos]
+            pos += 1
+            base_distance = ((base_distance + 1) << 7) | (byte & 0x7f)
+
+        return offset - base_distance, pos
+
+    def close(self):
+
+        self.idx.close()
+        self.pack.close()
+
+
+class CommitGraph:
+    # read only access to a (non split) commit-graph file
+
+    PARENT_NONE = 0x70000000
+    PARENT_EXTRA_EDGES = 0x80000000
+
+    def __init__(self, file_path):
+
+        with open(file_path, 'rb') as f:
+            self.graph = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+        if self.graph[:4] != b'CGPH' or self.graph[4] != 1 or self.graph[5] != 1:
+            raise ValueError(f'Unsupported commit-graph {file_path}.')
+        if self.graph[7] != 0:
+            raise ValueError(f'Split commit-graph {file_path} is not supported.')
+
+        self.chunk_pos = {}
+        for i in range(self.graph[6]):
+            chunk_id, chunk_pos = unpack_from('>4sQ', self.graph, 8 + 12 * i)
+            self.chunk_pos[chunk_id] = chunk_pos
+
+        self.fanout = unpack_from('>256I', self.graph, self.chunk_pos[b'OIDF'])
+        self.n_commits = self.fanout[255]
+
+    def find_position(self, sha):
+
+        lo = self.fanout[sha[0] - 1] if sha[0] else 0
+        hi = self.fanout[sha[0]]
+        oid_pos = self.chunk_pos[b'OIDL']
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_sha = self.graph[oid_pos + 20 * mid:oid_pos + 20 * mid + 20]
+
+            if mid_sha < sha:
+                lo = mid + 1
+            elif mid_sha > sha:
+                hi = mid
+            else:
+                return mid
+
+        return None
+
+    def get_sha(self, position):
+
+        oid_pos = self.chunk_pos[b'OIDL'] + 20 * position
+
+        return self.graph[oid_pos:oid_pos + 20]
+
+    def get_commit(self, position):
+        # (tree sha, parent shas, commit time)
+
+        data_pos = self.chunk_pos[b'CDAT'] + 36 * position
+        tree_sha = self.graph[data_pos:data_pos + 20]
+        parent_1, parent_2, generation_and_time_high, time_low = unpack_from('>IIII', self.graph, data_pos + 20)
+
+        parent_positions = [parent for parent in [parent_1] if parent != self.PARENT_NONE]
+        if parent_2 & self.PARENT_EXTRA_EDGES: # octopus merge, other parents in the EDGE chunk
+            edge_pos = self.chunk_pos[b'EDGE'] + 4 * (parent_2 & ~self.PARENT_EXTRA_EDGES)
+            while True:
+                edge = unpack_from('>I', self.graph, edge_pos)[0]
+                parent_positions.append(edge & ~self.PARENT_EXTRA_EDGES)
+                edge_pos += 4
+                if edge & self.PARENT_EXTRA_EDGES:
+                    break
+        elif parent_2 != self.PARENT_NONE:
+            parent_positions.append(parent_2)
+
+        commit_time = ((generation_and_time_high & 0x3) << 32) | time_low
+
+        return tree_sha, [self.get_sha(position) for position in parent_positions], commit_time
+
+    def close(self):
+
+        self.graph.close()
+
+
+class GitObjectStore:
+
+    OBJECT_CACHE_SIZE = 4096 # inflated pack objects, mostly delta bases
+    TREE_CACHE_SIZE = 65536 # parsed trees
+
+    def __init__(self, path_to_repo):
+        logger.info(f"Opening git object store of repo at {path_to_repo}.")
+
+        self.git_dir = self.__get_git_dir(path_to_repo)
+        self.objects_dir = join(self.git_dir, 'objects')
+
+        pack_dir = join(self.objects_dir, 'pack')
+        self.packs = [
+            PackFile(join(pack_dir, file_nm), join(pack_dir, file_nm[:-4] + '.pack'))
+            for file_nm in (sorted(listdir(pack_dir)) if isdir(pack_dir) else [])
+            if file_nm.endswith('.idx') and exists(join(pack_dir, file_nm[:-4] + '.pack'))
+        ]
+
+        self.commit_graph = None
+        commit_graph_path = join(self.objects_dir, 'info', 'commit-graph')
+        if exists(commit_graph_path):
+            try:
+                self.commit_graph = CommitGraph(commit_graph_path)
+            except ValueError as e:
+                logger.warning(f"Ignoring commit-graph: {e}")
+
+        self.object_cache = LRUCache(self.OBJECT_CACHE_SIZE)
+        self.tree_cache = LRUCache(self.TREE_CACHE_SIZE)
+
+    def __get_git_dir(self, path_to_repo):
+
+        dot_git_path = join(path_to_repo, '.git')
+
+        if isdir(dot_git_path):
+            return dot_git_path
+
+        if isfile(dot_git_path): # worktree or submodule -> "gitdir: <path>"
+            with open(dot_git_path) as f:
+                git_dir = f.read().strip()[len('gitdir: '):]
+            return git_dir if git_dir.startswith('/') else join(path_to_repo, git_dir)
+
+        return path_to_repo # bare repo
+
+    def __read_pack_object(self, pack, offset):
+
+        cache_key = (id(pack), offset)
+        cached = self.object_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        obj_type, size, pos = pack.read_header(offset)
+
+        if obj_type == OBJ_OFS_DELTA:
+            base_offset, pos = pack.read_ofs_delta_base_offset(offset, pos)
+            obj_type, base = self.__read_pack_object(pack, base_offset)
+            data = apply_delta(base, inflate(pack.pack, pos, size))
+
+        elif obj_type == OBJ_REF_DELTA:
+            obj_type, base = self.read_object(pack.pack[pos:pos + 20])
+            data = apply_delta(base, inflate(pack.pack, pos + 20, size))
+
+        else:
+            data = inflate(pack.pack, pos, size)
+
+        self.object_cache.put(cache_key, (obj_type, data))
+
+        return obj_type, data
+
+    def __read_loose_object(self, sha):
+
+        sha_hex = sha.hex()
+        file_path = join(self.objects_dir, sha_hex[:2], sha_hex[2:])
+
+        if not exists(file_path):
+            return None
+
+        with open(file_path, 'rb') as f:
+            raw = zlib.decompress(f.read())
+
+        header, _, data = raw.partition(b'\0')
+
+        return OBJ_TYPE_NM_TO_TYPE[header.split(b' ')[0]], data
+
+    def read_object(self, sha):
+        # (type, data) of the object with the given binary sha
+
+        for pack in self.packs:
+            offset = pack.find_offset(sha)
+            if offset is not None:
+                return self.__read_pack_object(pack, offset)
+
+        obj = self.__read_loose_object(sha)
+        if obj is None:
+            raise KeyError(f'Object {sha.hex()} not found.')
+
+        return obj
+
+    def read_tree(self, sha):
+        # set of raw "mode SP name NUL sha" entries of the tree with the given binary sha
+
+        tree = self.tree_cache.get(sha)
+        if tree is not None:
+            return tree
+
+        _, data = self.read_object(sha)
+        tree = frozenset(TREE_ENTRY_PATTERN.findall(data))
+
+        self.tree_cache.put(sha, tree)
+
+        return tree
+
+    def peel_to_commit(self, sha):
+        # commit pointed by an annotated tag (or the commit itself), None for tags on trees or blobs
+
+        obj_type, data = self.read_object(sha)
+
+        while obj_type == OBJ_TAG:
+            sha = bytes.fromhex(data[len(b'object '):len(b'object ') + 40].decode('ascii'))
+            obj_type, data = self.read_object(sha)
+
+        return sha if obj_type == OBJ_COMMIT else None
+
+    def get_ref_tips(self):
+        # same content as git for-each-ref + HEAD: {ref_nm: sha_hex}
+
+        ref_tips = {}
+
+        packed_refs_path = join(self.git_dir, 'packed-refs')
+        if exists(packed_refs_path):
+            with open(packed_refs_path) as f:
+                for line in f:
+                    if line[0] not in '#^':
+                        sha_hex, ref_nm = line.rstrip('\n').split(' ', 1)
+                        ref_tips[ref_nm] = sha_hex
+
+        for dir_path, _, file_nms in walk(join(self.git_dir, 'refs')):
+            for file_nm in file_nms:
+                file_path = join(dir_path, file_nm)
+                sha_hex = self.__resolve_ref_file(file_path)
+                if sha_hex is not None:
+                    ref_tips[relpath(file_path, self.git_dir).replace('\\', '/')] = sha_hex
+
+        head_sha_hex = self.__resolve_ref_file(join(self.git_dir, 'HEAD'), ref_tips)
+        ref_tips = dict(sorted(ref_tips.items()))
+        if head_sha_hex is not None:
+            ref_tips['HEAD'] = head_sha_hex
+
+        return ref_tips
+
+    def __resolve_ref_file(self, file_path, ref_tips=None):
+
+        with open(file_path) as f:
+            content = f.read().strip()
+
+        if not content.startswith('ref: '):
+            return content or None
+
+        target_ref_nm = content[len('ref: '):]
+        target_path = join(self.git_dir, target_ref_nm)
+
+        if exists(target_path):
+            return self.__resolve_ref_file(target_path)
+
+        return (ref_tips or {}).get(target_ref_nm)
+
+    def close(self):
+
+        for pack in self.packs:
+            pack.close()
+
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+
+
+def parse_commit(data):
+
+    header, _, msg = data.partition(b'\n\n')
+    commit = {'parents': [], 'encoding': 'utf-8', 'msg': msg}
+
+    for line in header.split(b'\n'):
+        key, _, value = line.partition(b' ')
+
+        if key == b'tree':
+            commit['tree'] = bytes.fromhex(value.decode('ascii'))
+        elif key == b'parent':
+            commit['parents'].append(bytes.fromhex(value.decode('ascii')))
+        elif key == b'author':
+            commit['author'] = value
+        elif key == b'committer':
+            commit['commit_time'] = int(value.rsplit(b' ', 2)[1])
+        elif key == b'encoding':
+            commit['encoding'] = value.decode('ascii')
+
+    return commit
+
+
+def format_subject(msg):
+    # git's %s: first paragraph of the message, lines stripped & joined by a space
+
+    lines = []
+    for line in msg.lstrip(b'\n').split(b'\n'):
+        line = line.rstrip()
+        if not line:
+            break
+        lines.append(line)
+
+    return b' '.join(lines)
+
+
+def format_author(author):
+    # (name, iso date in the author tz) from "name <email> timestamp tz"
+
+    ident, timestamp, tz = author.rsplit(b' ', 2)
+    name = ident[:ident.rfind(b'<')].strip()
+
+    tz = tz.decode('ascii')
+    tz_offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * (-1 if tz[0] == '-' else 1)
+    creation_dt = datetime.fromtimestamp(int(timestamp), timezone(tz_offset))
+
+    return name, f"{creation_dt.strftime('%Y-%m-%d %H:%M:%S')} {tz}"
+
+
+def split_lines(data):
+    # lines including their LF so that a missing final newline counts as a change, as in git
+
+    lines = data.split(b'\n')
+    last_line = lines.pop()
+
+    return [line + b'\n' for line in lines] + ([last_line] if last_line else [])
+
+
+def count_line_changes(old_data, new_data):
+    # (n inserted, n deleted) lines of a minimal diff
+
+    old_lines, new_lines = split_lines(old_data), split_lines(new_data)
+
+    # common prefix & suffix are never changed
+    start = 0
+    while start < len(old_lines) and start < len(new_lines) and old_lines[start] == new_lines[start]:
+        start += 1
+    old_end, new_end = len(old_lines), len(new_lines)
+    while old_end > start and new_end > start and old_lines[old_end - 1] == new_lines[new_end - 1]:
+        old_end, new_end = old_end - 1, new_end - 1
+
+    # lines absent from the other side can't be matched -> drop them before diffing
+    old_line_set, new_line_set = set(old_lines[start:old_end]), set(new_lines[start:new_end])
+    line_ids = {}
+    old_seq = [line_ids.setdefault(line, len(line_ids)) for line in old_lines[start:old_end] if line in new_line_set]
+    new_seq = [line_ids.setdefault(line, len(line_ids)) for line in new_lines[start:new_end] if line in old_line_set]
+
+    n_common = count_common_lines(old_seq, new_seq)
+
+    return new_end - start - n_common, old_end - start - n_common
+
+
+def count_common_lines(old_seq, new_seq):
+    # length of the longest common subsequence using Myers O(ND) greedy algorithm
+
+    n, m = len(old_seq), len(new_seq)
+    if n == 0 or m == 0:
+        return 0
+
+    max_d = n + m
+    offset = max_d + 1
+    furthest_x = [0] * (2 * max_d + 3)
+    cost = 0
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+
+            if k == -d or (k != d and furthest_x[offset + k - 1] < furthest_x[offset + k + 1]):
+                x = furthest_x[offset + k + 1]
+            else:
+                x = furthest_x[offset + k - 1] + 1
+            y = x - k
+
+            while x < n and y < m and old_seq[x] == new_seq[y]:
+                x, y = x + 1, y + 1
+            furthest_x[offset + k] = x
+
+            if x >= n and y >= m:
+                return (n + m - d) // 2
+
+        cost += d + 1
+        if cost > MAX_DIFF_COST: # pathological diff, keep the matches of the furthest path found so far
+            logger.debug(f"Diff of {n} & {m} lines exceeds max cost, counting remaining lines as changed.")
+            return max((2 * furthest_x[offset + k] - k - d) // 2 for k in range(-d, d + 1, 2))
+
+    return 0
+
+
+class ObjectStoreLogReader:
+    # git log --numstat equivalent reading commits & trees straight from the object store
+    # renames are only detected when the blob is unchanged (exact renames)
+
+    def __init__(self, path_to_repo, revisions=None, detect_renames=True):
+
+        self.store = GitObjectStore(path_to_repo)
+        self.revisions = revisions # as for GitLogParser: [tip, '^excluded_tip'], all refs if None
+        self.detect_renames = detect_renames
+
+    def __get_commit_node(self, sha):
+        # (tree sha, commit time, parent shas), from the commit-graph when available
+
+        commit_graph = self.store.commit_graph
+        if commit_graph is not None:
+            position = commit_graph.find_position(sha)
+            if position is not None:
+                tree_sha, parents, commit_time = commit_graph.get_commit(position)
+                return tree_sha, commit_time, parents
+
+        commit = parse_commit(self.store.read_object(sha)[1])
+
+        return commit['tree'], commit['commit_time'], commit['parents']
+
+    def __get_revision_shas(self):
+
+        if self.revisions is None:
+            tips = list(self.store.get_ref_tips().values())
+            tips = [tips[-1]] + tips[:-1] if 'HEAD' in self.store.get_ref_tips() else tips
+            return [bytes.fromhex(tip) for tip in tips], []
+
+        included = [bytes.fromhex(rev) for rev in self.revisions if not rev.startswith('^')]
+        excluded = [bytes.fromhex(rev[1:]) for rev in self.revisions if rev.startswith('^')]
+
+        return included, excluded
+
+    def __get_ancestors(self, shas):
+
+        ancestors, to_visit = set(), list(shas)
+
+        while to_visit:
+            sha = to_visit.pop()
+            if sha not in ancestors:
+                ancestors.add(sha)
+                to_visit += self.__get_commit_node(sha)[2]
+
+        return ancestors
+
+    def iter_commit_shas(self):
+        # commits in git log order: most recent commit date first
+
+        included, excluded = self.__get_revision_shas()
+        included = [self.store.peel_to_commit(sha) for sha in included]
+        excluded = [self.store.peel_to_commit(sha) for sha in excluded]
+
+        seen = self.__get_ancestors([sha for sha in excluded if sha is not None])
+        queue, counter = [], 0
+
+        for sha in included:
+            if sha is not None and sha not in seen:
+                seen.add(sha)
+                _, commit_time, parents = self.__get_commit_node(sha)
+                heappush(queue, (-commit_time, counter, sha, parents))
+                counter += 1
+
+        while queue:
+            _, _, sha, parents = heappop(queue)
+            yield sha
+
+            for parent in parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    _, commit_time, grand_parents = self.__get_commit_node(parent)
+                    heappush(queue, (-commit_time, counter, parent, grand_parents))
+                    counter += 1
+
+    def __iter_tree_changes(self, old_tree_sha, new_tree_sha, prefix=''):
+        # (path, old (mode, sha) or None, new (mode, sha) or None) of changed files, identical subtrees are skipped
+
+        if old_tree_sha == new_tree_sha:
+            return
+
+        old_tree = self.store.read_tree(old_tree_sha) if old_tree_sha is not None else frozenset()
+        new_tree = self.store.read_tree(new_tree_sha) if new_tree_sha is not None else frozenset()
+
+        # only the entries that differ are parsed, as sets the unchanged ones cancel out in C
+        old_entries, new_entries = {}, {}
+        for entry in old_tree ^ new_tree:
+            mode, _, name = entry[:-21].partition(b' ')
+            (old_entries if entry in old_tree else new_entries)[name] = (mode, entry[-20:])
+
+        def sort_key(name):
+            # git sorts tree entries as if directory names ended with a slash
+            entry = old_entries.get(name) or new_entries.get(name)
+            return name + b'/' if entry[0] == TREE_MODE else name
+
+        for name in sorted(old_entries.keys() | new_entries.keys(), key=sort_key):
+
+            old_entry, new_entry = old_entries.get(name), new_entries.get(name)
+            name = name.decode('utf-8', errors='replace')
+
+            old_is_tree = old_entry is not None and old_entry[0] == TREE_MODE
+            new_is_tree = new_entry is not None and new_entry[0] == TREE_MODE
+
+            if old_is_tree or new_is_tree:
+                yield from self.__iter_tree_changes(
+                    old_entry[1] if old_is_tree else None,
+                    new_entry[1] if new_is_tree else None,
+                    f'{prefix}{name}/'
+                )
+
+            old_file_entry = None if old_is_tree else old_entry
+            new_file_entry = None if new_is_tree else new_entry
+            if old_file_entry is not None or new_file_entry is not None:
+                yield f'{prefix}{name}', old_file_entry, new_file_entry
+
+    def __read_blob(self, entry):
+
+        return b'' if entry is None else self.store.read_object(entry[1])[1]
+
+    def __count_file_changes(self, old_entry, new_entry):
+
+        if SUBMODULE_MODE in (old_entry or (None,))[:1] + (new_entry or (None,))[:1]:
+            return int(new_entry is not None), int(old_entry is not None)
+
+        if old_entry is not None and new_entry is not None and old_entry[1] == new_entry[1]:
+            return 0, 0 # mode change only
+
+        old_data, new_data = self.__read_blob(old_entry), self.__read_blob(new_entry)
+
+        if b'\0' in old_data[:BINARY_SNIFF_SIZE] or b'\0' in new_data[:BINARY_SNIFF_SIZE]:
+            return '-', '-'
+
+        return count_line_changes(old_data, new_data)
+
+    def __pair_exact_renames(self, changes):
+        # deleted & added files with the same (non empty) blob are reported as a single renamed file
+
+        deleted_shas = {}
+        for path, old_entry, new_entry in changes:
+            if new_entry is None and old_entry[0] != SUBMODULE_MODE and old_entry[1] != EMPTY_BLOB_SHA:
+                deleted_shas.setdefault(old_entry[1], []).append(path)
+
+        renamed = {}
+        for path, old_entry, new_entry in changes:
+            if old_entry is None and new_entry[1] in deleted_shas and deleted_shas[new_entry[1]]:
+                renamed[path] = deleted_shas[new_entry[1]].pop(0)
+
+        old_paths = set(renamed.values())
+
+        return [
+            (path, old_entry, new_entry, renamed.get(path))
+            for path, old_entry, new_entry in changes
+            if path not in old_paths or new_entry is not None
+        ]
+
+    def iter_commits(self):
+        # (commit_id, creation_dt, author_nm, msg, [(file_path, n_lines_inserted, n_lines_deleted)])
+
+        from src.git_log_parsing import format_file_renaming # to avoid circular import
+
+        for sha in self.iter_commit_shas():
+
+            commit = parse_commit(self.store.read_object(sha)[1])
+            author_nm, creation_dt = format_author(commit['author'])
+
+            files = []
+            if len(commit['parents']) <= 1: # as git log, no diff for merge commits
+                parent_tree_sha = self.__get_commit_node(commit['parents'][0])[0] if commit['parents'] else None
+
+                changes = [
+                    (path, old_entry, new_entry, None)
+                    for path, old_entry, new_entry in self.__iter_tree_changes(parent_tree_sha, commit['tree'])
+                ]
+                if self.detect_renames:
+                    changes = self.__pair_exact_renames([change[:3] for change in changes])
+
+                for path, old_entry, new_entry, old_path in changes:
+                    if old_path is not None:
+                        files.append((format_file_renaming(old_path, path), 0, 0))
+                    else:
+                        files.append((path, *self.__count_file_changes(old_entry, new_entry)))
+
+            yield (
+                sha.hex(),
+                creation_dt,
+                author_nm.decode(commit['encoding'], errors='replace'),
+                format_subject(commit['msg']).decode(commit['encoding'], errors='replace'),
+                files
+            )
+
+    def close(self):
+
+        self.store.close()
@@ -1,22 +1,35 @@
-from os.path import join
+from typing import Union
+from os import listdir, makedirs, remove, replace, stat
+from os.path import basename, join, exists, getsize
+from shutil import rmtree
+import json
 
 from yaml import load, FullLoader
 
+from numpy import int32, int64
 from pandas import (
-    read_parquet,
-    DataFrame, 
-    read_csv
+    Categorical,
+    DataFrame,
+    DatetimeIndex,
+    Index,
+    Series,
+    Timestamp,
+    to_datetime
 )
+from pyarrow import Table, DictionaryArray, schema, string, timestamp, uint32, binary, array, concat_tables
+from pyarrow.parquet import ParquetFile, ParquetWriter, read_schema, read_table, write_table
+from pyarrow.types import is_dictionary, is_fixed_size_binary
 
 VAR_NM_TO_REF_TYPE = {
     'id':'string',
+    'idx':'uint32',
     'creation_dt':'datetime69[ns]',
     'msg':'string',
     'author_nm':'string',
     'file_nm':'string',
     'n_lines_inserted':'uint32',
     'n_lines_deleted':'uint32',
-    'commit_id':'string',
+    'commit_idx':'uint32',
     'ext':'string',
     'is_src':'bool',
     'is_test':'bool',
@@ -24,33 +37,507 @@ VAR_NM_TO_REF_TYPE = {
     'component_nm':'string'
 }
 
+LOG_LEVEL_TO_RAW_SCHEMA = {
+    'commit':schema([
+        ('id', string()),
+        ('idx', uint32()), # dense integer id given at parse time, the hash is only stored here
+        ('creation_dt', timestamp('s', tz='UTC')),
+        ('author_nm', string()),
+        ('msg', string()),
+    ]),
+    'commit_file':schema([
+        ('commit_idx', uint32()),
+        ('file_path', string()),
+        ('n_lines_inserted', uint32()),
+        ('n_lines_deleted', uint32()),
+    ]),
+    'file_rename':schema([ # renames & copies detected by git log, one row per renamed commit_file row
+        ('commit_idx', uint32()),
+        ('file_path', string()),
+        ('old_path', string()),
+        ('new_path', string()),
+    ]),
+}
+
+# cleaned columns repeating a few values over many rows, stored dictionary encoded & loaded as categoricals
+CLEAN_CATEGORICAL_COL_NMS = ['author_nm', 'file_path', 'ext', 'module_nm', 'component_nm']
+CLEAN_HASH_COL_NMS = ['id'] # hex commit hashes, stored as fixed width binary
+
+# time bucket id of the rows for each frequency picked by the dashboard, counted from 1970 (UTC), weeks are ISO
+# weeks (monday to sunday) like the 'W' resample bins
+FREQ_TO_TIME_BUCKET_COL_NM = {
+    '1D':'day_idx',
+    'D':'day_idx',
+    'W':'week_idx',
+    'M':'month_idx',
+    'Q':'quarter_idx',
+    'Y':'year_idx',
+}
+
+CLEAN_ROW_GROUP_SIZE = 16_384
+
+RAW_COMPRESSION = 'zstd'
+RAW_DT_FORMAT = '%Y-%m-%d %H:%M:%S %z' # git log --date=iso
+
 DATA_PATH = './data'
 CONFIG_PATH = './config'
 
 
-def read_raw(codebase_nm:str, log_level:str) -> DataFrame:
+def get_part_paths(dir_path:str) -> list:
+
+    if not exists(dir_path):
+        return []
+
+    return sorted(join(dir_path, file_nm) for file_nm in listdir(dir_path) if file_nm.endswith('.parquet'))
+
+
+def get_next_part_path(dir_path:str) -> str:
+
+    return join(dir_path, f'part-{len(get_part_paths(dir_path)):05d}.parquet')
+
+
+def get_raw_dir_path(codebase_nm:str, log_level:str) -> str:
+
+    return join(DATA_PATH, f'{codebase_nm}_raw_{log_level}')
+
+
+def get_raw_part_paths(codebase_nm:str, log_level:str) -> list:
+
+    return get_part_paths(get_raw_dir_path(codebase_nm, log_level))
+
+
+def cast_to_raw_types(df:DataFrame) -> DataFrame:
+
+    if 'creation_dt' in df.columns and df.creation_dt.dtype == object:
+        df = df.assign(creation_dt = to_datetime(df.creation_dt, format=RAW_DT_FORMAT, utc=True))
+
+    return df
+
+
+class RawDatasetWriter:
+    # raw datasets are directories of parquet parts, each run of the parser writes a new part
+    # made of one row group per parsed batch
+
+    def __init__(self, codebase_nm:str, log_level:str, append:bool=False) -> None:
+
+        self.schema = LOG_LEVEL_TO_RAW_SCHEMA[log_level]
+
+        makedirs(get_raw_dir_path(codebase_nm, log_level), exist_ok=True)
+        if not append:
+            for part_path in get_raw_part_paths(codebase_nm, log_level):
+                remove(part_path)
+
+        self.file_path = get_next_part_path(get_raw_dir_path(codebase_nm, log_level))
+        self.writer = None
+
+    def write(self, df:DataFrame) -> None:
+
+        table = Table.from_pandas(cast_to_raw_types(df), schema=self.schema, preserve_index=False)
+
+        if self.writer is None:
+            self.writer = ParquetWriter(self.file_path, self.schema, compression=RAW_COMPRESSION)
+
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def is_raw_schema_current(codebase_nm:str, log_level:str) -> bool:
+    # parts written by older versions of the parser lack columns (ex: the integer commit ids)
+
+    return all(
+        read_schema(part_path).names == LOG_LEVEL_TO_RAW_SCHEMA[log_level].names
+        for part_path in get_raw_part_paths(codebase_nm, log_level)
+    )
+
+
+def read_raw(
+        codebase_nm:str, log_level:str, part_nms:Union[list, None]=None, col_nms:Union[list, None]=None
+    ) -> DataFrame:
     
-    file_path = join(DATA_PATH, f'{codebase_nm}_raw_{log_level}.csv')
-    return read_csv(file_path)
+    part_paths = get_raw_part_paths(codebase_nm, log_level)
+
+    if not part_paths:
+        raise FileNotFoundError(f'No raw {log_level} dataset found for {codebase_nm}.')
+
+    if part_nms is not None: # only some parts, possibly none
+        part_paths = [part_path for part_path in part_paths if basename(part_path) in part_nms]
+
+    # later parts hold later commits, newest part first keeps the rows in git log order (newest commit first)
+    tables = [read_table(part_path, columns=col_nms) for part_path in reversed(part_paths)]
+
+    if not tables:
+        tables = [LOG_LEVEL_TO_RAW_SCHEMA[log_level].empty_table().select(col_nms or LOG_LEVEL_TO_RAW_SCHEMA[log_level].names)]
+
+    return concat_tables(tables).to_pandas()
+
+
+def iter_raw(codebase_nm:str, log_level:str, batch_size:int, col_nms:Union[list, None]=None):
+    # batches of at most batch_size rows, in git log order (newest commit first)
+
+    part_paths = get_raw_part_paths(codebase_nm, log_level)
+
+    if not part_paths:
+        raise FileNotFoundError(f'No raw {log_level} dataset found for {codebase_nm}.')
 
+    for part_path in reversed(part_paths):
+        for batch in ParquetFile(part_path).iter_batches(batch_size=batch_size, columns=col_nms):
+            yield batch.to_pandas()
 
-def save_raw(df:DataFrame, codebase_nm:str, log_level:str) -> DataFrame:
+
+def save_raw(df:DataFrame, codebase_nm:str, log_level:str, append:bool=False) -> None:
     
-    file_path = join(DATA_PATH, f'{codebase_nm}_raw_{log_level}.csv')
-    df.to_csv(file_path, index=False)
+    with RawDatasetWriter(codebase_nm, log_level, append) as writer:
+        writer.write(df)
+
+
+def has_raw(codebase_nm:str, log_level:str) -> bool:
+
+    return len(get_raw_part_paths(codebase_nm, log_level)) > 0
+
+
+def get_raw_fingerprints(codebase_nm:str) -> dict:
+    # size & modification time of each raw part, parts are written once so a changed fingerprint means a reparse
+
+    fingerprints = {}
+    for log_level in LOG_LEVEL_TO_RAW_SCHEMA:
+        part_paths = get_raw_part_paths(codebase_nm, log_level)
+        if part_paths:
+            fingerprints[log_level] = {
+                basename(part_path): [getsize(part_path), stat(part_path).st_mtime_ns] for part_path in part_paths
+            }
+
+    return fingerprints
+
+
+def read_state(codebase_nm:str, stage_nm:str) -> Union[dict, None]:
+
+    file_path = join(DATA_PATH, f'{codebase_nm}_{stage_nm}_state.json')
+
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(state:dict, codebase_nm:str, stage_nm:str) -> None:
+
+    file_path = join(DATA_PATH, f'{codebase_nm}_{stage_nm}_state.json')
+
+    with open(file_path, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+def encode_hashes(srs:Series):
+    # dictionary of fixed width binary hashes, hashes are decoded once per distinct commit
+
+    srs = srs.astype('category')
+    hashes = srs.cat.categories.astype(str)
+
+    if len(hashes) == 0 or hashes.str.len().nunique() != 1 or len(hashes[0]) % 2 or not hashes.str.fullmatch('[0-9a-f]+').all():
+        return array(srs) # not (only) git hashes, dictionary of strings
+
+    return DictionaryArray.from_arrays(
+        srs.cat.codes.values.astype('int32'),
+        array([bytes.fromhex(commit_hash) for commit_hash in hashes], type=binary(len(hashes[0]) // 2)),
+        from_pandas=True # -1 codes are nulls
+    )
+
+
+def decode_hashes(srs:Series) -> Series:
+
+    return srs.cat.rename_categories([commit_hash.hex() for commit_hash in srs.cat.categories])
+
+
+def get_aggregated(df:DataFrame, keys:list, **named_aggs) -> DataFrame:
+    # pandas drops the null labels of categorical keys even with dropna=False, categorical columns are grouped by
+    # their codes (-1 for nulls) and get their labels back once aggregated
+
+    cat_col_nms = [key for key in keys if isinstance(key, str) and df[key].dtype == 'category']
+
+    df_aggregated = (
+        df
+        .assign(**{col_nm: df[col_nm].cat.codes for col_nm in cat_col_nms})
+        .groupby(keys, dropna=False, sort=True)
+        .agg(**named_aggs)
+        .reset_index()
+    )
+
+    return df_aggregated.assign(**{
+        col_nm: Categorical.from_codes(df_aggregated[col_nm], dtype=df[col_nm].dtype) for col_nm in cat_col_nms
+    })
+
+
+def get_cleaned_dir_path(codebase_nm:str, log_level:str) -> str:
+
+    return join(DATA_PATH, f'{codebase_nm}_clean_{log_level}')
+
+
+def get_cleaned_months(codebase_nm:str, log_level:str) -> list:
+
+    dir_path = get_cleaned_dir_path(codebase_nm, log_level)
+
+    if not exists(dir_path):
+        return []
+
+    return sorted(dir_nm[len('month='):] for dir_nm in listdir(dir_path) if dir_nm.startswith('month='))
+
+
+def get_cleaned_part_paths(codebase_nm:str, log_level:str, months:Union[list, None]=None) -> list:
+    # in chronological order, a part per month
+
+    if months is None:
+        months = get_cleaned_months(codebase_nm, log_level)
+
+    dir_path = get_cleaned_dir_path(codebase_nm, log_level)
+
+    return [part_path for month in months for part_path in get_part_paths(join(dir_path, f'month={month}'))]
+
+
+def get_cleaned_fingerprints(codebase_nm:str, log_level:str) -> dict:
+    # size & modification time of the part of each month, a changed fingerprint means a rewritten month
+
+    return {
+        month: [getsize(part_path), stat(part_path).st_mtime_ns]
+        for month in get_cleaned_months(codebase_nm, log_level)
+        for part_path in get_cleaned_part_paths(codebase_nm, log_level, [month])
+    }
+
+
+def has_cleaned_col_nms(codebase_nm:str, log_level:str, col_nms:list) -> bool:
+    # parts written by older versions of prep_data lack columns (ex: the time bucket ids)
+
+    return all(
+        set(col_nms) <= set(read_schema(part_path).names)
+        for part_path in get_cleaned_part_paths(codebase_nm, log_level)
+    )
+
+
+def get_time_bucket_idxs(creation_dts:Series) -> dict:
+
+    days = creation_dts.dt.tz_convert('UTC').values.astype('datetime64[D]').astype(int64)
+    months = creation_dts.dt.tz_convert('UTC').values.astype('datetime64[M]').astype(int64)
+
+    return {
+        'day_idx': days.astype(int32),
+        'week_idx': ((days + 3) // 7).astype(int32), # 1970-01-01 is a thursday
+        'month_idx': months.astype(int32),
+        'quarter_idx': (months // 3).astype(int32),
+        'year_idx': (months // 12).astype(int32),
+    }
+
+
+def get_time_bucket_labels(bucket_idxs, freq:str) -> DatetimeIndex:
+    # last day of the buckets, the labels of the resample bins
+
+    bucket_idxs = bucket_idxs.astype(int64)
+    bucket_col_nm = FREQ_TO_TIME_BUCKET_COL_NM[freq]
+
+    if bucket_col_nm == 'day_idx':
+        days = bucket_idxs
+    elif bucket_col_nm == 'week_idx':
+        days = bucket_idxs * 7 + 3 # sunday
+    else:
+        n_months = {'month_idx': 1, 'quarter_idx': 3, 'year_idx': 12}[bucket_col_nm]
+        next_months = ((bucket_idxs + 1) * n_months).astype('datetime64[M]')
+        days = next_months.astype('datetime64[D]').astype(int64) - 1
+
+    return DatetimeIndex(days.astype('datetime64[D]').astype('datetime64[ns]')).tz_localize('UTC')
+
+
+def has_cleaned(codebase_nm:str, log_level:str) -> bool:
+
+    return len(get_cleaned_part_paths(codebase_nm, log_level)) > 0
+
+
+def to_utc_timestamp(dt) -> Timestamp:
+    # naive datetimes are taken as UTC, as creation_dt
+
+    dt = Timestamp(dt)
+
+    return dt.tz_localize('UTC') if dt.tz is None else dt.tz_convert('UTC')
+
+
+def write_cleaned_part(df:DataFrame, file_path:str) -> None:
+
+    df = df.astype({col_nm:'category' for col_nm in CLEAN_CATEGORICAL_COL_NMS if col_nm in df.columns})
+    for col_nm in df.columns[df.dtypes == 'category']:
+        df[col_nm] = df[col_nm].cat.remove_unused_categories() # a part only stores the labels of its rows
+        if len(df[col_nm].cat.categories) == 0: # all nulls, typed as strings to match the other parts
+            df[col_nm] = df[col_nm].cat.set_categories(Index([], dtype='string'))
+
+    table = Table.from_pandas(df, preserve_index=False)
+
+    for col_nm in CLEAN_HASH_COL_NMS:
+        if col_nm in df.columns:
+            table = table.set_column(table.schema.get_field_index(col_nm), col_nm, encode_hashes(df[col_nm]))
+
+    # rows are sorted by creation_dt, the statistics of small row groups let readers skip most of them
+    write_table(
+        table,
+        file_path,
+        version="2.4",
+        row_group_size=CLEAN_ROW_GROUP_SIZE,
+        use_dictionary=[col_nm for col_nm in CLEAN_CATEGORICAL_COL_NMS + CLEAN_HASH_COL_NMS if col_nm in df.columns],
+        write_statistics=True
+    )
+
+
+def read_cleaned_parts(part_paths:list, filters:Union[list, None]=None, col_nms:Union[list, None]=None) -> DataFrame:
+
+    tables = [read_table(part_path, columns=col_nms, filters=filters) for part_path in part_paths]
+
+    # parts have dictionaries of different index widths, they are cast to the widest one before the concatenation
+    if tables:
+        fields = []
+        for field in tables[0].schema:
+            types = [table.schema.field(field.name).type for table in tables]
+            if all(is_dictionary(type_) for type_ in types):
+                field = field.with_type(max(types, key=lambda type_: type_.index_type.bit_width))
+            fields.append(field)
+        tables = [table.cast(schema(fields, metadata=tables[0].schema.metadata)) for table in tables]
+
+    table = concat_tables(tables)
+
+    # parquet gives fixed width binary columns back plain, they are dictionary encoded before the conversion
+    hash_col_nms = [
+        col_nm for col_nm in CLEAN_HASH_COL_NMS
+        if col_nm in table.column_names and is_fixed_size_binary(table.schema.field(col_nm).type)
+    ]
+    for col_nm in hash_col_nms:
+        table = table.set_column(
+            table.schema.get_field_index(col_nm), col_nm, table.column(col_nm).dictionary_encode()
+        )
+
+    df = table.to_pandas()
+
+    for col_nm in hash_col_nms:
+        df[col_nm] = decode_hashes(df[col_nm])
+
+    # parquet dictionaries come back in order of appearance, sorted categories keep groupby outputs sorted
+    for col_nm in df.columns[df.dtypes == 'category']:
+        if not df[col_nm].cat.categories.is_monotonic_increasing:
+            df[col_nm] = df[col_nm].cat.reorder_categories(df[col_nm].cat.categories.sort_values())
+
+    return df
+
+
+class CleanedDatasetWriter:
+    # cleaned datasets are partitioned by month of creation_dt, a part per month sorted by creation_dt
+    # written rows are spilled by month as they come, each month is merged & sorted once on close so that
+    # only a batch of rows or a month is in memory at a time
+
+    def __init__(self, codebase_nm:str, log_level:str, append:bool=False) -> None:
+
+        self.dir_path = get_cleaned_dir_path(codebase_nm, log_level)
+        self.spill_dir_path = f'{self.dir_path}_spill'
+
+        makedirs(self.dir_path, exist_ok=True)
+        if not append:
+            for dir_nm in listdir(self.dir_path):
+                rmtree(join(self.dir_path, dir_nm))
+
+        if exists(self.spill_dir_path): # left by an interrupted run
+            rmtree(self.spill_dir_path)
+
+    def write(self, df:DataFrame) -> None:
+
+        creation_dts = df.creation_dt.dt.tz_convert('UTC')
+
+        for month_key, df_month in df.groupby((creation_dts.dt.year * 100 + creation_dts.dt.month).values, sort=True):
+
+            month_dir_path = join(self.spill_dir_path, f'month={month_key // 100:04d}-{month_key % 100:02d}')
+            makedirs(month_dir_path, exist_ok=True)
+
+            write_cleaned_part(df_month.sort_values('creation_dt', kind='stable'), get_next_part_path(month_dir_path))
+
+    def close(self) -> None:
+
+        if not exists(self.spill_dir_path):
+            return
+
+        for month_dir_nm in sorted(listdir(self.spill_dir_path)):
+
+            spill_paths = get_part_paths(join(self.spill_dir_path, month_dir_nm))
+            makedirs(join(self.dir_path, month_dir_nm), exist_ok=True)
+            part_path = join(self.dir_path, month_dir_nm, 'part-00000.parquet')
+
+            if len(spill_paths) == 1 and not exists(part_path): # already sorted
+                replace(spill_paths[0], part_path)
+                continue
+
+            # rows in the order they were written then the prepared ones, the stable sort keeps that order for
+            # equal creation_dt: batches are written in git log order & appended rows are of later commits
+            if exists(part_path):
+                spill_paths.append(part_path)
+            df_month = read_cleaned_parts(spill_paths)
+            write_cleaned_part(df_month.sort_values('creation_dt', kind='stable'), part_path)
+
+        rmtree(self.spill_dir_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+
+        if exc_type is None:
+            self.close()
+        elif exists(self.spill_dir_path):
+            rmtree(self.spill_dir_path)
+
+
+def save_cleaned(df:DataFrame, codebase_nm:str, log_level:str, append:bool=False) -> None:
+    
+    with CleanedDatasetWriter(codebase_nm, log_level, append) as writer:
+        writer.write(df)
+
+
+def read_cleaned(
+    codebase_nm:str,
+    log_level:str,
+    index_col_nm:Union[str, None]='creation_dt',
+    start_dt=None,
+    end_dt=None,
+    filters:Union[list, None]=None
+    ) -> DataFrame:
+    # rows with start_dt <= creation_dt <= end_dt, only the parts of their months are read
+    # filters are pyarrow filters on the other columns ex: [('ext', '!=', 'other')], pushed down to the row groups
+
+    months = get_cleaned_months(codebase_nm, log_level)
 
-def save_cleaned(df:DataFrame, codebase_nm:str, log_level:str) -> None:
+    if not months:
+        raise FileNotFoundError(f'No cleaned {log_level} dataset found for {codebase_nm}.')
 
-    file_path = join(DATA_PATH, f'{codebase_nm}_clean_{log_level}.parquet')
-    df.to_parquet(file_path, engine='pyarrow', version="2.4")
+    part_paths = get_cleaned_part_paths(codebase_nm, log_level, months)
+    filters = list(filters or [])
 
+    if start_dt is not None:
+        start_dt = to_utc_timestamp(start_dt)
+        months = [month for month in months if month >= start_dt.strftime('%Y-%m')]
+        filters.append(('creation_dt', '>=', start_dt))
+    if end_dt is not None:
+        end_dt = to_utc_timestamp(end_dt)
+        months = [month for month in months if month <= end_dt.strftime('%Y-%m')]
+        filters.append(('creation_dt', '<=', end_dt))
 
-def read_cleaned(codebase_nm:str, log_level:str) -> DataFrame:
+    # out of the period of the dataset, a part is still read for the columns, its rows are all filtered out
+    part_paths = get_cleaned_part_paths(codebase_nm, log_level, months) or part_paths[:1]
+    df = read_cleaned_parts(part_paths, filters or None)
 
-    file_path = join(DATA_PATH, f'{codebase_nm}_clean_{log_level}.parquet')
-    df = read_parquet(file_path, engine='pyarrow')
+    if index_col_nm is None:
+        return df
 
-    return df.set_index('creation_dt')
+    return df.set_index(index_col_nm)
 
 
 def load_config(scope_nm):
@@ -5,12 +5,14 @@ from dash import Dash, html, dcc, Output, Input, callback_context
 from dash_bootstrap_components import Container, Col, Row, Button, Offcanvas, Navbar
 from dash_bootstrap_components.themes import BOOTSTRAP
 
-from src.utilities import read_cleaned
-from src.fig_generation import FigGenerator
+from src.utilities import read_cleaned, get_cleaned_months, has_cleaned, get_cleaned_fingerprints
+from src.fig_generation import FigGenerator, QueryPlan, FigCache
+from src.bitmap_indexing import BitmapIndex
 from src.config_management import ConfigManager
 
 CMD_NM = 'visualize'
 INPUT_PERSISTENCE_LOCATION = False
+FIG_CACHE_MAX_N_BYTES = 64 * 2**20
 
 # Set up logging configuration
 logging.basicConfig(
@@ -27,19 +29,35 @@ class Dashboard:
     VIEW_NMS = ['overview', 'coding_activity', 'knowledge_perenity']
     analysis_axis = ["module_nm", "author_nm", "ext"]
 
-    def __init__(self, specs, codebase_nm) -> None:
+    def __init__(self, specs, codebase_nm, n_months=None) -> None:
         logger.info(f"Initializing Dashboard for {codebase_nm}.")
         
         self.specs = specs
         self.codebase_nm = codebase_nm
-       
-        self.df_base = read_cleaned(codebase_nm, 'commit_file')
-        self.df_base = self.df_base.query('ext != "other"')
+        self.start_dt = self.get_start_dt(n_months)
+
+        # sums & counts of rows come from the rollup built by prep_data, the rows are only loaded for the
+        # figures it can't answer
+        self.is_rollup = has_cleaned(codebase_nm, 'rollup')
+        self.df_base = self.read_base_df('rollup' if self.is_rollup else 'commit_file')
+        self.df_rows_base = None if self.is_rollup else self.df_base
         self.df_current = self.df_base.copy(deep=True)
 
+        # figures already generated for a view & filters are reused until the cleaned datasets change
+        self.fig_cache = FigCache(FIG_CACHE_MAX_N_BYTES)
+        self.dataset_version = FigCache.get_key(
+            self.start_dt,
+            get_cleaned_fingerprints(codebase_nm, 'commit_file'),
+            get_cleaned_fingerprints(codebase_nm, 'rollup')
+        )
+
         if 'component_nm' in self.df_base.columns:
             self.analysis_axis.append('component_nm')
 
+        # rows of each label of the axes, a filter change only reads the rows of the selected labels
+        self.filter_index = BitmapIndex(self.df_base, self.analysis_axis)
+        self.rows_filter_index = None if self.is_rollup else self.filter_index
+
         self.current_view_nm = 'overview'
 
         self.app = Dash(__name__, external_stylesheets=[BOOTSTRAP])
@@ -47,23 +65,45 @@ class Dashboard:
         self.handle_mono_language_case()
         self.init_filter()
 
+    def get_start_dt(self, n_months):
+        # first day of the n last months holding commits, only their partitions are read
+
+        months = get_cleaned_months(self.codebase_nm, 'commit_file')
+
+        if n_months is None or len(months) <= n_months:
+            return None
+
+        logger.info(f"Loading the commits of the last {n_months} months, from {months[-n_months]}.")
+        return pd.Timestamp(f'{months[-n_months]}-01', tz='UTC')
+
+    def read_base_df(self, log_level):
+        logger.info(f"Loading the cleaned {log_level} of {self.codebase_nm}.")
+
+        df = read_cleaned(self.codebase_nm, log_level, start_dt=self.start_dt, filters=[('ext', '!=', 'other')])
+
+        # periods are filtered as ranges of rows
+        return df if df.index.is_monotonic_increasing else df.sort_index(kind='stable')
+
     def handle_mono_language_case(self):
 
         if self.df_base.ext.nunique() == 1:
-            del self.specs['knowledge_perenity']['layout']['lang_specialization']
-            del self.specs['knowledge_perenity']['stats']['lang_specialization']
+            view_specs = self.specs['knowledge_perenity']
+            view_specs['layout'] = [
+                row_stat_ids for row_stat_ids in (
+                    [stat_id for stat_id in row_stat_ids if stat_id != 'lang_specialization']
+                    for row_stat_ids in view_specs['layout']
+                )
+                if row_stat_ids
+            ]
+            del view_specs['stats']['lang_specialization']
 
     def init_filter(self):
         logger.info("Initializing filters for Dashboard.")
         
         self.filter_state = {
-            axis: {"value": None, "mask": self.get_base_mask()}
+            axis: {"value": None}
             for axis in self.analysis_axis + ["period"]
         }
-
-    def get_base_mask(self):
-        logger.debug("Getting base mask (all True).")
-        return pd.Series([True] * len(self.df_base)).values
     
     def set_initial_layout(self):
         logger.info("Setting initial layout for Dashboard.")
@@ -187,7 +227,7 @@ class Dashboard:
         min_prop_of_max = 0.05
         key_labels = (
             self.df_base
-            .groupby(axis)
+            .groupby(axis, observed=True)
             .n_lines_inserted.sum()
             .sort_values(ascending=False)
             .pipe(lambda srx: srx.loc[srx > min_prop_of_max * srx.iloc[0]].index.tolist())
@@ -201,18 +241,7 @@ class Dashboard:
         self.filter_state[axis_nm]["value"] = filter_on
 
         if axis_nm == "period":
-            self.update_period_mask(filter_on)
-        else:
-            self.filter_state[axis_nm]["mask"] = self.df_base[axis_nm].isin(filter_on)
-
-    def update_period_mask(self, filter_on):
-        logger.debug("Updating period mask based on selected period.")
-        
-        period = self.get_period_as_date(filter_on)
-        self.filter_state["period"]["mask"] = (
-            (self.df_base.index >= period[0])
-            & (self.df_base.index <= period[1])
-        )
+            self.filter_state["period"]["dates"] = self.get_period_as_date(filter_on)
 
     def get_period_as_date(self, period):
         start = self.intervals[period[0]]
@@ -221,23 +250,78 @@ class Dashboard:
 
     def update_current_df(self):
         logger.debug("Updating current DataFrame based on filters.")
-        
-        mask = self.get_base_mask()
-        for selection in self.filter_state.values():
-            mask = mask & selection["mask"]
 
-        self.df_current = self.df_base.loc[mask]
+        self.df_current = self.get_filtered_df(self.df_base, self.filter_index)
+
+    def get_filtered_df(self, df, filter_index):
+        # labels selections ORed within an axis & ANDed across axes on the index, the period is a range of rows
+        # ending before the day after its end date, the rollup holds whole days & rows are cut at the same time
+
+        start, stop = 0, len(df)
+        if "dates" in self.filter_state["period"]:
+            period = self.filter_state["period"]["dates"]
+            start_dt = pd.Timestamp(period[0], tz=df.index.tz)
+            end_dt = pd.Timestamp(period[1], tz=df.index.tz) + pd.Timedelta(days=1)
+            start, stop = df.index.searchsorted(start_dt), df.index.searchsorted(end_dt)
+
+        positions = filter_index.get_positions(
+            {axis: self.filter_state[axis]["value"] for axis in self.analysis_axis}, start, stop
+        )
+
+        return df.take(positions)
+
+    def get_current_rows_df(self):
+        # rows under the current filters, for the figures the rollup can't answer
+
+        if not self.is_rollup:
+            return self.df_current
+
+        if self.df_rows_base is None:
+            self.df_rows_base = self.read_base_df('commit_file')
+            self.rows_filter_index = BitmapIndex(self.df_rows_base, self.analysis_axis)
+
+        return self.get_filtered_df(self.df_rows_base, self.rows_filter_index)
 
     def gen_graphs(self):
         logger.info(f"Generating graphs based on current view {self.current_view_nm}.")
         
-        graphs = []
-        for stat in self.specs[self.current_view_nm]['stats'].values():
-            fig_gen = FigGenerator(title=stat['nm'], **stat['def'])
-            fig = fig_gen.get_fig(self.df_current)
-            graphs.append(dcc.Graph(figure=fig))
+        stats = list(self.specs[self.current_view_nm]['stats'].values())
+        filter_key = self.get_filter_key()
+        fig_keys = [FigCache.get_key(stat, filter_key, self.dataset_version) for stat in stats]
+        figs = [self.fig_cache.get(fig_key) for fig_key in fig_keys]
+
+        missing_idxs = [idx for idx, fig in enumerate(figs) if fig is None]
+        fig_gens = {idx: FigGenerator(title=stats[idx]['nm'], **stats[idx]['def']) for idx in missing_idxs}
+        is_rollup_figs = {
+            idx: self.is_rollup and fig_gen.can_use_rollup(self.df_base.columns) for idx, fig_gen in fig_gens.items()
+        }
+
+        # figures sharing their groupby / resample steps are computed from a single scan of their df
+        n_scans = 0
+        for is_rollup in set(is_rollup_figs.values()):
+            idxs = [idx for idx, is_rollup_fig in is_rollup_figs.items() if is_rollup_fig == is_rollup]
+            query_plan = QueryPlan([fig_gens[idx] for idx in idxs])
+            df = self.df_current if is_rollup else self.get_current_rows_df()
+            for idx, df_fig in zip(idxs, query_plan.get_transformed(df, is_rollup)):
+                figs[idx] = fig_gens[idx].get_fig_from_transformed(df_fig)
+                self.fig_cache.put(fig_keys[idx], figs[idx])
+            n_scans += query_plan.n_scans
+
+        logger.info(
+            f"{len(stats) - len(missing_idxs)}/{len(stats)} figures of view {self.current_view_nm} reused, "
+            f"the others computed in {n_scans} scan(s). Figure cache: {self.fig_cache.n_hits} hits, "
+            f"{self.fig_cache.n_misses} misses, {self.fig_cache.n_bytes / 2**20:.1f}MB."
+        )
 
-        return graphs
+        return [dcc.Graph(figure=fig) for fig in figs]
+
+    def get_filter_key(self):
+        # filters values without the masks, the labels order of a selection doesn't matter
+
+        return {
+            axis: sorted(selection["value"]) if axis != "period" and selection["value"] is not None else selection["value"]
+            for axis, selection in self.filter_state.items()
+        }
 
     def insert_graphs_in_layout(self, graphs):
         logger.debug("Inserting graphs into layout.")
@@ -356,8 +440,7 @@ class Dashboard:
             else:
                 filter_axis = triggered_input_nm[:-10]
                 self.update_filter_state(filter_axis, input_values)
-
-            graph_space = self.get_graphs_space()
+                graph_space = self.get_graphs_space()
 
             return graph_space, *self.get_current_axis_filter_state()
 
@@ -395,7 +478,7 @@ class Dashboard:
 def visualize(config_manager: ConfigManager) -> Dashboard:
     logger.info("Starting the visualize function to generate the Dashboard.")
     
-    web_app = Dashboard(config_manager['dashboard_specs'], config_manager['codebase_nm'])
+    web_app = Dashboard(config_manager['dashboard_specs'], config_manager['codebase_nm'], config_manager['n_months'])
     web_app.set_initial_layout()
     web_app.set_callbacks()
 
@@ -0,0 +1,51 @@
+import pandas as pd
+import numpy as np
+import pytest
+
+from src.array_aggregation import get_codes, get_group_codes, aggregate
+
+
+DF_COMMITS_FILES = pd.DataFrame(
+    [
+        ['c_1', 'dev_1', 'app', 10],
+        ['c_1', 'dev_1', 'reward', 2],
+        ['c_2', 'dev_2', 'app', 5],
+        ['c_3', 'dev_1', None, 7],
+        ['c_3', None, 'app', 1],
+        ['c_4', 'dev_1', 'app', 3],
+    ], columns=['commit_id', 'author_nm', 'module_nm', 'n_lines_inserted']
+).astype({'author_nm': pd.CategoricalDtype(['dev_0', 'dev_1', 'dev_2']), 'module_nm': 'category'})
+
+
+@pytest.mark.parametrize(
+    'aggfunc,mesure,expected_aggregated',
+    [
+        ['sum', 'n_lines_inserted', [[0, 0], [13, 2], [5, 0]]],
+        ['count', 'n_lines_inserted', [[0, 0], [2, 1], [1, 0]]],
+        ['nunique', 'commit_id', [[0, 0], [2, 1], [1, 0]]],
+    ]
+)
+def test_aggregate(aggfunc, mesure, expected_aggregated):
+
+    entity_codes, entity_labels = zip(*(get_codes(DF_COMMITS_FILES[entity]) for entity in ['author_nm', 'module_nm']))
+    group_codes, entity_labels, n_groups = get_group_codes(entity_codes, entity_labels)
+
+    aggregated, is_observed = aggregate(group_codes, n_groups, DF_COMMITS_FILES[mesure], aggfunc)
+
+    # rows with a null label are left out, dev_0 has no rows
+    assert [labels.tolist() for labels in entity_labels] == [['dev_0', 'dev_1', 'dev_2'], ['app', 'reward']]
+    assert aggregated.reshape(3, 2).tolist() == expected_aggregated
+    assert is_observed.reshape(3, 2).tolist() == [[False, False], [True, True], [True, False]]
+
+
+def test_get_group_codes_drops_unused_labels():
+
+    codes = [np.array([3, 3, -1, 7], dtype='int8'), np.array([0, 1, 1, 0], dtype='int8')]
+    labels = [pd.Index([f'dev_{i}' for i in range(8)]), pd.Index(['app', 'reward'])]
+
+    group_codes, entity_labels, n_groups = get_group_codes(codes, labels)
+
+    # the 8 x 2 dense array is bigger than the rows, it only holds the labels of the rows
+    assert [labels.tolist() for labels in entity_labels] == [['dev_3', 'dev_7'], ['app', 'reward']]
+    assert group_codes.tolist() == [0, 1, -1, 2]
+    assert n_groups == 4
@@ -0,0 +1,62 @@
+import os
+
+import pandas as pd
+
+from src.author_nm_deduplication import deduplicate_author_nms
+
+import src.author_nm_deduplication
+import src.utilities
+
+
+AUTHOR_NM_COUNTS = pd.Series({
+    'John Doe': 10,
+    'Jon Doe': 2,
+    'john  doe': 1,
+    'Alice Smith': 3,
+    'alice smith': 5,
+    'Bob Martin': 4,
+    'Carla Gomez': 7,
+})
+
+
+def test_deduplicate_author_nms(mocker):
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    os.makedirs('./test/temp/data', exist_ok=True)
+
+    obtained_mapping = deduplicate_author_nms('test_codebase', AUTHOR_NM_COUNTS, 80)
+
+    os.system('rm -R test/temp/data/*')
+
+    assert obtained_mapping == {
+        'John Doe': ['Jon Doe', 'john  doe'],
+        'alice smith': ['Alice Smith'],
+    }
+
+
+def test_deduplicate_author_nms_scores_new_names_only(mocker):
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    os.makedirs('./test/temp/data', exist_ok=True)
+
+    deduplicate_author_nms('test_codebase', AUTHOR_NM_COUNTS.drop('Jon Doe'), 80)
+
+    score_pairs_spy = mocker.spy(src.author_nm_deduplication, 'score_pairs')
+    obtained_mapping = deduplicate_author_nms('test_codebase', AUTHOR_NM_COUNTS, 80)
+
+    os.system('rm -R test/temp/data/*')
+
+    scored_pairs = score_pairs_spy.call_args.args[0]
+    assert scored_pairs and all('jon doe' in pair for pair in scored_pairs)
+    assert obtained_mapping == {
+        'John Doe': ['Jon Doe', 'john  doe'],
+        'alice smith': ['Alice Smith'],
+    }
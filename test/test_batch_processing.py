@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+
+from src.config_management import ConfigManager
+from src.batch_processing import run_batch
+
+import src.utilities
+
+
+def test_run_batch(mocker, tmp_path):
+
+    MANIFEST = """
+- codebase_nm: random_reward_bot
+  path_to_repo: ./test/asset/repo/RandomRewardBot
+  src_path: ./random_reward_bot
+  module_depth: 1
+- codebase_nm: random_reward_bot_with_components
+  path_to_repo: ./test/asset/repo/RandomRewardBot
+  src_path: ./random_reward_bot
+  module_depth: 1
+  component_nms: ['app', 'reward']
+  component_depth: 1
+- codebase_nm: missing_repo
+  path_to_repo: ./test/asset/repo/MissingRepo
+  src_path: ./src
+  module_depth: 1
+"""
+
+    manifest_path = tmp_path / 'manifest.yaml'
+    manifest_path.write_text(MANIFEST)
+
+    config_manager = ConfigManager()
+    config_manager.manifest_path = str(manifest_path)
+    config_manager.max_concurrency = 2
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    reports = run_batch(config_manager)
+
+    obtained_n_commits = [
+        len(pd.read_parquet(f'./test/temp/data/{codebase_nm}_clean_commit'))
+        for codebase_nm in ['random_reward_bot', 'random_reward_bot_with_components']
+    ]
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert [report['codebase_nm'] for report in reports] == ['random_reward_bot', 'random_reward_bot_with_components', 'missing_repo']
+    assert [report['status'] for report in reports[:2]] == ['success', 'success']
+    assert reports[2]['status'].startswith('parse_git failed')
+    assert 'prep_data' not in reports[2]
+    assert obtained_n_commits == [10, 10]
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+PATH_TO_REPO = "./test/asset/repo/RandomRewardBot"
+
+
+@pytest.mark.parametrize('module_nm, args', [
+    ('bench_file_renaming', ['--n_commits', '200', '--no_memory']),
+    ('bench_git_log_parsing', ['--n_commits', '200']),
+    ('bench_raw_storage', ['--n_commits', '200']),
+    ('bench_pipeline', ['--n_commits', '200', '--no_memory', '--output', '{tmp_path}/pipeline.json']),
+    ('bench_git_backends', [PATH_TO_REPO]),
+])
+def test_benchmark_runs(module_nm, args, tmp_path):
+    # benchmarks run at a tiny size so that a change of the pipeline breaking them fails the tests
+
+    os.system('unzip -q -o test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    completed_process = subprocess.run(
+        [sys.executable, '-m', f'benchmarks.{module_nm}'] + [arg.format(tmp_path=tmp_path) for arg in args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONPATH': '.'}
+    )
+
+    os.system('rm -R test/asset/repo')
+
+    assert completed_process.returncode == 0, completed_process.stderr
+    assert 'False' not in completed_process.stdout # validity columns of the benchmarks
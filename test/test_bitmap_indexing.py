@@ -0,0 +1,37 @@
+import pandas as pd
+import numpy as np
+import pytest
+
+from src.bitmap_indexing import BitmapIndex
+
+
+N_ROWS = 1_000
+
+DF_COMMITS_FILES = pd.DataFrame({
+    'author_nm': pd.Categorical([f'dev_{i % 50}' if i % 3 else 'dev_0' for i in range(N_ROWS)]), # dev_0 holds many rows
+    'module_nm': pd.Categorical([None if i % 7 == 0 else f'module_{i % 4}' for i in range(N_ROWS)]),
+    'ext': pd.Categorical(['py' if i % 5 else 'md' for i in range(N_ROWS)]),
+})
+
+
+@pytest.mark.parametrize(
+    'col_nm_to_labels,start,stop',
+    [
+        [{'author_nm': ['dev_1', 'dev_13'], 'module_nm': None, 'ext': None}, 0, N_ROWS],
+        [{'author_nm': ['dev_0', 'dev_2'], 'module_nm': ['module_1', 'module_3'], 'ext': ['py']}, 0, N_ROWS],
+        [{'author_nm': None, 'module_nm': ['module_2'], 'ext': ['md', 'py']}, 101, 853],
+        [{'author_nm': ['dev_7', 'unknown_dev'], 'module_nm': None, 'ext': ['md']}, 0, N_ROWS],
+        [{'author_nm': None, 'module_nm': None, 'ext': None}, 10, 20],
+    ]
+)
+def test_get_positions(col_nm_to_labels, start, stop):
+
+    filter_index = BitmapIndex(DF_COMMITS_FILES, ['author_nm', 'module_nm', 'ext'])
+
+    mask = np.zeros(N_ROWS, dtype=bool)
+    mask[start:stop] = True
+    for col_nm, labels in col_nm_to_labels.items():
+        if labels is not None:
+            mask &= DF_COMMITS_FILES[col_nm].isin(labels).values
+
+    assert filter_index.get_positions(col_nm_to_labels, start, stop).tolist() == np.flatnonzero(mask).tolist()
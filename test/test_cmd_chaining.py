@@ -0,0 +1,105 @@
+import os
+
+from src.config_management import ConfigManager
+from src.cmd_chaining import run_predecessor
+
+import src.utilities
+import src.cmd_chaining
+import src.git_log_parsing
+import src.data_preparation
+
+PATH_TO_REPO = './test/asset/repo/RandomRewardBot'
+
+
+def test_run_predecessor_reruns_stale_stages_only(mocker):
+
+    config_manager = ConfigManager()
+    config_manager.codebase_nm = 'random_reward_bot'
+    config_manager.path_to_repo = PATH_TO_REPO
+    config_manager.src_path = './random_reward_bot'
+    config_manager.module_depth = 1
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    mocker.patch.object(
+        src.cmd_chaining,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    parse_git_log_spy = mocker.spy(src.git_log_parsing, 'parse_git_log')
+    prepare_data_spy = mocker.spy(src.data_preparation, 'prepare_data')
+
+    def get_n_runs():
+        return parse_git_log_spy.call_count, prepare_data_spy.call_count
+
+    n_runs = []
+
+    run_predecessor('visualize', config_manager) # no previous output
+    n_runs.append(get_n_runs())
+
+    run_predecessor('visualize', config_manager) # nothing changed
+    n_runs.append(get_n_runs())
+
+    config_manager.component_nms = ['app', 'reward'] # prep_data params
+    config_manager.component_depth = 1
+    run_predecessor('visualize', config_manager)
+    n_runs.append(get_n_runs())
+
+    with open(os.path.join(PATH_TO_REPO, 'a.py'), 'w') as f: # new commit, moved ref tips
+        f.write('a = 1\n')
+    os.system(f'git -C {PATH_TO_REPO} add a.py')
+    os.system(f'git -C {PATH_TO_REPO} -c user.name=dev_1 -c user.email=dev_1@mail.com commit -q -m "feat(a) - add a"')
+    run_predecessor('visualize', config_manager)
+    n_runs.append(get_n_runs())
+
+    config_manager.rerun = True
+    run_predecessor('visualize', config_manager)
+    n_runs.append(get_n_runs())
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert n_runs == [(1, 1), (1, 1), (1, 2), (2, 3), (3, 4)]
+
+
+def test_run_predecessor_keeps_outputs_without_their_arguments(mocker):
+
+    config_manager = ConfigManager()
+    config_manager.codebase_nm = 'random_reward_bot'
+    config_manager.path_to_repo = PATH_TO_REPO
+    config_manager.src_path = './random_reward_bot'
+    config_manager.module_depth = 1
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    mocker.patch.object(
+        src.cmd_chaining,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    run_predecessor('visualize', config_manager) # full run
+
+    parse_git_log_spy = mocker.spy(src.git_log_parsing, 'parse_git_log')
+    prepare_data_spy = mocker.spy(src.data_preparation, 'prepare_data')
+
+    visualize_config_manager = ConfigManager() # only the arguments of visualize
+    visualize_config_manager.codebase_nm = 'random_reward_bot'
+    visualize_config_manager.has_components = False
+    run_predecessor('visualize', visualize_config_manager)
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert (parse_git_log_spy.call_count, prepare_data_spy.call_count) == (0, 0)
@@ -1,3 +1,4 @@
+from numpy import nan
 from pandas import DataFrame
 import pytest
 
@@ -87,6 +88,26 @@ from src.data_preparation import tag_commit_file
                 [None, 'src/test/control.php', None, None, 'php', True, 'control', 'test'],
             ], columns=['commit_id', 'file_path', 'nb_lines_inserted', 'nb_lines_deleted', 'ext', 'is_src', 'component_nm', 'module_nm'])
         ],
+        [
+            {
+                'src_path': './src',
+                'module_depth': 1,
+                'component_nms': None,
+                'component_depth': None
+            },
+            DataFrame([
+                [None, 'src/crm.php', None, None],
+                [None, 'README.md', None, None],
+                [None, 'src/crm.php', None, None],
+            ],
+            columns=['commit_id', 'file_path', 'nb_lines_inserted', 'nb_lines_deleted']
+            ),
+            DataFrame([
+                [None, 'src/crm.php', None, None, 'php', True, 'crm'],
+                [None, 'README.md', None, None, 'other', False, nan],
+                [None, 'src/crm.php', None, None, 'php', True, 'crm'],
+            ], columns=['commit_id', 'file_path', 'nb_lines_inserted', 'nb_lines_deleted', 'ext', 'is_src', 'module_nm'])
+        ],
     ]
 )
 def test_tag(config_manager, df, expected_df):
@@ -9,7 +9,9 @@ from pandas.testing import assert_frame_equal
 
 from src.config_management import ConfigManager
 
-from src.data_preparation import handle_file_renaming
+from src.data_preparation import handle_file_renaming, get_rollup
+from src.git_log_parsing import get_file_renames
+from src.utilities import read_cleaned, read_raw, save_raw, save_cleaned
 
 import src.data_preparation
 import src.utilities
@@ -18,13 +20,15 @@ import src.git_log_parsing
 
 
 
-def test_integration_prep_data(mocker):
+@pytest.mark.parametrize('chunk_size', [500_000, 5])
+def test_integration_prep_data(mocker, chunk_size):
 
     config_manager = ConfigManager()
     config_manager.codebase_nm = 'random_reward_bot'
     config_manager.path_to_repo = "./test/asset/repo/RandomRewardBot"
     config_manager.src_path = './random_reward_bot'
     config_manager.module_depth = 1
+    config_manager.chunk_size = chunk_size
     
     mocker.patch.object(
         src.utilities,
@@ -45,59 +49,73 @@ def test_integration_prep_data(mocker):
     EXPECTED_COMMITS = (
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', '2021-09-30 15:12:01 +0200', 'leopoldavezac','chore(rewards) - update yaml file'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', '2021-09-30 15:04:49 +0200', 'leopoldavezac','chore(requirements) - none'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', '2021-09-30 15:03:45 +0200', 'leopoldavezac','refactor(app) - relative import'],
-                    ['72a8f13827b42b2010098967533642b45e19bcd0', '2021-09-30 15:02:09 +0200', 'leopoldavezac','fix(rewards) - money as str'],
-                    ['301c4e985455b96f1d6142642161716ba3130c73', '2021-09-29 15:58:58 +0200', 'leopoldavezac','chore(packaging) - install module for easy import'],
-                    ['7f1a63ff379c0bd6a5cabc56dc46ab223e90d45e', '2021-09-29 15:58:07 +0200', 'leopoldavezac','chore(gitignore) - ignore cache and egg info'],
-                    ['a2140d0462144ab0e58ee801a50b555fafde7a1f', '2021-09-29 15:56:31 +0200', 'leopoldavezac','feat(reward) - return (or not) reward to user'],
-                    ['da89518e033844b5d1d7947fc9a407257f3c6184', '2021-09-29 15:35:08 +0200', 'leopoldavezac','refactoring(app) - renaming variables'],
-                    ['4cc0ae168567f860bb58a1ac5d985e59d2ece5bd', '2021-09-29 14:23:08 +0200', 'leopoldavezac','feat(app) - return input msg as is'],
-                    ['f44310f347a0144523c0393ab3fa217a907819d4', '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'Initial commit'],
+                    ['8e0a7079f73a4341398458351477c9edbbae2064', 0, '2021-09-30 15:12:01 +0200', 'leopoldavezac','chore(rewards) - update yaml file'],
+                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 1, '2021-09-30 15:04:49 +0200', 'leopoldavezac','chore(requirements) - none'],
+                    ['58dcfab39bb0d389e04a09fefb347395939af360', 2, '2021-09-30 15:03:45 +0200', 'leopoldavezac','refactor(app) - relative import'],
+                    ['72a8f13827b42b2010098967533642b45e19bcd0', 3, '2021-09-30 15:02:09 +0200', 'leopoldavezac','fix(rewards) - money as str'],
+                    ['301c4e985455b96f1d6142642161716ba3130c73', 4, '2021-09-29 15:58:58 +0200', 'leopoldavezac','chore(packaging) - install module for easy import'],
+                    ['7f1a63ff379c0bd6a5cabc56dc46ab223e90d45e', 5, '2021-09-29 15:58:07 +0200', 'leopoldavezac','chore(gitignore) - ignore cache and egg info'],
+                    ['a2140d0462144ab0e58ee801a50b555fafde7a1f', 6, '2021-09-29 15:56:31 +0200', 'leopoldavezac','feat(reward) - return (or not) reward to user'],
+                    ['da89518e033844b5d1d7947fc9a407257f3c6184', 7, '2021-09-29 15:35:08 +0200', 'leopoldavezac','refactoring(app) - renaming variables'],
+                    ['4cc0ae168567f860bb58a1ac5d985e59d2ece5bd', 8, '2021-09-29 14:23:08 +0200', 'leopoldavezac','feat(app) - return input msg as is'],
+                    ['f44310f347a0144523c0393ab3fa217a907819d4', 9, '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'Initial commit'],
                 ],
-                columns=['id', 'creation_dt', 'author_nm', 'msg']
+                columns=['id', 'idx', 'creation_dt', 'author_nm', 'msg']
         )
         .astype({
-            'id':'string',
-            'author_nm':'string',
+            'id':'category',
+            'idx':'uint32',
+            'author_nm':'category',
             'msg':'string',
         })
         .assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt, utc=True))
+        .sort_values('creation_dt', kind='stable', ignore_index=True) # cleaned rows are sorted by creation_dt
     )
 
     EXPECTED_COMMITS_FILES = (
         pd.DataFrame(
             [
-                ['8e0a7079f73a4341398458351477c9edbbae2064', '2021-09-30 15:12:01 +0200', 'leopoldavezac','rewards.yaml', 2, 1, 'other', False, nan],
-                ['ea39952af8fae82d98537a42e87be6f933468d4b', '2021-09-30 15:04:49 +0200', 'leopoldavezac','requirements.txt', 24, 0, 'other', False, nan],
-                ['58dcfab39bb0d389e04a09fefb347395939af360', '2021-09-30 15:03:45 +0200', 'leopoldavezac','random_reward_bot/app.py', 1, 1, 'py', True, 'app'],
-                ['58dcfab39bb0d389e04a09fefb347395939af360', '2021-09-30 15:03:45 +0200', 'leopoldavezac','setup.py', 0, 17, 'py', False, nan],
-                ['72a8f13827b42b2010098967533642b45e19bcd0', '2021-09-30 15:02:09 +0200', 'leopoldavezac','rewards.yaml', 5, 5, 'other', False, nan],
-                ['301c4e985455b96f1d6142642161716ba3130c73', '2021-09-29 15:58:58 +0200', 'leopoldavezac','setup.py', 17, 0, 'py', False, nan],
-                ['7f1a63ff379c0bd6a5cabc56dc46ab223e90d45e', '2021-09-29 15:58:07 +0200', 'leopoldavezac','.gitignore', 4, 0, 'other', False, nan],
-                ['a2140d0462144ab0e58ee801a50b555fafde7a1f', '2021-09-29 15:56:31 +0200', 'leopoldavezac','random_reward_bot/app.py', 6, 2, 'py', True, 'app'],
-                ['a2140d0462144ab0e58ee801a50b555fafde7a1f', '2021-09-29 15:56:31 +0200', 'leopoldavezac','random_reward_bot/rewards.py', 29, 0, 'py', True, 'rewards'],
-                ['a2140d0462144ab0e58ee801a50b555fafde7a1f', '2021-09-29 15:56:31 +0200', 'leopoldavezac','rewards.yaml', 12, 0, 'other', False, nan],
-                ['da89518e033844b5d1d7947fc9a407257f3c6184', '2021-09-29 15:35:08 +0200', 'leopoldavezac','random_reward_bot/app.py', 3, 3, 'py', True, 'app'],
-                ['4cc0ae168567f860bb58a1ac5d985e59d2ece5bd', '2021-09-29 14:23:08 +0200', 'leopoldavezac','random_reward_bot/app.py', 20, 0, 'py', True, 'app'],
-                ['f44310f347a0144523c0393ab3fa217a907819d4', '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'LICENSE', 21, 0, 'other', False, nan],
-                ['f44310f347a0144523c0393ab3fa217a907819d4', '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'README.md', 2, 0, 'other', False, nan],
+                [0, '2021-09-30 15:12:01 +0200', 'leopoldavezac','rewards.yaml', 2, 1, 'other', False, nan],
+                [1, '2021-09-30 15:04:49 +0200', 'leopoldavezac','requirements.txt', 24, 0, 'other', False, nan],
+                [2, '2021-09-30 15:03:45 +0200', 'leopoldavezac','random_reward_bot/app.py', 1, 1, 'py', True, 'app'],
+                [2, '2021-09-30 15:03:45 +0200', 'leopoldavezac','setup.py', 0, 17, 'py', False, nan],
+                [3, '2021-09-30 15:02:09 +0200', 'leopoldavezac','rewards.yaml', 5, 5, 'other', False, nan],
+                [4, '2021-09-29 15:58:58 +0200', 'leopoldavezac','setup.py', 17, 0, 'py', False, nan],
+                [5, '2021-09-29 15:58:07 +0200', 'leopoldavezac','.gitignore', 4, 0, 'other', False, nan],
+                [6, '2021-09-29 15:56:31 +0200', 'leopoldavezac','random_reward_bot/app.py', 6, 2, 'py', True, 'app'],
+                [6, '2021-09-29 15:56:31 +0200', 'leopoldavezac','random_reward_bot/rewards.py', 29, 0, 'py', True, 'rewards'],
+                [6, '2021-09-29 15:56:31 +0200', 'leopoldavezac','rewards.yaml', 12, 0, 'other', False, nan],
+                [7, '2021-09-29 15:35:08 +0200', 'leopoldavezac','random_reward_bot/app.py', 3, 3, 'py', True, 'app'],
+                [8, '2021-09-29 14:23:08 +0200', 'leopoldavezac','random_reward_bot/app.py', 20, 0, 'py', True, 'app'],
+                [9, '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'LICENSE', 21, 0, 'other', False, nan],
+                [9, '2021-09-30 15:14:23 +0200', "Leopold d'Avezac",'README.md', 2, 0, 'other', False, nan],
             ],
-            columns=['commit_id', 'creation_dt', 'author_nm', 'file_path', 'n_lines_inserted', 'n_lines_deleted', 'ext', 'is_src', 'module_nm']
+            columns=['commit_idx', 'creation_dt', 'author_nm', 'file_path', 'n_lines_inserted', 'n_lines_deleted', 'ext', 'is_src', 'module_nm']
         )
         .astype({
-            'commit_id': 'string',
-            'author_nm': 'string',
-            'file_path': 'string',
+            'commit_idx': 'uint32',
+            'author_nm': 'category',
+            'file_path': 'category',
             'n_lines_inserted': 'uint32',
             'n_lines_deleted': 'uint32',
-            'ext': 'string',
+            'ext': 'category',
             'is_src': 'bool',
-            'module_nm': 'string',
+            'module_nm': 'category',
         })
         .assign(creation_dt=lambda dfx: pd.to_datetime(dfx.creation_dt, utc=True))
-        .loc[:, ['commit_id', 'file_path', 'n_lines_inserted', 'n_lines_deleted', 'ext', 'is_src', 'module_nm', 'author_nm', 'creation_dt']]
+        .assign(
+            day_idx=lambda dfx: dfx.creation_dt.dt.day.map({29: 18899, 30: 18900}).astype('int32'),
+            week_idx=2700, # monday 27 september 2021 to sunday 3 october 2021
+            month_idx=620,
+            quarter_idx=206,
+            year_idx=51,
+        )
+        .astype({'week_idx': 'int32', 'month_idx': 'int32', 'quarter_idx': 'int32', 'year_idx': 'int32'})
+        .loc[:, [
+            'commit_idx', 'file_path', 'n_lines_inserted', 'n_lines_deleted', 'ext', 'is_src', 'module_nm', 'author_nm',
+            'creation_dt', 'day_idx', 'week_idx', 'month_idx', 'quarter_idx', 'year_idx'
+        ]]
+        .sort_values('creation_dt', kind='stable', ignore_index=True)
     )
 
     os.system('unzip test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
@@ -106,16 +124,100 @@ def test_integration_prep_data(mocker):
     mocker.patch('src.data_preparation.instanciate_config_manager', return_value=config_manager)
     src.data_preparation.main()
 
-    obtained_commits = pd.read_parquet('./test/temp/data/random_reward_bot_clean_commit.parquet')
-    obtained_commits_files = pd.read_parquet('./test/temp/data/random_reward_bot_clean_commit_file.parquet')
+    obtained_commits = read_cleaned('random_reward_bot', 'commit', index_col_nm=None)
+    obtained_commits_files = read_cleaned('random_reward_bot', 'commit_file', index_col_nm=None)
   
     assert_frame_equal(EXPECTED_COMMITS, obtained_commits)
     assert_frame_equal(EXPECTED_COMMITS_FILES, obtained_commits_files)
 
     os.system('rm -R test/asset/repo')
-    os.system('rm test/temp/data/*')
+    os.system('rm -R test/temp/data/*')
+
+
+
+
+def test_incremental_prep_data(mocker):
+
+    config_manager = ConfigManager()
+    config_manager.codebase_nm = 'random_reward_bot'
+    config_manager.path_to_repo = "./test/asset/repo/RandomRewardBot"
+    config_manager.src_path = './random_reward_bot'
+    config_manager.module_depth = 1
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    mocker.patch.object(
+        src.cmd_chaining,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+    mocker.patch.object(
+        src.git_log_parsing,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    mocker.patch('src.data_preparation.instanciate_config_manager', return_value=config_manager)
+    src.data_preparation.main()
+
+    expected_commits = read_cleaned('random_reward_bot', 'commit', index_col_nm=None)
+    expected_commits_files = read_cleaned('random_reward_bot', 'commit_file', index_col_nm=None)
+
+    # the raw data is split in two parts, as if the 4 last commits were parsed by a later incremental parse
+    log_level_to_df = {log_level: read_raw('random_reward_bot', log_level) for log_level in ['commit', 'commit_file', 'file_rename']}
+    new_commit_idxs = log_level_to_df['commit'].idx.iloc[:4]
+
+    prepare_new_data_spy = mocker.spy(src.data_preparation, 'prepare_new_data')
+    for append, is_new in [(False, False), (True, True)]:
+        for log_level, df in log_level_to_df.items():
+            commit_idxs = df.idx if log_level == 'commit' else df.commit_idx
+            save_raw(df.loc[commit_idxs.isin(new_commit_idxs) == is_new], 'random_reward_bot', log_level, append)
+        src.data_preparation.prepare_data(config_manager)
+
+    obtained_commits = read_cleaned('random_reward_bot', 'commit', index_col_nm=None)
+    obtained_commits_files = read_cleaned('random_reward_bot', 'commit_file', index_col_nm=None)
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert prepare_new_data_spy.call_count == 1
+    assert_frame_equal(expected_commits, obtained_commits)
+    assert_frame_equal(expected_commits_files, obtained_commits_files)
 
 
+def test_read_cleaned_period(mocker):
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    df = pd.DataFrame({
+        'commit_idx': [2, 1, 1, 0],
+        'file_path': ['src/c.py', 'README.md', 'src/b.py', 'src/a.py'],
+        'ext': ['py', 'other', 'py', 'py'],
+        'creation_dt': pd.to_datetime(['2021-03-02', '2021-02-15', '2021-02-15', '2021-01-20'], utc=True),
+    })
+    save_cleaned(df, 'random_reward_bot', 'commit_file')
+
+    obtained_df = read_cleaned(
+        'random_reward_bot', 'commit_file', index_col_nm=None, start_dt='2021-02-01', filters=[('ext', '!=', 'other')]
+    )
+    obtained_out_of_period_df = read_cleaned('random_reward_bot', 'commit_file', index_col_nm=None, end_dt='2020-12-31')
+    obtained_months = src.utilities.get_cleaned_months('random_reward_bot', 'commit_file')
+
+    os.system('rm -R test/temp/data/*')
+
+    assert obtained_months == ['2021-01', '2021-02', '2021-03']
+    assert obtained_df.file_path.tolist() == ['src/b.py', 'src/c.py']
+    assert len(obtained_out_of_period_df) == 0
+    assert obtained_out_of_period_df.columns.tolist() == df.columns.tolist()
 
 
 @pytest.mark.parametrize(
@@ -124,85 +226,235 @@ def test_integration_prep_data(mocker):
         [
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/old_file_nm.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/{old_file_nm.cpp => new_file_nm.cpp}'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/new_file_nm.cpp'],
+                    [0, 'src/new_file_nm.cpp'],
+                    [1, 'src/{old_file_nm.cpp => new_file_nm.cpp}'],
+                    [2, 'src/old_file_nm.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             ),
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/new_file_nm.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/new_file_nm.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/new_file_nm.cpp'],
+                    [0, 'src/new_file_nm.cpp'],
+                    [1, 'src/new_file_nm.cpp'],
+                    [2, 'src/new_file_nm.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             )
         ],
         [
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/file_nm.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/{ => module_nm}/file_nm.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/module_nm/file_nm.cpp'],
+                    [0, 'src/module_nm/file_nm.cpp'],
+                    [1, 'src/{ => module_nm}/file_nm.cpp'],
+                    [2, 'src/file_nm.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             ),
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/module_nm/file_nm.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/module_nm/file_nm.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/module_nm/file_nm.cpp'],
+                    [0, 'src/module_nm/file_nm.cpp'],
+                    [1, 'src/module_nm/file_nm.cpp'],
+                    [2, 'src/module_nm/file_nm.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             )
         ],
         [
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/file_nm_v0.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/{file_nm_v0.cpp => file_nm_v1.cpp}'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/file_nm_v1.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/{file_nm_v1.cpp => file_nm_v2.cpp}'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/file_nm_v2.cpp'],
+                    [0, 'src/file_nm_v1.cpp'],
+                    [0, 'src/{file_nm_v1.cpp => file_nm_v2.cpp}'],
+                    [0, 'src/file_nm_v2.cpp'],
+                    [1, 'src/{file_nm_v0.cpp => file_nm_v1.cpp}'],
+                    [2, 'src/file_nm_v0.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             ),
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'src/file_nm_v2.cpp'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'src/file_nm_v2.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/file_nm_v2.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/file_nm_v2.cpp'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'src/file_nm_v2.cpp'],
+                    [0, 'src/file_nm_v2.cpp'],
+                    [0, 'src/file_nm_v2.cpp'],
+                    [0, 'src/file_nm_v2.cpp'],
+                    [1, 'src/file_nm_v2.cpp'],
+                    [2, 'src/file_nm_v2.cpp'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             )
         ],
         [
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'Dockerfile_allbuild'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'Dockerfile_allbuild => packaging/Dockerfile-allbuild'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'Dockerfile_allbuild => packaging/Dockerfile-allbuild'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'packaging/Dockerfile-allbuild'],
+                    [0, 'Dockerfile_allbuild => packaging/Dockerfile-allbuild'],
+                    [0, 'packaging/Dockerfile-allbuild'],
+                    [1, 'Dockerfile_allbuild => packaging/Dockerfile-allbuild'],
+                    [2, 'Dockerfile_allbuild'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
             ),
             pd.DataFrame(
                 [
-                    ['8e0a7079f73a4341398458351477c9edbbae2064', 'packaging/Dockerfile-allbuild'],
-                    ['ea39952af8fae82d98537a42e87be6f933468d4b', 'packaging/Dockerfile-allbuild'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'packaging/Dockerfile-allbuild'],
-                    ['58dcfab39bb0d389e04a09fefb347395939af360', 'packaging/Dockerfile-allbuild'],
+                    [0, 'packaging/Dockerfile-allbuild'],
+                    [0, 'packaging/Dockerfile-allbuild'],
+                    [1, 'packaging/Dockerfile-allbuild'],
+                    [2, 'packaging/Dockerfile-allbuild'],
                 ],
-                columns = ['commit_id', 'file_path']
+                columns = ['commit_idx', 'file_path']
+            )
+        ],
+        [ # renamed back
+            pd.DataFrame(
+                [
+                    [0, 'src/{b.py => a.py}'],
+                    [1, 'src/{a.py => b.py}'],
+                    [2, 'src/a.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
+            ),
+            pd.DataFrame(
+                [
+                    [0, 'src/a.py'],
+                    [1, 'src/a.py'],
+                    [2, 'src/a.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
+            )
+        ],
+        [ # path reused by a new file
+            pd.DataFrame(
+                [
+                    [0, 'src/a.py'],
+                    [1, 'src/{a.py => b.py}'],
+                    [2, 'src/a.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
+            ),
+            pd.DataFrame(
+                [
+                    [0, 'src/a.py'],
+                    [1, 'src/b.py'],
+                    [2, 'src/b.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
+            )
+        ],
+        [ # paths swapped in a commit
+            pd.DataFrame(
+                [
+                    [0, 'src/{a.py => c.py}'],
+                    [1, 'src/{a.py => b.py}'],
+                    [1, 'src/{b.py => a.py}'],
+                    [2, 'src/a.py'],
+                    [2, 'src/b.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
+            ),
+            pd.DataFrame(
+                [
+                    [0, 'src/c.py'],
+                    [1, 'src/b.py'],
+                    [1, 'src/c.py'],
+                    [2, 'src/b.py'],
+                    [2, 'src/c.py'],
+                ],
+                columns = ['commit_idx', 'file_path']
             )
         ],
     ]
 
-    ) # only relevant columns in input / expected for sake of simplicity
+    ) # only relevant columns in input / expected for sake of simplicity, rows in git log order (newest commit first)
 def test_handle_file_renaming(input_df, expected_df):
 
+    obtained_df_from_rename_table = handle_file_renaming(input_df.copy(), get_file_renames(input_df))
+    assert_frame_equal(obtained_df_from_rename_table, expected_df)
+
     obtained_df = handle_file_renaming(input_df)
     assert_frame_equal(obtained_df, expected_df)
+
+
+def test_get_rollup_keeps_null_labels():
+
+    df_commit_file = pd.DataFrame(
+        [
+            ['2022-02-19 17:40:00+00:00', 'dev_1', 'app', 'py', True, 10, 2],
+            ['2022-02-19 18:10:00+00:00', 'dev_1', nan, 'py', True, 5, 1],
+            ['2022-02-19 19:00:00+00:00', 'dev_1', nan, 'py', True, 1, 0],
+            ['2022-02-20 09:00:00+00:00', 'dev_2', 'app', 'md', False, 3, 3],
+        ], columns=['creation_dt', 'author_nm', 'module_nm', 'ext', 'is_src', 'n_lines_inserted', 'n_lines_deleted']
+    ).astype({'author_nm': 'category', 'module_nm': 'category', 'ext': 'category'})
+
+    expected_df = pd.DataFrame(
+        [
+            ['2022-02-19 00:00:00+00:00', 'dev_1', nan, 'py', True, 6, 1, 2],
+            ['2022-02-19 00:00:00+00:00', 'dev_1', 'app', 'py', True, 10, 2, 1],
+            ['2022-02-20 00:00:00+00:00', 'dev_2', 'app', 'md', False, 3, 3, 1],
+        ], columns=['creation_dt', 'author_nm', 'module_nm', 'ext', 'is_src', 'n_lines_inserted', 'n_lines_deleted', 'n_rows']
+    ).astype({'author_nm': 'category', 'module_nm': 'category', 'ext': 'category'})
+
+    obtained_df = get_rollup(df_commit_file.assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt)))
+
+    assert_frame_equal(
+        expected_df.assign(
+            creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt),
+            day_idx = [19042, 19042, 19043],
+            week_idx = 2720,
+            month_idx = 625,
+            quarter_idx = 208,
+            year_idx = 52,
+        ),
+        obtained_df,
+        check_dtype=False,
+        check_categorical=False
+    )
+
+
+def test_incremental_prep_data_matches_full_rebuild_on_rename(mocker, tmp_path):
+
+    PATH_TO_REPO = str(tmp_path / 'repo')
+
+    def commit(cmd, msg, day):
+        os.system(f'cd {PATH_TO_REPO} && {cmd} && git add -A')
+        os.system(
+            f'GIT_AUTHOR_DATE="2021-09-{day:02d}T12:00:00" GIT_COMMITTER_DATE="2021-09-{day:02d}T12:00:00" '
+            f'git -C {PATH_TO_REPO} -c user.name=dev_1 -c user.email=dev_1@mail.com commit -q -m "{msg}"'
+        )
+
+    def get_config_manager(codebase_nm, incremental):
+        config_manager = ConfigManager()
+        config_manager.codebase_nm = codebase_nm
+        config_manager.path_to_repo = PATH_TO_REPO
+        config_manager.src_path = './src'
+        config_manager.module_depth = 1
+        config_manager.incremental = incremental
+        return config_manager
+
+    for module in [src.utilities, src.cmd_chaining, src.git_log_parsing]:
+        mocker.patch.object(
+            module,
+            'DATA_PATH',
+            './test/temp/data'
+            )
+
+    # a.py is deleted & replaced by a renamed b.py, the rename of a.py parsed later only moves the rows of b.py
+    os.system(f'mkdir -p {PATH_TO_REPO}/src/app && git -C {PATH_TO_REPO} init -q')
+    commit('printf "a = 1\\n" > src/app/a.py', 'feat(a) - add a', 1)
+    commit('printf "b = 1\\nb = 2\\n" > src/app/b.py && git rm -q src/app/a.py', 'feat(b) - add b, remove a', 2)
+    commit('git mv src/app/b.py src/app/a.py', 'refactor(a) - rename b to a', 3)
+
+    src.git_log_parsing.parse_git_log(get_config_manager('incremental', True))
+    src.data_preparation.prepare_data(get_config_manager('incremental', True))
+
+    commit('mkdir src/lib && git mv src/app/a.py src/lib/c.py', 'refactor(c) - move a to c', 4)
+
+    src.git_log_parsing.parse_git_log(get_config_manager('incremental', True))
+    src.data_preparation.prepare_data(get_config_manager('incremental', True))
+    src.git_log_parsing.parse_git_log(get_config_manager('full', False))
+    src.data_preparation.prepare_data(get_config_manager('full', False))
+
+    col_nms = ['creation_dt', 'file_path', 'module_nm', 'n_lines_inserted', 'n_lines_deleted']
+    obtained_df = read_cleaned('incremental', 'commit_file', index_col_nm=None)[col_nms]
+    expected_df = read_cleaned('full', 'commit_file', index_col_nm=None)[col_nms]
+
+    os.system('rm -R test/temp/data/*')
+
+    assert expected_df.file_path.astype(str).tolist().count('src/app/a.py') == 2 # added & deleted a.py
+    assert_frame_equal(obtained_df, expected_df)
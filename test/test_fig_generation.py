@@ -2,9 +2,12 @@ import pandas as pd
 import numpy as np
 import pytest
 
+from plotly.express import bar
+
 from pandas.testing import assert_frame_equal
 
-from src.fig_generation import Transformer
+from src.fig_generation import Transformer, QueryPlan, FigCache
+from src.data_preparation import get_rollup, add_time_bucket_idxs
 
 
 DF_COMMITS = pd.DataFrame(
@@ -97,3 +100,121 @@ def test_get_transformed(concept, entity, mesure, normalize_axis, aggfunc, freq,
 
     assert_frame_equal(expected_df, obtained_df)
 
+
+
+@pytest.mark.parametrize(
+    'concept,entity,mesure,aggfunc,freq',
+    [
+        ['specialization', ['author_nm', 'module_nm'], 'n_lines_inserted', 'sum', None],
+        ['stability', 'module_nm', 'n_lines_deleted', 'sum', 'M'],
+        ['evolution', None, 'n_lines_inserted', 'count', 'W'],
+        ['size', 'author_nm', 'n_lines_inserted', 'count', None],
+    ]
+)
+def test_get_transformed_from_rollup(concept, entity, mesure, aggfunc, freq):
+
+    df = DF_COMMITS_FILES.assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt))
+
+    transformer = Transformer(concept, mesure, entity, 1, aggfunc, freq, 0)
+    assert transformer.can_use_rollup(get_rollup(df).columns)
+
+    assert_frame_equal(
+        transformer.get_transformed(df.set_index('creation_dt')),
+        transformer.get_transformed(get_rollup(df).set_index('creation_dt'), is_rollup=True),
+        check_dtype=False
+    )
+
+
+def test_auto_freq_from_rollup():
+
+    # rows span 209 days & 2 hours, their days span 210 days: 7 days a bin of 30 is the weekly boundary
+    df = pd.DataFrame({
+        'creation_dt': pd.to_datetime(['2020-01-01 23:00', '2020-03-15 12:00', '2020-07-29 01:00'], utc=True),
+        'author_nm': ['a', 'b', 'a'],
+        'module_nm': ['m', 'm', 'n'],
+        'n_lines_inserted': [1, 2, 3],
+        'n_lines_deleted': [0, 1, 0],
+    })
+
+    rows_transformer = Transformer('evolution', 'n_lines_inserted', None, 1, 'sum', 'auto', 0)
+    rows_transformer.set_freq(df.set_index('creation_dt'))
+    rollup_transformer = Transformer('evolution', 'n_lines_inserted', None, 1, 'sum', 'auto', 0)
+    rollup_transformer.set_freq(get_rollup(df).set_index('creation_dt'))
+
+    assert rows_transformer.freq == rollup_transformer.freq == 'W'
+
+
+def test_can_use_rollup():
+
+    rollup_col_nms = get_rollup(DF_COMMITS_FILES.assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt))).columns
+
+    assert not Transformer('size', 'commit_id', 'module_nm', aggfunc='nunique').can_use_rollup(rollup_col_nms)
+    assert not Transformer('size', 'n_lines_inserted', 'file_nm', aggfunc='sum').can_use_rollup(rollup_col_nms)
+
+
+def test_query_plan_get_transformed():
+
+    df = DF_COMMITS_FILES.assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt)).set_index('creation_dt')
+    transformer_args = [
+        ['specialization', 'n_lines_inserted', ['author_nm', 'module_nm'], 1, 'sum', None, 0],
+        ['stability', 'n_lines_inserted', 'module_nm', 1, 'sum', 'M', 0],
+        ['evolution', 'n_lines_inserted', None, None, 'count', 'M', None],
+        ['size', 'n_lines_inserted', 'component_nm', None, 'sum', None, None],
+        ['size', 'commit_id', 'module_nm', None, 'nunique', None, None],
+    ]
+
+    query_plan = QueryPlan([Transformer(*args) for args in transformer_args])
+    obtained_dfs = query_plan.get_transformed(df)
+
+    assert query_plan.n_scans == 3 # the evolution & stability by month, the specialization & size, the nunique
+    for args, obtained_df in zip(transformer_args, obtained_dfs):
+        assert_frame_equal(Transformer(*args).get_transformed(df), obtained_df, check_dtype=False)
+
+
+def test_fig_cache_evicts_least_recently_used():
+
+    figs = [bar(x=['a', 'b'], y=[i, i + 1]) for i in range(3)]
+    fig_n_bytes = max(len(fig.to_json()) for fig in figs)
+
+    fig_cache = FigCache(2 * fig_n_bytes)
+    keys = [FigCache.get_key({'nm': 'size', 'entity': 'module_nm'}, {'author_nm': [f'dev_{i}']}) for i in range(3)]
+
+    fig_cache.put(keys[0], figs[0])
+    fig_cache.put(keys[1], figs[1])
+    assert fig_cache.get(keys[0]) is figs[0] # keys[1] is now the least recently used
+    fig_cache.put(keys[2], figs[2])
+
+    assert fig_cache.get(keys[1]) is None
+    assert fig_cache.get(keys[2]) is figs[2]
+    assert (fig_cache.n_hits, fig_cache.n_misses) == (2, 1)
+    assert fig_cache.n_bytes <= 2 * fig_n_bytes
+    assert FigCache.get_key({'a': 1, 'b': 2}) == FigCache.get_key({'b': 2, 'a': 1})
+
+
+@pytest.mark.parametrize(
+    'concept,entity,aggfunc,freq',
+    [
+        ['evolution', None, 'sum', '1D'],
+        ['evolution', None, 'count', 'W'],
+        ['stability', 'author_nm', 'sum', 'W'],
+        ['stability', 'module_nm', 'count', 'M'],
+        ['stability', 'component_nm', 'sum', 'Q'],
+    ]
+)
+def test_get_transformed_from_time_buckets(concept, entity, aggfunc, freq):
+
+    df = (
+        DF_COMMITS_FILES
+        .assign(creation_dt = lambda dfx: pd.to_datetime(dfx.creation_dt, utc=True))
+        .pipe(add_time_bucket_idxs)
+        .set_index('creation_dt')
+    )
+
+    # the bucket ids give the bins of resample
+    assert_frame_equal(
+        Transformer(concept, 'n_lines_inserted', entity, 1, aggfunc, freq, 0).get_transformed(
+            df.drop(columns=['day_idx', 'week_idx', 'month_idx', 'quarter_idx', 'year_idx'])
+        ),
+        Transformer(concept, 'n_lines_inserted', entity, 1, aggfunc, freq, 0).get_transformed(df),
+        check_dtype=False
+    )
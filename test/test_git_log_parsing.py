@@ -1,7 +1,13 @@
-from pandas import DataFrame
+import os
+
+from pandas import DataFrame, concat
 from pandas.testing import assert_frame_equal
 
-from src.git_log_parsing import GitLogParser
+from src.config_management import ConfigManager
+from src.git_log_parsing import GitLogParser, parse_git_log, format_file_renaming, split_file_renaming
+from src.utilities import read_raw
+
+import src.utilities
 
 
 def test_git_log_parsing():
@@ -71,3 +77,210 @@ def test_handle_tab_in_commit_msg():
     obtained_df_commit, _ = parser.get_commit_as_dfs()
 
     assert_frame_equal(obtained_df_commit, EXPECTED_COMMIT)
+
+
+def test_parse_log_stream_in_batches():
+
+    INPUT = """+++a2452407107a0c5a64e76cf422f4d6f788dcc814\t2019-05-30 12:26:49 +0200\tPHParo\tAdd README
+1\t0\tREADME.md
+
++++a7a7d2e6067c97dd14be74b005909270e1858814\t2019-05-30 12:25:26 +0200\tPHParo\tMerge branch 'dev'
++++ac945860b3f5eaf21ce65308ad2b33b475831041\t2019-03-21 10:55:33 +0100\tbaro\tReplace header('location:') by bab_redirect()
+9\t16\tphpapp/admin/addons.php
+-\t-\tphpapp/img/logo.png"""
+
+    EXPECTED_COMMIT = DataFrame([
+            ["a2452407107a0c5a64e76cf422f4d6f788dcc814", "2019-05-30 12:26:49 +0200", "PHParo", "Add README"],
+            ["a7a7d2e6067c97dd14be74b005909270e1858814", "2019-05-30 12:25:26 +0200", "PHParo", "Merge branch 'dev'"],
+            ["ac945860b3f5eaf21ce65308ad2b33b475831041", "2019-03-21 10:55:33 +0100", "baro", "Replace header('location:') by bab_redirect()"],
+        ],
+        columns=['id', 'creation_dt', 'author_nm', 'msg']
+    )
+
+    EXPECTED_FILES = DataFrame([
+            ["a2452407107a0c5a64e76cf422f4d6f788dcc814", "README.md", 1, 0],
+            ["ac945860b3f5eaf21ce65308ad2b33b475831041", "phpapp/admin/addons.php", 9, 16],
+            ["ac945860b3f5eaf21ce65308ad2b33b475831041", "phpapp/img/logo.png", 0, 0],
+        ],
+        columns=['commit_id', 'file_path', 'n_lines_inserted', 'n_lines_deleted']
+    )
+
+    parser = GitLogParser('None', batch_size=2) # get log will not be used
+
+    batches = list(parser.parse_log_stream(INPUT.split('\n')))
+    assert [len(df_commit) for df_commit, _ in batches] == [2, 1]
+
+    obtained_df_commit = concat([df_commit for df_commit, _ in batches], ignore_index=True)
+    obtained_df_commit_file = concat([df_commit_file for _, df_commit_file in batches], ignore_index=True)
+
+    assert_frame_equal(obtained_df_commit, EXPECTED_COMMIT)
+    assert_frame_equal(obtained_df_commit_file, EXPECTED_FILES, check_dtype=False)
+
+
+def test_incremental_parse_git_log(mocker):
+
+    PATH_TO_REPO = "./test/asset/repo/RandomRewardBot"
+
+    def commit_file(file_nm, content, msg):
+        with open(os.path.join(PATH_TO_REPO, file_nm), 'w') as f:
+            f.write(content)
+        os.system(f'git -C {PATH_TO_REPO} add {file_nm}')
+        os.system(f'git -C {PATH_TO_REPO} -c user.name=dev_1 -c user.email=dev_1@mail.com commit -q -m "{msg}"')
+
+    def get_config_manager(codebase_nm, incremental):
+        config_manager = ConfigManager()
+        config_manager.codebase_nm = codebase_nm
+        config_manager.path_to_repo = PATH_TO_REPO
+        config_manager.incremental = incremental
+        return config_manager
+
+    def read_sorted_raw(codebase_nm):
+        # integer commit ids depend on the parse order, rows are compared on the commit hashes
+        df_commit = read_raw(codebase_nm, 'commit')
+        assert df_commit.idx.is_unique
+        df_commit_file = (
+            read_raw(codebase_nm, 'commit_file')
+            .assign(commit_id = lambda dfx: dfx.commit_idx.map(df_commit.set_index('idx').id))
+            .drop(columns='commit_idx')
+        )
+        return (
+            df_commit.drop(columns='idx').sort_values('id', ignore_index=True),
+            df_commit_file.sort_values(['commit_id', 'file_path'], ignore_index=True),
+        )
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    parse_git_log(get_config_manager('incremental', True))  # no previous parse -> full parse
+    assert len(read_raw('incremental', 'commit')) == 10
+
+    commit_file('a.py', 'a = 1\n', 'feat(a) - add a')
+    os.system(f'git -C {PATH_TO_REPO} checkout -q -b feature')
+    commit_file('b.py', 'b = 1\n', 'feat(b) - add b')
+    commit_file('c.py', 'c = 1\n', 'feat(c) - add c')
+    os.system(f'git -C {PATH_TO_REPO} branch -q to_delete')
+    commit_file('d.py', 'd = 1\n', 'feat(d) - add d')
+
+    parse_git_log(get_config_manager('incremental', True))
+    assert len(read_raw('incremental', 'commit')) == 14
+
+    os.system(f'git -C {PATH_TO_REPO} reset -q --hard HEAD~2')  # force-push like history rewrite
+    commit_file('e.py', 'e = 1\n', 'feat(e) - add e')
+    os.system(f'git -C {PATH_TO_REPO} branch -q -D to_delete')
+
+    parse_git_log(get_config_manager('incremental', True))
+    parse_git_log(get_config_manager('full', False))
+
+    obtained_df_commit, obtained_df_commit_file = read_sorted_raw('incremental')
+    expected_df_commit, expected_df_commit_file = read_sorted_raw('full')
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert len(expected_df_commit) == 13
+    assert_frame_equal(obtained_df_commit, expected_df_commit)
+    assert_frame_equal(obtained_df_commit_file, expected_df_commit_file)
+
+
+def test_parse_nul_log_stream():
+
+    INPUT = (
+        b"a2452407107a0c5a64e76cf422f4d6f788dcc814\x002019-05-30 12:26:49 +0200\x00PH\xe9aro\x00Add\tREADME\x00"
+        b"\n1\t0\tREADME.md\x00-\t-\tphpapp/img/logo.png\x00\x00"
+        b"a7a7d2e6067c97dd14be74b005909270e1858814\x002019-05-30 12:25:26 +0200\x00PHParo\x00Merge branch 'dev'\x00\x00"
+        b"ac945860b3f5eaf21ce65308ad2b33b475831041\x002019-03-21 10:55:33 +0100\x00baro\x00Move addons\x00"
+        b"\n9\t16\t\x00phpapp/admin/addons.php\x00phpapp/addons.php\x00"
+    )
+
+    EXPECTED_COMMIT = DataFrame([
+            ["a2452407107a0c5a64e76cf422f4d6f788dcc814", "2019-05-30 12:26:49 +0200", "PH�aro", "Add README"],
+            ["a7a7d2e6067c97dd14be74b005909270e1858814", "2019-05-30 12:25:26 +0200", "PHParo", "Merge branch 'dev'"],
+            ["ac945860b3f5eaf21ce65308ad2b33b475831041", "2019-03-21 10:55:33 +0100", "baro", "Move addons"],
+        ],
+        columns=['id', 'creation_dt', 'author_nm', 'msg']
+    )
+
+    EXPECTED_FILES = DataFrame([
+            ["a2452407107a0c5a64e76cf422f4d6f788dcc814", "README.md", 1, 0],
+            ["a2452407107a0c5a64e76cf422f4d6f788dcc814", "phpapp/img/logo.png", 0, 0],
+            ["ac945860b3f5eaf21ce65308ad2b33b475831041", "phpapp/{admin => }/addons.php", 9, 16],
+        ],
+        columns=['commit_id', 'file_path', 'n_lines_inserted', 'n_lines_deleted']
+    )
+
+    parser = GitLogParser('None', batch_size=2) # get log will not be used
+
+    chunks = [INPUT[i:i + 7] for i in range(0, len(INPUT), 7)] # tokens split across chunks
+    batches = list(parser.parse_nul_log_stream(chunks))
+    assert [len(df_commit) for df_commit, _ in batches] == [2, 1]
+
+    obtained_df_commit = concat([df_commit for df_commit, _ in batches], ignore_index=True)
+    obtained_df_commit_file = concat([df_commit_file for _, df_commit_file in batches], ignore_index=True)
+
+    assert_frame_equal(obtained_df_commit, EXPECTED_COMMIT)
+    assert_frame_equal(obtained_df_commit_file, EXPECTED_FILES)
+
+
+def test_rename_detection(mocker):
+
+    PATH_TO_REPO = "./test/asset/repo/RandomRewardBot"
+
+    def git(cmd):
+        os.system(f'git -C {PATH_TO_REPO} -c user.name=dev_1 -c user.email=dev_1@mail.com {cmd}')
+
+    def parse_renames(rename_detection):
+        config_manager = ConfigManager()
+        config_manager.codebase_nm = rename_detection
+        config_manager.path_to_repo = PATH_TO_REPO
+        config_manager.rename_detection = rename_detection
+        parse_git_log(config_manager)
+        return read_raw(rename_detection, 'file_rename').sort_values('new_path', ignore_index=True)
+
+    mocker.patch.object(
+        src.utilities,
+        'DATA_PATH',
+        './test/temp/data'
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    # renamed & edited app.py and a copy of rewards.py edited in the same commit
+    git('mv random_reward_bot/app.py random_reward_bot/bot.py')
+    os.system(f'echo "# bot" >> {PATH_TO_REPO}/random_reward_bot/bot.py')
+    os.system(f'cp {PATH_TO_REPO}/random_reward_bot/rewards.py {PATH_TO_REPO}/random_reward_bot/rewards_v2.py')
+    os.system(f'echo "# v1" >> {PATH_TO_REPO}/random_reward_bot/rewards.py')
+    git('add -A')
+    git('commit -q -m "refactor(app) - rename app to bot"')
+
+    df_no_rename = parse_renames('none')
+    df_rename = parse_renames('renames')
+    df_copy = parse_renames('copies')
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert len(df_no_rename) == 0
+    assert df_rename[['file_path', 'old_path', 'new_path']].values.tolist() == [
+        ['random_reward_bot/{app.py => bot.py}', 'random_reward_bot/app.py', 'random_reward_bot/bot.py'],
+    ]
+    assert df_copy[['file_path', 'old_path', 'new_path']].values.tolist() == [
+        ['random_reward_bot/{app.py => bot.py}', 'random_reward_bot/app.py', 'random_reward_bot/bot.py'],
+        ['random_reward_bot/{rewards.py => rewards_v2.py}', 'random_reward_bot/rewards.py', 'random_reward_bot/rewards_v2.py'],
+    ]
+
+
+def test_split_file_renaming():
+
+    for old_path, new_path in [
+        ('phpapp/admin/addons.php', 'phpapp/addons.php'),
+        ('addons.php', 'phpapp/addons.php'),
+        ('src/a.py', 'src/b.py'),
+        ('Dockerfile_allbuild', 'packaging/Dockerfile-allbuild'),
+        ('a/b/c.py', 'a/c.py'),
+    ]:
+        assert split_file_renaming(format_file_renaming(old_path, new_path)) == (old_path, new_path)
@@ -0,0 +1,69 @@
+import os
+
+from pandas.testing import assert_frame_equal
+
+from src.git_log_parsing import GitLogParser
+from src.git_object_store import count_line_changes
+
+
+def test_count_line_changes():
+
+    assert count_line_changes(b'', b'a\nb\n') == (2, 0)
+    assert count_line_changes(b'a\nb\nc\n', b'a\nc\nd\n') == (1, 1)
+    assert count_line_changes(b'a\nb', b'a\nb\n') == (1, 1) # missing newline at end of file
+    assert count_line_changes(b'x\ny\nz\n', b'z\ny\nx\n') == (2, 2)
+
+
+def test_object_store_backend():
+
+    PATH_TO_REPO = "./test/asset/repo/RandomRewardBot"
+
+    def git(cmd):
+        os.system(f'git -C {PATH_TO_REPO} -c user.name=dev_1 -c user.email=dev_1@mail.com {cmd}')
+
+    def write_file(file_path, content, mode='w'):
+        os.makedirs(os.path.dirname(os.path.join(PATH_TO_REPO, file_path)), exist_ok=True)
+        with open(os.path.join(PATH_TO_REPO, file_path), mode) as f:
+            f.write(content)
+
+    def read_sorted_log(backend):
+        batches = list(GitLogParser(PATH_TO_REPO, backend=backend).iter_commit_batches())
+        return (
+            batches[0][0].sort_values('id', ignore_index=True),
+            batches[0][1].sort_values(['commit_id', 'file_path'], ignore_index=True),
+        )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    write_file('src/app.py', 'def main():\n    return 1')
+    write_file('logo.bin', b'\x89PNG\x00\x01\x02', 'wb')
+    git('add -A')
+    git('commit -q -m "feat(app) - add app"')
+
+    git('checkout -q -b feature')
+    write_file('src/app.py', 'def main():\n    return 2\n')
+    write_file('src/utils/helpers.py', 'def helper():\n    pass\n')
+    git('mv logo.bin assets_logo.bin')
+    git('add -A')
+    git('commit -q -m "refacto(app) - add helpers" -m "body"')
+
+    git('checkout -q -')
+    os.chmod(os.path.join(PATH_TO_REPO, 'src/app.py'), 0o755)
+    git('commit -q -a -m "chore - make app executable"')
+    git('merge -q --no-edit feature')
+    git('tag -a v1 -m "release v1"')
+
+    expected_df_commit, expected_df_commit_file = read_sorted_log('cli')
+    loose_df_commit, loose_df_commit_file = read_sorted_log('object_store')
+
+    git('gc -q') # objects packed as deltas
+    git('commit-graph write --reachable')
+    packed_df_commit, packed_df_commit_file = read_sorted_log('object_store')
+
+    os.system('rm -R test/asset/repo')
+
+    assert len(expected_df_commit) == 14
+    assert_frame_equal(loose_df_commit, expected_df_commit)
+    assert_frame_equal(loose_df_commit_file, expected_df_commit_file)
+    assert_frame_equal(packed_df_commit, expected_df_commit)
+    assert_frame_equal(packed_df_commit_file, expected_df_commit_file)
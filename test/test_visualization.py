@@ -1,8 +1,13 @@
 
 import os
 
+from pandas.testing import assert_frame_equal
+
 from src.launch_dashboard import main as launch_dashboard
 from src.config_management import ConfigManager
+from src.cmd_chaining import run_predecessor
+from src.fig_generation import FigGenerator, QueryPlan
+from src.visualization import visualize, CMD_NM
 
 import src.utilities
 import src.cmd_chaining
@@ -16,10 +21,15 @@ def test_integration_visualize(mocker):
 
     EXPECTED_OUTPUT_NMS = [
         '.gitignore',
-        'random_reward_bot_clean_commit_file.parquet',
-        'random_reward_bot_clean_commit.parquet',
-        'random_reward_bot_raw_commit_file.csv',
-        'random_reward_bot_raw_commit.csv'
+        'random_reward_bot_clean_commit_file',
+        'random_reward_bot_clean_commit',
+        'random_reward_bot_clean_rollup',
+        'random_reward_bot_clean_state.json',
+        'random_reward_bot_raw_commit_file',
+        'random_reward_bot_raw_commit',
+        'random_reward_bot_raw_file_rename',
+        'random_reward_bot_raw_state.json',
+        'random_reward_bot_stage_state.json'
         ].sort()
 
     config_manager = ConfigManager()
@@ -62,6 +72,54 @@ def test_integration_visualize(mocker):
     obtained_output_nms = os.listdir('./test/temp/data').sort()
 
     os.system('rm -R test/asset/repo')
-    os.system('rm test/temp/data/*')
+    os.system('rm -R test/temp/data/*')
 
     assert obtained_output_nms == EXPECTED_OUTPUT_NMS
+
+
+def test_period_filter_rollup_matches_rows(mocker):
+
+    config_manager = ConfigManager()
+    config_manager.codebase_nm = 'random_reward_bot'
+    config_manager.path_to_repo = "./test/asset/repo/RandomRewardBot"
+    config_manager.src_path = './random_reward_bot'
+    config_manager.module_depth = 1
+    config_manager.component_nms = ['app', 'reward']
+    config_manager.component_depth = 1
+    config_manager.has_components = True
+    config_manager.set_dashboard_specs_from_config()
+
+    for module in [src.utilities, src.cmd_chaining, src.git_log_parsing]:
+        mocker.patch.object(
+            module,
+            'DATA_PATH',
+            './test/temp/data'
+            )
+
+    os.system('unzip -q test/asset/repo.zip') #test repo is stored as zip to avoid maintaning two git repo
+
+    run_predecessor(CMD_NM, config_manager)
+    web_app = visualize(config_manager)
+
+    # history spans 29 & 30 Sep 2021, the period ends on its first day
+    web_app.update_filter_state('period', [0, 0])
+    web_app.update_current_df()
+
+    df_rows = web_app.get_current_rows_df()
+    fig_gens = [
+        FigGenerator(title=stat['nm'], **stat['def'])
+        for view_nm in web_app.VIEW_NMS
+        for stat in web_app.specs[view_nm]['stats'].values()
+    ]
+    fig_gens = [fig_gen for fig_gen in fig_gens if fig_gen.can_use_rollup(web_app.df_base.columns)]
+
+    obtained_dfs = QueryPlan(fig_gens).get_transformed(web_app.df_current, True)
+    expected_dfs = QueryPlan(fig_gens).get_transformed(df_rows, False)
+
+    os.system('rm -R test/asset/repo')
+    os.system('rm -R test/temp/data/*')
+
+    assert web_app.is_rollup
+    assert web_app.df_current.n_rows.sum() == len(df_rows) > 0
+    for obtained_df, expected_df in zip(obtained_dfs, expected_dfs):
+        assert_frame_equal(obtained_df, expected_df)